@@ -17,6 +17,7 @@ from database_models import (
     EstudianteBadge, RankingMensual, EstadisticaDiaria, ReporteGenerado,
     AuditLog, AsistenteHistorial, SysConfig, SesionActiva
 )
+from frame_upload import read_frame_upload
 
 # Crear blueprint
 api_bp = Blueprint('api', __name__, url_prefix='/api')
@@ -405,9 +406,13 @@ def recognize_attendance(user):
     session = get_db_session()
     
     try:
-        data = request.json
+        # Imagen binaria/multipart (campo image) o base64 en JSON (image_base64)
+        image_bytes, data = read_frame_upload('image')
+        if image_bytes is None:
+            image_bytes, data = read_frame_upload('image_base64')
         materia_id = data['materia_id']
-        image_base64 = data['image_base64']
+        if image_bytes is None:
+            return jsonify({'success': False, 'error': 'Imagen requerida'}), 400
         
         # TODO: Implementar reconocimiento facial real
         # Por ahora simulamos reconocimiento exitoso
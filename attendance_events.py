@@ -0,0 +1,122 @@
+"""
+CLASS VISION - Eventos de Asistencia en Proceso
+Pub/sub en memoria por equipo: cada inserción en asistencia_log publica
+un delta que los suscriptores (feeds SSE) reciben sin consultar la base
+de datos
+"""
+
+import itertools
+import json
+import queue
+import threading
+from datetime import datetime
+from typing import Any, Dict, List
+
+from utils.logger import get_logger
+
+
+class AttendanceEventHub:
+    """
+    Distribuidor de eventos de asistencia por equipo_id
+
+    Cada suscriptor recibe su propia cola acotada; si un cliente lento la
+    llena, se descarta su evento más antiguo en lugar de bloquear a quien
+    publica (el endpoint que registró la asistencia).
+    """
+
+    def __init__(self, max_queue: int = 100):
+        self.logger = get_logger(__name__)
+        self.max_queue = max_queue
+        self._subscribers: Dict[int, List[queue.Queue]] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+
+    def subscribe(self, equipo_id: int) -> queue.Queue:
+        """Registrar un suscriptor y devolver su cola de eventos"""
+        cola = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            self._subscribers.setdefault(equipo_id, []).append(cola)
+        return cola
+
+    def unsubscribe(self, equipo_id: int, cola: queue.Queue):
+        """Eliminar un suscriptor (al cerrarse la conexión)"""
+        with self._lock:
+            colas = self._subscribers.get(equipo_id, [])
+            if cola in colas:
+                colas.remove(cola)
+            if not colas:
+                self._subscribers.pop(equipo_id, None)
+
+    def publish(self, equipo_id: int, evento: Dict[str, Any]) -> int:
+        """
+        Enviar un evento a todos los suscriptores de un equipo
+
+        Returns:
+            Número de suscriptores notificados
+        """
+        evento = dict(evento, seq=next(self._sequence))
+        with self._lock:
+            colas = list(self._subscribers.get(equipo_id, ()))
+
+        for cola in colas:
+            while True:
+                try:
+                    cola.put_nowait(evento)
+                    break
+                except queue.Full:
+                    try:
+                        cola.get_nowait()
+                    except queue.Empty:
+                        pass
+        return len(colas)
+
+    def subscriber_count(self, equipo_id: int = None) -> int:
+        with self._lock:
+            if equipo_id is not None:
+                return len(self._subscribers.get(equipo_id, ()))
+            return sum(len(colas) for colas in self._subscribers.values())
+
+
+# Instancia singleton
+_hub_instance = None
+_hub_lock = threading.Lock()
+
+
+def get_event_hub() -> AttendanceEventHub:
+    """Obtener el distribuidor de eventos compartido por el proceso"""
+    global _hub_instance
+    if _hub_instance is None:
+        with _hub_lock:
+            if _hub_instance is None:
+                _hub_instance = AttendanceEventHub()
+    return _hub_instance
+
+
+def publish_attendance(equipo_id: int, asistencia_id: int, usuario_id: int,
+                       codigo_usuario: str, nombre_completo: str, metodo: str):
+    """
+    Publicar una nueva fila de asistencia_log
+
+    El delta tiene la misma forma que los elementos de
+    /equipos/<id>/asistencias-hoy. Se llama después del commit y nunca
+    propaga errores al endpoint que registró la asistencia.
+    """
+    ahora = datetime.now()
+    try:
+        get_event_hub().publish(equipo_id, {
+            'asistencia_id': asistencia_id,
+            'equipo_id': equipo_id,
+            'id': usuario_id,
+            'codigo_usuario': codigo_usuario,
+            'nombre_completo': nombre_completo,
+            'fecha': ahora.date().isoformat(),
+            'hora_entrada': ahora.time().isoformat(),
+            'metodo': metodo
+        })
+    except Exception as e:
+        get_logger(__name__).warning(f"No se pudo publicar la asistencia {asistencia_id}: {e}")
+
+
+def format_sse(evento: Dict[str, Any], nombre: str = 'asistencia') -> str:
+    """Serializar un evento en formato text/event-stream"""
+    return f"id: {evento['seq']}\nevent: {nombre}\ndata: {json.dumps(evento, default=str)}\n\n"
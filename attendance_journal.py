@@ -0,0 +1,299 @@
+"""
+CLASS VISION - Diario de Asistencia por Materia
+Cada asistencia se agrega como una línea a Attendance/{materia}/attendance.journal
+en lugar de releer y reescribir attendance.csv. Los duplicados se
+descartan con un conjunto (enrollment, fecha) en memoria y una
+compactación periódica regenera el CSV de siempre
+"""
+
+import atexit
+import csv
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from utils.config_manager import get_config
+from utils.logger import get_logger
+
+
+ATTENDANCE_DIR = Path(__file__).parent / "Attendance"
+JOURNAL_NAME = "attendance.journal"
+LEGACY_NAME = "attendance.csv"
+LEGACY_HEADER = ['Enrollment', 'Name', 'Date', 'Time']
+
+
+class SubjectJournal:
+    """
+    Diario append-only de una materia
+
+    Formato: CSV sin encabezado con las mismas columnas que el CSV
+    heredado (Enrollment, Name, Date, Time). record() escribe la línea
+    y la entrega al sistema operativo; el fsync se agrupa (cada
+    `fsync_batch` registros o en el siguiente ciclo del hilo de fondo).
+    """
+
+    def __init__(self, directory: Path, fsync_batch: int = 32):
+        self.logger = get_logger(__name__)
+        self.directory = Path(directory)
+        self.journal_path = self.directory / JOURNAL_NAME
+        self.legacy_path = self.directory / LEGACY_NAME
+        self.fsync_batch = fsync_batch
+
+        self._lock = threading.Lock()
+        self._present: Set[Tuple[int, str]] = set()
+        self._journal_lines = 0
+        self._unsynced = 0
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+        self._file = open(self.journal_path, 'a', encoding='utf-8', newline='')
+        self._writer = csv.writer(self._file)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def _legacy_rows(self) -> Iterator[List[str]]:
+        """Filas del CSV compactado (sólo el formato Enrollment,Name,Date,Time)"""
+        if not self.legacy_path.exists():
+            return
+        with open(self.legacy_path, 'r', encoding='utf-8', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header or 'Date' not in header:
+                # Resumen por sesiones de show_attendance: no es un registro
+                return
+            columns = [header.index(name) if name in header else None for name in LEGACY_HEADER]
+            for row in reader:
+                yield [row[i] if i is not None and i < len(row) else '' for i in columns]
+
+    def _journal_rows(self) -> Iterator[List[str]]:
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.reader(f):
+                # Una línea truncada por un corte de luz se ignora
+                if len(row) == len(LEGACY_HEADER):
+                    yield row
+
+    def _load(self):
+        for row in self._legacy_rows():
+            self._mark(row)
+        for row in self._journal_rows():
+            self._mark(row)
+            self._journal_lines += 1
+
+    def _mark(self, row: List[str]) -> bool:
+        try:
+            key = (int(row[0]), row[2])
+        except (ValueError, IndexError):
+            return False
+        if key in self._present:
+            return False
+        self._present.add(key)
+        return True
+
+    def is_present(self, enrollment: int, date: str) -> bool:
+        with self._lock:
+            return (int(enrollment), date) in self._present
+
+    def records(self) -> List[Dict[str, str]]:
+        """Registros sin duplicar: CSV compactado seguido del diario"""
+        with self._lock:
+            self._file.flush()
+            seen: Set[Tuple[int, str]] = set()
+            result = []
+            for source in (self._legacy_rows(), self._journal_rows()):
+                for row in source:
+                    try:
+                        key = (int(row[0]), row[2])
+                    except (ValueError, IndexError):
+                        continue
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    record = dict(zip(LEGACY_HEADER, row))
+                    record['Enrollment'] = key[0]
+                    result.append(record)
+            return result
+
+    @property
+    def journal_lines(self) -> int:
+        return self._journal_lines
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def record(self, enrollment: int, name: str, when: Optional[datetime] = None) -> bool:
+        """
+        Registrar una asistencia si el estudiante no la tiene ese día
+
+        Returns:
+            True si se agregó, False si ya estaba registrado
+        """
+        when = when or datetime.now()
+        date = when.strftime("%Y-%m-%d")
+        with self._lock:
+            key = (int(enrollment), date)
+            if key in self._present:
+                return False
+            self._writer.writerow([int(enrollment), name, date, when.strftime("%H:%M:%S")])
+            self._file.flush()
+            self._present.add(key)
+            self._journal_lines += 1
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_batch:
+                self._sync_locked()
+            return True
+
+    def sync(self):
+        """Forzar a disco las líneas pendientes"""
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._unsynced:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def compact(self) -> int:
+        """
+        Regenerar attendance.csv con todo lo registrado y vaciar el diario
+
+        El CSV se reemplaza de forma atómica antes de truncar el diario;
+        si el proceso se corta en medio, las líneas repetidas se
+        descartan al volver a cargar.
+
+        Returns:
+            Número de filas del CSV resultante (0 si no había nada que compactar)
+        """
+        with self._lock:
+            self._file.flush()
+            self._sync_locked()
+            if self._journal_lines == 0:
+                return 0
+
+            seen: Set[Tuple[int, str]] = set()
+            rows = []
+            for source in (self._legacy_rows(), self._journal_rows()):
+                for row in source:
+                    try:
+                        key = (int(row[0]), row[2])
+                    except (ValueError, IndexError):
+                        continue
+                    if key not in seen:
+                        seen.add(key)
+                        rows.append(row)
+
+            tmp_path = self.legacy_path.with_suffix('.csv.tmp')
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(LEGACY_HEADER)
+                writer.writerows(rows)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.legacy_path)
+
+            self._file.close()
+            self._file = open(self.journal_path, 'w', encoding='utf-8', newline='')
+            self._writer = csv.writer(self._file)
+            self._journal_lines = 0
+            return len(rows)
+
+    def close(self):
+        with self._lock:
+            self._file.flush()
+            self._sync_locked()
+            self._file.close()
+
+
+class AttendanceJournal:
+    """
+    Diarios de todas las materias con un hilo de fsync y compactación
+
+    - Cada `journal_fsync_interval_ms` se hace fsync de lo pendiente
+    - Un diario con más de `journal_compact_lines` líneas se compacta
+    - Al salir del proceso se compactan todos
+    """
+
+    def __init__(self, root: Path = ATTENDANCE_DIR):
+        self.logger = get_logger(__name__)
+        self.root = Path(root)
+        config = get_config()
+        self.fsync_interval = float(config.get("attendance.journal_fsync_interval_ms", 200)) / 1000
+        self.fsync_batch = int(config.get("attendance.journal_fsync_batch", 32))
+        self.compact_lines = int(config.get("attendance.journal_compact_lines", 5000))
+
+        self._journals: Dict[str, SubjectJournal] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="attendance-journal", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def subject(self, subject: str) -> SubjectJournal:
+        """Diario de una materia (se abre y carga la primera vez)"""
+        with self._lock:
+            journal = self._journals.get(subject)
+            if journal is None:
+                journal = SubjectJournal(self.root / subject, self.fsync_batch)
+                self._journals[subject] = journal
+            return journal
+
+    def record(self, subject: str, enrollment: int, name: str,
+               when: Optional[datetime] = None) -> bool:
+        return self.subject(subject).record(enrollment, name, when)
+
+    def records(self, subject: str) -> List[Dict[str, str]]:
+        return self.subject(subject).records()
+
+    def compact(self, subject: Optional[str] = None):
+        """Compactar una materia (o todas las abiertas)"""
+        with self._lock:
+            journals = [self._journals[subject]] if subject else list(self._journals.values())
+        for journal in journals:
+            journal.compact()
+
+    def close(self):
+        """Compactar y cerrar todos los diarios (al apagar el servidor)"""
+        self._stop.set()
+        with self._lock:
+            journals = list(self._journals.values())
+            self._journals.clear()
+        for journal in journals:
+            try:
+                journal.compact()
+                journal.close()
+            except Exception as e:
+                self.logger.error(f"Error cerrando diario {journal.journal_path}: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.fsync_interval):
+            with self._lock:
+                journals = list(self._journals.values())
+            for journal in journals:
+                try:
+                    journal.sync()
+                    if journal.journal_lines >= self.compact_lines:
+                        rows = journal.compact()
+                        self.logger.info(f"Diario compactado: {journal.legacy_path} ({rows} filas)")
+                except Exception as e:
+                    self.logger.error(f"Error en diario {journal.journal_path}: {e}")
+
+
+# Instancia singleton
+_journal_instance = None
+_journal_lock = threading.Lock()
+
+
+def get_attendance_journal() -> AttendanceJournal:
+    """Obtener los diarios de asistencia compartidos por el proceso"""
+    global _journal_instance
+    if _journal_instance is None:
+        with _journal_lock:
+            if _journal_instance is None:
+                _journal_instance = AttendanceJournal()
+    return _journal_instance
@@ -0,0 +1,205 @@
+"""
+CLASS VISION - Reconocimiento Facial de Sesiones de Asistencia
+Detección en el frame, comparación contra la galería del equipo y
+aceptación de la marca en el conjunto de trabajo de la sesión. Lo usan
+/facial/reconocer-frame, el canal WebSocket (live_recognition) y
+session_working_set, sin depender de las rutas Flask
+"""
+
+from sqlalchemy import text
+
+from attendance_writer import PendingMark, get_write_buffer
+from face_detector_pool import detect_scaled
+from utils.config_manager import get_config
+
+
+def load_recognition_thresholds():
+    """
+    Leer el rango de confianza aceptado desde config/recognition_config.json
+    
+    Sistema de RANGO: solo acepta valores entre UMBRAL_MINIMO y UMBRAL_MAXIMO
+    Valores menores = mejor reconocimiento (0=perfecto, 100=no match)
+    Configuración actual: 30-50 (muy estricto, solo reconocimientos excelentes)
+    
+    Returns:
+        (umbral_minimo, umbral_maximo)
+    """
+    # Servido desde memoria; el archivo se relee sólo cuando cambia
+    return get_config().recognition_thresholds()
+
+
+def detect_frame_faces(img):
+    """
+    Detectar rostros en un frame BGR
+    
+    Returns:
+        (imagen en gris, rectángulos de los rostros)
+    """
+    import cv2
+    
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    print(f"📷 Imagen convertida a gris: {gray.shape}")
+    faces = detect_scaled(gray)
+    print(f"👤 Rostros detectados: {len(faces)}")
+    return gray, faces
+
+
+def match_and_register_attendance(gray, faces, working_set):
+    """
+    Identificar los rostros contra la galería del equipo y registrar la
+    asistencia del mejor candidato dentro del rango de confianza
+    
+    La respuesta sale de la memoria: la marca se acepta en el conjunto de
+    trabajo y la fila se escribe por lotes (asistencia_id es None hasta
+    entonces; si la escritura falla de forma permanente se desmarca).
+    
+    Args:
+        gray: Frame en escala de grises
+        faces: Rectángulos devueltos por detect_frame_faces
+        working_set: SessionWorkingSet de la sesión en vivo (galería y marcas)
+    
+    Returns:
+        Diccionario de respuesta (mismo formato que /facial/reconocer-frame)
+    """
+    import cv2
+    
+    gallery = working_set.gallery
+    mejor_match = None
+    mejor_confianza = 100
+    UMBRAL_MINIMO, UMBRAL_MAXIMO = load_recognition_thresholds()
+    
+    # Todos los rostros del frame se comparan en una sola llamada
+    rostros = [cv2.resize(gray[y:y+h, x:x+w], (200, 200)) for (x, y, w, h) in faces]
+    try:
+        predicciones = gallery.predict_batch(rostros)
+    except Exception as e:
+        print(f"⚠️ Error reconociendo rostros: {e}")
+        predicciones = []
+    
+    for miembro, confidence in predicciones:
+        if miembro is not None:
+            print(f"🔍 {miembro[1]}: confianza={confidence:.2f} (rango permitido: {UMBRAL_MINIMO}-{UMBRAL_MAXIMO})")
+            
+            # Solo considerar si está en el rango permitido
+            if UMBRAL_MINIMO <= confidence <= UMBRAL_MAXIMO:
+                if confidence < mejor_confianza:
+                    mejor_confianza = confidence
+                    mejor_match = miembro
+    
+    if mejor_match:
+        usuario_id, codigo_usuario, nombre_completo, membresia_id = mejor_match
+        ya_registrado = {
+            'success': True,
+            'reconocido': True,
+            'ya_registrado': True,
+            'nombre': nombre_completo,
+            'codigo': codigo_usuario,
+            'mensaje': f'{nombre_completo} ya registró asistencia hoy'
+        }
+        
+        # Write-behind: se acepta en memoria y el buffer la inserta
+        # (y la publica) junto con las demás marcas del lote
+        if not working_set.try_mark(membresia_id):
+            return ya_registrado
+        get_write_buffer().add(PendingMark(
+            membresia_id, 'facial', None, gallery.equipo_id,
+            usuario_id, codigo_usuario, nombre_completo
+        ))
+        
+        # Calcular porcentaje de confianza (100 = perfecto, 0 = malo)
+        porcentaje_confianza = max(0, round(100 - mejor_confianza, 2))
+        
+        print(f"✅ Asistencia registrada: {nombre_completo} (confianza: {porcentaje_confianza}%)")
+        
+        return {
+            'success': True,
+            'reconocido': True,
+            'ya_registrado': False,
+            'asistencia_id': None,
+            'nombre': nombre_completo,
+            'codigo': codigo_usuario,
+            'confianza': porcentaje_confianza,
+            'mensaje': f'✅ {nombre_completo} - Asistencia registrada ({porcentaje_confianza}% confianza)'
+        }
+    
+    # Si hay reconocimientos pero ninguno pasó el filtro de rango
+    if mejor_confianza < 100:
+        porcentaje_confianza = max(0, round(100 - mejor_confianza, 2))
+        
+        # Rechazado por ser demasiado perfecto (posible foto/fraude)
+        if mejor_confianza < UMBRAL_MINIMO:
+            print(f"🚫 RECHAZADO - Demasiado perfecto: {mejor_confianza:.2f} < {UMBRAL_MINIMO}")
+            return {
+                'success': True,
+                'reconocido': False,
+                'mensaje': f'🚫 Reconocimiento sospechoso (valor {mejor_confianza:.1f} demasiado perfecto).\n\n💡 Si tiene complicaciones faciales, solicite registro manual.',
+                'motivo': 'demasiado_perfecto',
+                'mejor_confianza': round(mejor_confianza, 2),
+                'rango_requerido': f'{UMBRAL_MINIMO}-{UMBRAL_MAXIMO}'
+            }
+        
+        # Rechazado por confianza insuficiente (>50)
+        print(f"⚠️ RECHAZADO - Confianza baja: {mejor_confianza:.2f} > {UMBRAL_MAXIMO}")
+        return {
+            'success': True,
+            'reconocido': False,
+            'mensaje': f'🔴 Confianza insuficiente ({mejor_confianza:.1f}). Debe estar entre {UMBRAL_MINIMO}-{UMBRAL_MAXIMO}.\n\n💡 Mejora la iluminación o solicita registro manual.',
+            'mejor_confianza': round(mejor_confianza, 2),
+            'porcentaje': porcentaje_confianza,
+            'rango_requerido': f'{UMBRAL_MINIMO}-{UMBRAL_MAXIMO}'
+        }
+    
+    # No se detectó ningún rostro conocido
+    return {
+        'success': True,
+        'reconocido': False,
+        'mensaje': '❌ Rostro no reconocido en el sistema.\n\n💡 Solicita registro manual si tienes complicaciones faciales.'
+    }
+
+
+def get_active_session_team(db_session, sesion_id):
+    """
+    Obtener el equipo de una sesión de asistencia activa
+    
+    Returns:
+        equipo_id o None si la sesión no existe o no está activa
+    """
+    sesion_check = text("""
+        SELECT id, equipo_id, estado, fecha_inicio FROM sesiones_asistencia
+        WHERE id = :sesion_id
+    """)
+    sesion_data = db_session.execute(sesion_check, {'sesion_id': sesion_id}).fetchone()
+    
+    print(f"🔍 [DEBUG] Resultado query sesiones_asistencia: {sesion_data}")
+    
+    if not sesion_data:
+        print(f"❌ Sesión {sesion_id} NO EXISTE en sesiones_asistencia")
+        return None
+    
+    if sesion_data[2] != 'activa':
+        print(f"❌ Sesión {sesion_id} existe pero estado es '{sesion_data[2]}' (no 'activa')")
+        return None
+    
+    if not sesion_data[3]:
+        print(f"❌ Sesión {sesion_id} existe pero fecha_inicio es NULL")
+        return None
+    
+    print(f"✅ Sesión {sesion_id} válida para equipo {sesion_data[1]} (estado={sesion_data[2]}, inicio={sesion_data[3]})")
+    return sesion_data[1]
+
+
+def get_team_members_with_models(db_session, equipo_id):
+    """Miembros activos del equipo con rostro registrado"""
+    miembros_query = text("""
+        SELECT u.id, u.codigo_usuario, u.nombre_completo, m.id as membresia_id
+        FROM membresias m
+        JOIN usuarios u ON m.usuario_id = u.id
+        WHERE m.equipo_id = :equipo_id 
+        AND m.estado = 'activo'
+        AND u.foto_face_vector IS NOT NULL
+    """)
+    miembros = db_session.execute(miembros_query, {'equipo_id': equipo_id}).fetchall()
+    print(f"👥 Miembros del equipo con modelos: {len(miembros)}")
+    for miembro in miembros:
+        print(f"   - {miembro[1]}: {miembro[2]}")
+    return miembros
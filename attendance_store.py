@@ -0,0 +1,234 @@
+"""
+CLASS VISION - Almacén Columnar de Asistencia
+Una fila por (enrollment, sesión) en fragmentos Parquet por materia,
+con nombres y sesiones codificados como diccionario. El reporte por
+materia es un único pivot vectorizado en lugar de merges sucesivos
+"""
+
+import re
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from utils.logger import get_logger
+
+
+ATTENDANCE_DIR = Path(__file__).parent / "Attendance"
+STORE_DIRNAME = ".columnar"
+
+# {materia}_{YYYY-MM-DD}_{HH-MM-SS}.csv, como lo escriben los módulos de asistencia
+_SESSION_FILE = re.compile(r'^(?P<subject>.+)_(?P<date>\d{4}-\d{2}-\d{2})_(?P<time>\d{2}-\d{2}-\d{2})$')
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+
+class AttendanceStore:
+    """
+    Eventos de asistencia por materia
+
+    Cada sesión guardada agrega un fragmento
+    Attendance/{materia}/.columnar/{sesion}.parquet con las columnas
+    enrollment (int64), name, session y date (diccionario). Los CSV
+    de sesión existentes se incorporan la primera vez que se consulta
+    la materia. Sin pyarrow, los eventos se leen directamente de los
+    CSV de sesión (mismo pivot, sin almacén).
+    """
+
+    def __init__(self, root: Path = ATTENDANCE_DIR):
+        self.logger = get_logger(__name__)
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    def store_dir(self, subject: str) -> Path:
+        return self.root / subject / STORE_DIRNAME
+
+    def session_files(self, subject: str) -> List[Path]:
+        """CSV de sesión de una materia (excluye el resumen attendance.csv)"""
+        folder = self.root / subject
+        if not folder.exists():
+            return []
+        return sorted(
+            path for path in folder.glob(f"{glob_escape(subject)}_*.csv")
+            if _SESSION_FILE.match(path.stem)
+        )
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def add_session(self, subject: str, session_id: str, date: str,
+                    enrollments: Iterable, names: Iterable) -> Optional[Path]:
+        """
+        Agregar los presentes de una sesión como un nuevo fragmento
+
+        Args:
+            subject: Materia
+            session_id: Identificador de la sesión (nombre del CSV sin extensión)
+            date: Fecha de la sesión (YYYY-MM-DD)
+            enrollments: Matrículas presentes
+            names: Nombre de cada matrícula
+
+        Returns:
+            Ruta del fragmento, o None si pyarrow no está instalado
+        """
+        if not PYARROW_AVAILABLE:
+            return None
+
+        enrollments = [int(e) for e in enrollments]
+        names = [str(n) for n in names]
+        table = pa.table({
+            'enrollment': pa.array(enrollments, type=pa.int64()),
+            'name': pa.array(names, type=pa.string()).dictionary_encode(),
+            'session': pa.array([session_id] * len(enrollments), type=pa.string()).dictionary_encode(),
+            'date': pa.array([date] * len(enrollments), type=pa.string()).dictionary_encode(),
+        })
+
+        folder = self.store_dir(subject)
+        folder.mkdir(parents=True, exist_ok=True)
+        path = folder / f"{session_id}.parquet"
+        tmp_path = folder / f"{session_id}.parquet.tmp"
+        pq.write_table(table, tmp_path, use_dictionary=True)
+        tmp_path.replace(path)
+        return path
+
+    def add_session_frame(self, subject: str, session_file: Path, attendance) -> Optional[Path]:
+        """
+        Agregar una sesión a partir del DataFrame guardado en su CSV
+
+        Args:
+            subject: Materia
+            session_file: CSV de la sesión recién escrito
+            attendance: DataFrame con columnas Enrollment, Name, {fecha}
+        """
+        session_file = Path(session_file)
+        match = _SESSION_FILE.match(session_file.stem)
+        date = match.group('date') if match else str(attendance.columns[-1])
+        return self.add_session(
+            subject, session_file.stem, date,
+            attendance['Enrollment'].tolist(), attendance['Name'].tolist()
+        )
+
+    def sync_subject(self, subject: str) -> int:
+        """
+        Incorporar los CSV de sesión que aún no tienen fragmento
+
+        Returns:
+            Número de sesiones agregadas
+        """
+        if not PYARROW_AVAILABLE:
+            return 0
+
+        with self._lock:
+            folder = self.store_dir(subject)
+            stored = {p.stem for p in folder.glob('*.parquet')} if folder.exists() else set()
+            added = 0
+            for path in self.session_files(subject):
+                if path.stem in stored:
+                    continue
+                events = _read_session_csv(path)
+                self.add_session(
+                    subject, path.stem, events['date'].iloc[0] if len(events) else _date_of(path),
+                    events['Enrollment'].tolist(), events['Name'].tolist()
+                )
+                added += 1
+            if added:
+                self.logger.info(f"Almacén de asistencia de {subject}: {added} sesiones incorporadas")
+            return added
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def events(self, subject: str):
+        """
+        Eventos de asistencia de una materia
+
+        Returns:
+            DataFrame con columnas Enrollment, Name, session, date
+        """
+        import pandas as pd
+
+        if PYARROW_AVAILABLE:
+            self.sync_subject(subject)
+            folder = self.store_dir(subject)
+            fragments = sorted(folder.glob('*.parquet')) if folder.exists() else []
+            if not fragments:
+                return pd.DataFrame(columns=['Enrollment', 'Name', 'session', 'date'])
+            # Cada fragmento trae su propio diccionario; se unifican al concatenar
+            table = pa.concat_tables([pq.read_table(path) for path in fragments])
+            return table.to_pandas().rename(columns={'enrollment': 'Enrollment', 'name': 'Name'})
+
+        frames = [_read_session_csv(path) for path in self.session_files(subject)]
+        if not frames:
+            return pd.DataFrame(columns=['Enrollment', 'Name', 'session', 'date'])
+        return pd.concat(frames, ignore_index=True)
+
+    def report(self, subject: str):
+        """
+        Tabla de asistencia por fecha con el porcentaje de cada estudiante
+
+        Returns:
+            DataFrame Enrollment, Name, {fecha...}, Asistencia (como el
+            attendance.csv de show_attendance) o None si no hay sesiones
+        """
+        import pandas as pd
+
+        events = self.events(subject)
+        if events.empty:
+            return None
+
+        events = events.astype({'Enrollment': 'int64', 'Name': 'object', 'date': 'object'})
+        presence = pd.crosstab(events['Enrollment'], events['date']).clip(upper=1)
+        names = events.drop_duplicates('Enrollment').set_index('Enrollment')['Name']
+
+        report = presence.copy()
+        report.columns = [str(c) for c in report.columns]
+        report.insert(0, 'Name', names.reindex(report.index))
+        percent = (presence.mean(axis=1) * 100).round().astype(int)
+        report['Asistencia'] = percent.astype(str) + '%'
+        report.columns.name = None
+        return report.reset_index()
+
+
+def glob_escape(text: str) -> str:
+    """Escapar los metacaracteres de glob en un nombre de materia"""
+    return re.sub(r'([\[\]*?])', r'[\1]', text)
+
+
+def _date_of(path: Path) -> str:
+    match = _SESSION_FILE.match(path.stem)
+    return match.group('date') if match else ''
+
+
+def _read_session_csv(path: Path):
+    """Leer un CSV de sesión (Enrollment, Name, {fecha}) como eventos"""
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    date = _date_of(path) or str(df.columns[-1])
+    return pd.DataFrame({
+        'Enrollment': df['Enrollment'].astype('int64'),
+        'Name': df['Name'].astype(str),
+        'session': path.stem,
+        'date': date,
+    })
+
+
+# Instancia singleton
+_store_instance = None
+_store_lock = threading.Lock()
+
+
+def get_attendance_store() -> AttendanceStore:
+    """Obtener el almacén de asistencia compartido"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                _store_instance = AttendanceStore()
+    return _store_instance
@@ -0,0 +1,287 @@
+"""
+CLASS VISION - Escritura de Asistencias
+Una asistencia por membresía y día en una sola sentencia: el índice
+único uq_asistencia_membresia_fecha y ON CONFLICT DO NOTHING reemplazan
+la consulta previa "¿ya marcó hoy?" y la hacen segura entre frames
+concurrentes. Las marcas del reconocimiento en vivo pasan además por un
+buffer write-behind que las inserta por lotes
+"""
+
+import atexit
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from sqlalchemy import exc, text
+
+from utils.config_manager import get_config
+from utils.logger import get_logger
+
+
+_INSERT_ASISTENCIA = text("""
+    INSERT INTO asistencia_log (
+        membresia_id, metodo_entrada, estado, notas, foto_verificacion
+    ) VALUES (
+        :membresia_id, :metodo, :estado, :notas, :foto
+    )
+    ON CONFLICT (membresia_id, fecha) DO NOTHING
+    RETURNING id
+""")
+
+
+def register_attendance(db_session, membresia_id: int, metodo: str,
+                        estado: str = 'presente', notas: Optional[str] = None,
+                        foto: Optional[str] = None) -> Optional[int]:
+    """
+    Registrar la asistencia de hoy si la membresía aún no la tiene
+
+    No hace commit: el llamador lo hace junto con el resto de su
+    transacción (por ejemplo, marcar el QR como usado).
+
+    Args:
+        db_session: Sesión de base de datos
+        membresia_id: Membresía que marca asistencia
+        metodo: 'facial', 'qr' o 'manual'
+        estado: Estado de la asistencia (por defecto 'presente')
+        notas: Notas opcionales
+        foto: Foto de verificación opcional (base64)
+
+    Returns:
+        ID de la fila nueva, o None si ya había marcado hoy
+    """
+    return db_session.execute(_INSERT_ASISTENCIA, {
+        'membresia_id': membresia_id,
+        'metodo': metodo,
+        'estado': estado,
+        'notas': notas,
+        'foto': foto
+    }).scalar()
+
+
+class PendingMark(NamedTuple):
+    """Asistencia aceptada en memoria que aún no llegó a asistencia_log"""
+    membresia_id: int
+    metodo: str
+    notas: Optional[str]
+    equipo_id: int
+    usuario_id: int
+    codigo_usuario: str
+    nombre_completo: str
+
+
+class AttendanceWriteBuffer:
+    """
+    Buffer write-behind de asistencias
+
+    El reconocimiento en vivo responde "registrado" en cuanto el conjunto
+    de trabajo de la sesión acepta la marca; la fila se escribe después
+    junto con las demás marcas pendientes, en un único INSERT multi-fila
+    y un único commit. Se vacía al juntar `write_batch_size` marcas, cada
+    `write_flush_interval_ms`, al detener una sesión y al salir del proceso.
+
+    Si el lote falla porque la base de datos no responde (errores de
+    conexión u operativos) las marcas se conservan para el siguiente
+    intento; ante cualquier otro error se reintenta fila por fila y las
+    filas que fallan de forma permanente (por ejemplo, una membresía ya
+    borrada) se descartan y se avisa a los suscriptores de on_discard()
+    (el registro de sesiones desmarca la membresía).
+    """
+
+    def __init__(self, batch_size: Optional[int] = None, flush_interval_ms: Optional[float] = None):
+        self.logger = get_logger(__name__)
+        config = get_config()
+        self.batch_size = int(batch_size or config.get("attendance.write_batch_size", 50))
+        interval_ms = flush_interval_ms or float(config.get("attendance.write_flush_interval_ms", 250))
+        self.flush_interval = interval_ms / 1000
+
+        self._pending: List[PendingMark] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._discard_listeners: List[Callable[[PendingMark], None]] = []
+
+        self.flushes = 0
+        self.rows_written = 0
+        self.errors = 0
+
+    def add(self, mark: PendingMark):
+        """Encolar una marca ya aceptada por el conjunto de trabajo"""
+        self._ensure_thread()
+        with self._lock:
+            self._pending.append(mark)
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        """
+        Escribir ahora todas las marcas pendientes
+
+        Returns:
+            Filas nuevas insertadas
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+
+            try:
+                written = self._write(batch)
+            except Exception as e:
+                self.errors += 1
+                if _is_transient(e):
+                    self._requeue(batch)
+                    self.logger.error(f"Base de datos no disponible, {len(batch)} asistencias quedan pendientes: {e}")
+                    return 0
+                self.logger.error(f"Error escribiendo {len(batch)} asistencias, se reintenta fila por fila: {e}")
+                written = self._write_one_by_one(batch)
+
+            self.flushes += 1
+            self.rows_written += len(written)
+            for mark, asistencia_id in written:
+                self._publish(mark, asistencia_id)
+            return len(written)
+
+    def on_discard(self, callback: Callable[[PendingMark], None]):
+        """Suscribirse a las marcas descartadas por un error permanente"""
+        self._discard_listeners.append(callback)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pendientes': pending,
+            'lotes': self.flushes,
+            'filas_escritas': self.rows_written,
+            'errores': self.errors
+        }
+
+    def close(self):
+        """Vaciar lo pendiente y detener el hilo (al salir del proceso)"""
+        self._stop.set()
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            self.logger.error(f"Asistencias pendientes sin escribir al cerrar: {e}")
+
+    def _ensure_thread(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                self.logger.error(f"Error en el buffer de asistencias: {e}")
+
+    def _write(self, batch: List[PendingMark]):
+        """INSERT multi-fila; devuelve [(marca, asistencia_id)] de las filas nuevas"""
+        import db_engine
+
+        batch = _unique(batch)
+        values = []
+        params = {}
+        for index, mark in enumerate(batch):
+            values.append(f"(:m{index}, :metodo{index}, 'presente', :notas{index})")
+            params[f'm{index}'] = mark.membresia_id
+            params[f'metodo{index}'] = mark.metodo
+            params[f'notas{index}'] = mark.notas
+
+        query = text(f"""
+            INSERT INTO asistencia_log (membresia_id, metodo_entrada, estado, notas)
+            VALUES {', '.join(values)}
+            ON CONFLICT (membresia_id, fecha) DO NOTHING
+            RETURNING id, membresia_id
+        """)
+        with db_engine.session_scope() as session:
+            rows = session.execute(query, params).fetchall()
+
+        ids = {int(row[1]): int(row[0]) for row in rows}
+        return [(mark, ids[mark.membresia_id]) for mark in batch if mark.membresia_id in ids]
+
+    def _write_one_by_one(self, batch: List[PendingMark]):
+        import db_engine
+
+        batch = _unique(batch)
+        written = []
+        retry = []
+        for mark in batch:
+            try:
+                with db_engine.session_scope() as session:
+                    asistencia_id = register_attendance(session, mark.membresia_id, mark.metodo, notas=mark.notas)
+                if asistencia_id is not None:
+                    written.append((mark, asistencia_id))
+            except Exception as e:
+                if _is_transient(e):
+                    retry.append(mark)
+                else:
+                    # Error permanente (integridad, datos): reintentar no sirve
+                    self._discard(mark, e)
+
+        if retry:
+            self._requeue(retry)
+            self.logger.error(f"{len(retry)} asistencias quedan pendientes para el siguiente intento")
+        return written
+
+    def _discard(self, mark: PendingMark, error: Exception):
+        self.logger.error(f"Asistencia descartada (membresía {mark.membresia_id}): {error}")
+        for callback in list(self._discard_listeners):
+            try:
+                callback(mark)
+            except Exception as e:
+                self.logger.error(f"Error notificando asistencia descartada: {e}")
+
+    def _requeue(self, marks: List[PendingMark]):
+        """Devolver marcas al frente de la cola para el siguiente intento"""
+        with self._lock:
+            self._pending[:0] = marks
+
+    def _publish(self, mark: PendingMark, asistencia_id: int):
+        from attendance_events import publish_attendance
+
+        publish_attendance(mark.equipo_id, asistencia_id, mark.usuario_id,
+                           mark.codigo_usuario, mark.nombre_completo, mark.metodo)
+
+
+def _is_transient(error: Exception) -> bool:
+    """Error de conexión o de la base de datos que vale la pena reintentar"""
+    if isinstance(error, (exc.OperationalError, exc.InterfaceError, exc.TimeoutError)):
+        return True
+    return isinstance(error, exc.DBAPIError) and error.connection_invalidated
+
+
+def _unique(batch: List[PendingMark]) -> List[PendingMark]:
+    """Primera marca de cada membresía (ON CONFLICT no admite dos en el mismo INSERT)"""
+    seen = set()
+    result = []
+    for mark in batch:
+        if mark.membresia_id not in seen:
+            seen.add(mark.membresia_id)
+            result.append(mark)
+    return result
+
+
+# Instancia singleton
+_buffer_instance = None
+_buffer_lock = threading.Lock()
+
+
+def get_write_buffer() -> AttendanceWriteBuffer:
+    """Obtener el buffer de asistencias compartido por el proceso"""
+    global _buffer_instance
+    if _buffer_instance is None:
+        with _buffer_lock:
+            if _buffer_instance is None:
+                _buffer_instance = AttendanceWriteBuffer()
+    return _buffer_instance
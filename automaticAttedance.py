@@ -11,6 +11,11 @@ import time
 import tkinter.ttk as tkk
 import tkinter.font as font
 
+from attendance_store import get_attendance_store
+from face_crop_store import normalize_face
+from face_detector_pool import detect_scaled
+from face_tracker import FaceTracker
+
 # Configuración del tema griego
 GREEK_BG = "#F8F4E3"           # Beige claro
 GREEK_CONTAINER = "#E6E1D4"     # Beige medio
@@ -120,6 +125,7 @@ def subjectChoose(text_to_speech):
                 font_cv = cv2.FONT_HERSHEY_SIMPLEX
                 col_names = ["Enrollment", "Name"]
                 attendance = pd.DataFrame(columns=col_names)
+                tracker = FaceTracker(threshold=70)
                 
                 text_to_speech("Iniciando toma de asistencia. Posiciónense frente a la cámara.")
                 
@@ -131,13 +137,17 @@ def subjectChoose(text_to_speech):
                             break
                         continue
                     gray = cv2.cvtColor(im, cv2.COLOR_BGR2GRAY)
-                    faces = facecasCade.detectMultiScale(gray, 1.2, 5)
-                    for (x, y, w, h) in faces:
+                    faces = detect_scaled(gray, classifier=facecasCade)
+                    # Sólo se reconocen las pistas nuevas o las que toca re-verificar
+                    for track, (x, y, w, h), needs_recognition in tracker.update(faces):
                         global Id
 
-                        Id, conf = recognizer.predict(gray[y : y + h, x : x + w])
-                        if conf < 70:
-                            print(conf)
+                        if needs_recognition:
+                            Id, conf = recognizer.predict(normalize_face(gray[y : y + h, x : x + w]))
+                            tracker.vote(track, Id, conf)
+                        # La identidad se confirma por votación sobre los frames de la pista
+                        if track.confirmed:
+                            Id = track.identity
                             global Subject
                             global aa
                             global date
@@ -153,10 +163,12 @@ def subjectChoose(text_to_speech):
                             aa = df.loc[df["Enrollment"] == Id]["Name"].values
                             global tt
                             tt = str(Id) + "-" + str(aa[0]) if len(aa) > 0 else str(Id)
-                            attendance.loc[len(attendance)] = [
-                                Id,
-                                aa[0] if len(aa) > 0 else "Desconocido",
-                            ]
+                            if Id not in attendance["Enrollment"].values:
+                                print(track.distance())
+                                attendance.loc[len(attendance)] = [
+                                    Id,
+                                    aa[0] if len(aa) > 0 else "Desconocido",
+                                ]
                             cv2.rectangle(im, (x, y), (x + w, y + h), (212, 184, 137), 4)
                             cv2.putText(
                                 im, str(tt), (x + h, y), font_cv, 1, (74, 74, 74), 4
@@ -205,6 +217,11 @@ def subjectChoose(text_to_speech):
                 attendance = attendance.drop_duplicates(["Enrollment"], keep="first")
                 print(attendance)
                 attendance.to_csv(fileName, index=False)
+                # Agregar la sesión al almacén columnar para los reportes
+                try:
+                    get_attendance_store().add_session_frame(Subject, fileName, attendance)
+                except Exception as e:
+                    print(f"No se pudo agregar la sesión al almacén: {e}")
 
                 m = "Asistencia registrada exitosamente para " + Subject
                 Notifica.configure(
@@ -10,22 +10,73 @@ import pandas as pd
 import datetime
 import time
 import os
+import threading
 from pathlib import Path
 
+from attendance_store import get_attendance_store
+from face_crop_store import normalize_face
+from face_detector_pool import detect_scaled, get_detector_pool
+from face_tracker import FaceTracker
+from utils.config_manager import get_config
+
 BASE_DIR = Path(__file__).parent
 HAARCASCADE_PATH = BASE_DIR / "haarcascade_frontalface_default.xml"
 TRAINING_LABEL_PATH = BASE_DIR / "TrainingImageLabel/Trainner.yml"
 STUDENT_DETAILS_PATH = BASE_DIR / "StudentDetails/studentdetails.csv"
 ATTENDANCE_PATH = BASE_DIR / "Attendance"
 
+
+class LatestFrame:
+    """
+    Buffer de un solo lugar con el último frame capturado
+
+    El hilo de captura sobrescribe el frame pendiente en lugar de
+    encolarlo: los workers siempre reciben el más reciente y los que
+    nadie alcanzó a procesar se descartan (se cuentan en `dropped`).
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._closed = False
+        self.captured = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self.captured += 1
+            self._cond.notify()
+
+    def take(self, timeout=0.5):
+        """Retirar el frame pendiente (None si no llegó ninguno o se cerró)"""
+        with self._cond:
+            if self._frame is None and not self._closed:
+                self._cond.wait(timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+
 class AttendanceRecognizer:
     def __init__(self):
         self.recognizer = None
-        self.face_cascade = None
         self.df_students = None
+        self.student_names = {}
         self.camera = None
         self.is_running = False
         self.recognized_students = []
+        self.workers = max(1, int(get_config().get("camera.recognition_workers", 2)))
         
     def initialize(self):
         """Inicializa el reconocedor y carga el modelo"""
@@ -65,14 +116,17 @@ class AttendanceRecognizer:
             
             self.recognizer.read(str(TRAINING_LABEL_PATH))
             
-            # Cargar Haar Cascade
-            self.face_cascade = cv2.CascadeClassifier(str(HAARCASCADE_PATH))
+            # Cargar Haar Cascade (cada worker toma su instancia del pool)
+            get_detector_pool().warm_up()
             
             # Cargar datos de estudiantes
             if not STUDENT_DETAILS_PATH.exists():
                 raise FileNotFoundError("Archivo de estudiantes no encontrado.")
             
             self.df_students = pd.read_csv(STUDENT_DETAILS_PATH)
+            self.student_names = dict(zip(
+                self.df_students["Enrollment"].astype(int), self.df_students["Name"]
+            ))
             
             return True
             
@@ -91,6 +145,8 @@ class AttendanceRecognizer:
                     self.camera = cv2.VideoCapture(0)
                 
                 if self.camera is not None and self.camera.isOpened():
+                    # Evitar que el driver acumule frames viejos
+                    self.camera.set(cv2.CAP_PROP_BUFFERSIZE, 1)
                     return True
             
             return False
@@ -118,50 +174,56 @@ class AttendanceRecognizer:
         self.is_running = True
         self.recognized_students = []
         
-        col_names = ["Enrollment", "Name"]
-        attendance = pd.DataFrame(columns=col_names)
+        # enrollment -> datos del reconocimiento; dict.setdefault es atómico,
+        # así que los workers deduplican sin tomar un lock
+        recognized = {}
+        slot = LatestFrame()
+        tracker = FaceTracker(threshold=70)
+        processed = [0] * self.workers
         
         start_time = time.time()
         end_time = start_time + duration
         
-        print(f"Iniciando reconocimiento para {subject} durante {duration} segundos...")
+        print(f"Iniciando reconocimiento para {subject} durante {duration} segundos "
+              f"({self.workers} workers)...")
+        
+        threads = [threading.Thread(target=self._grab_frames, args=(slot, end_time),
+                                    name="attendance-grabber", daemon=True)]
+        for index in range(self.workers):
+            threads.append(threading.Thread(
+                target=self._recognize_worker,
+                args=(slot, tracker, end_time, recognized, processed, index),
+                name=f"attendance-worker-{index + 1}", daemon=True
+            ))
         
         try:
-            while time.time() < end_time and self.is_running:
-                ret, frame = self.camera.read()
-                
-                if not ret or frame is None:
-                    continue
-                
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-                faces = self.face_cascade.detectMultiScale(gray, 1.2, 5)
-                
-                for (x, y, w, h) in faces:
-                    face_roi = gray[y:y+h, x:x+w]
-                    student_id, confidence = self.recognizer.predict(face_roi)
-                    
-                    # Umbral de confianza
-                    if confidence < 70:
-                        # Buscar nombre del estudiante
-                        student_data = self.df_students.loc[
-                            self.df_students["Enrollment"] == student_id
-                        ]
-                        
-                        if len(student_data) > 0:
-                            student_name = student_data["Name"].values[0]
-                            
-                            # Agregar si no está ya en la lista
-                            if student_id not in attendance["Enrollment"].values:
-                                attendance.loc[len(attendance)] = [student_id, student_name]
-                                self.recognized_students.append({
-                                    "id": int(student_id),
-                                    "name": student_name,
-                                    "confidence": float(confidence)
-                                })
-                                print(f"✅ Reconocido: {student_name} (ID: {student_id}, Conf: {confidence:.2f})")
-                
-                # Pequeña pausa para no saturar CPU
-                time.sleep(0.1)
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            
+            elapsed = max(time.time() - start_time, 1e-6)
+            frames = sum(processed)
+            fps = round(frames / elapsed, 2)
+            print(f"📊 {frames} frames procesados ({fps} FPS), "
+                  f"{slot.captured} capturados, {slot.dropped} descartados")
+            
+            self.recognized_students = sorted(recognized.values(), key=lambda s: s["order"])
+            for student in self.recognized_students:
+                del student["order"]
+            
+            col_names = ["Enrollment", "Name"]
+            attendance = pd.DataFrame(
+                [[s["id"], s["name"]] for s in self.recognized_students], columns=col_names
+            )
+            stats = {
+                "frames_processed": frames,
+                "frames_captured": slot.captured,
+                "frames_dropped": slot.dropped,
+                "fps": fps,
+                "workers": self.workers,
+                "tracking": tracker.stats()
+            }
             
             # Guardar asistencia
             if len(attendance) > 0:
@@ -183,6 +245,12 @@ class AttendanceRecognizer:
                 attendance = attendance.drop_duplicates(["Enrollment"], keep="first")
                 attendance.to_csv(filename, index=False)
                 
+                # Agregar la sesión al almacén columnar para los reportes
+                try:
+                    get_attendance_store().add_session_frame(subject, filename, attendance)
+                except Exception as e:
+                    print(f"⚠️ No se pudo agregar la sesión al almacén: {e}")
+                
                 print(f"✅ Asistencia guardada: {filename}")
                 print(f"Total reconocidos: {len(attendance)}")
                 
@@ -193,12 +261,14 @@ class AttendanceRecognizer:
                     "students": self.recognized_students,
                     "filename": str(filename),
                     "date": date,
-                    "time": timeStamp
+                    "time": timeStamp,
+                    "stats": stats
                 }
             else:
                 return {
                     "success": False,
-                    "error": "No se reconocieron estudiantes"
+                    "error": "No se reconocieron estudiantes",
+                    "stats": stats
                 }
                 
         except Exception as e:
@@ -208,8 +278,66 @@ class AttendanceRecognizer:
                 "error": str(e)
             }
         finally:
+            self.is_running = False
+            slot.close()
+            for thread in threads:
+                if thread.is_alive():
+                    thread.join()
             self.stop()
     
+    def _grab_frames(self, slot, end_time):
+        """Hilo de captura: lee la cámara sin pausas y deja sólo el último frame"""
+        try:
+            while time.time() < end_time and self.is_running:
+                ret, frame = self.camera.read()
+                if ret and frame is not None:
+                    slot.put(frame)
+        except Exception as e:
+            print(f"Error capturando frames: {e}")
+        finally:
+            slot.close()
+    
+    def _recognize_worker(self, slot, tracker, end_time, recognized, processed, index):
+        """Worker de reconocimiento: procesa el frame más reciente disponible"""
+        while time.time() < end_time and self.is_running:
+            frame = slot.take()
+            if frame is None:
+                if slot.closed:
+                    break
+                continue
+            
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            faces = detect_scaled(gray)
+            
+            # Sólo se reconocen las pistas nuevas o las que toca re-verificar
+            for track, (x, y, w, h), needs_recognition in tracker.update(faces):
+                if not needs_recognition:
+                    continue
+                
+                student_id, confidence = self.recognizer.predict(normalize_face(gray[y:y+h, x:x+w]))
+                
+                # La identidad se confirma por votación sobre los frames de la pista
+                if not tracker.vote(track, student_id, confidence):
+                    continue
+                
+                student_id = track.identity
+                student_name = self.student_names.get(student_id)
+                if student_name is None:
+                    continue
+                
+                distance = track.distance()
+                entry = {
+                    "id": student_id,
+                    "name": student_name,
+                    "confidence": float(distance),
+                    "order": time.monotonic()
+                }
+                # Sólo el primer worker que lo confirma lo registra
+                if recognized.setdefault(student_id, entry) is entry:
+                    print(f"✅ Reconocido: {student_name} (ID: {student_id}, Conf: {distance:.2f})")
+            
+            processed[index] += 1
+    
     def stop(self):
         """Detiene el reconocimiento y libera recursos"""
         self.is_running = False
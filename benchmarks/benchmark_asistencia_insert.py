@@ -0,0 +1,157 @@
+"""
+CLASS VISION - Benchmark de INSERT en asistencia_log
+Compara la latencia por inserción con el trigger de estadísticas
+anterior (tres COUNT(*) sobre todo el historial de la membresía) y con
+el incremental (delta desde NEW) para distintos tamaños de historial.
+
+Todo ocurre dentro de una transacción que se revierte al final: no deja
+datos ni cambia las funciones instaladas. Requiere la migración
+migrations/002_estadisticas_incrementales.sql.
+
+Uso:
+    python benchmarks/benchmark_asistencia_insert.py --historial 100 1000 5000 --inserciones 200
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import text
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import db_engine  # noqa: E402
+
+
+# Cuerpo del trigger antes de la migración 002
+TRIGGER_ANTERIOR = text("""
+    CREATE OR REPLACE FUNCTION trigger_actualizar_estadisticas()
+    RETURNS TRIGGER AS $$
+    BEGIN
+        UPDATE membresias m
+        SET
+            asistencias_totales = (
+                SELECT COUNT(*) FROM asistencia_log a
+                WHERE a.membresia_id = NEW.membresia_id
+                AND a.estado IN ('presente', 'tarde')
+            ),
+            faltas_totales = (
+                SELECT COUNT(*) FROM asistencia_log a
+                WHERE a.membresia_id = NEW.membresia_id
+                AND a.estado = 'ausente'
+            ),
+            porcentaje_asistencia = (
+                SELECT CASE
+                    WHEN COUNT(*) > 0 THEN
+                        (COUNT(*) FILTER (WHERE estado IN ('presente', 'tarde'))::DECIMAL / COUNT(*) * 100)
+                    ELSE 0
+                END
+                FROM asistencia_log a
+                WHERE a.membresia_id = NEW.membresia_id
+            )
+        WHERE m.id = NEW.membresia_id;
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql
+""")
+
+INSERT_ASISTENCIA = text("""
+    INSERT INTO asistencia_log (membresia_id, fecha, metodo_entrada, estado)
+    VALUES (:membresia_id, CURRENT_DATE + :dias, 'manual', 'presente')
+""")
+
+
+def crear_membresia(conn) -> int:
+    """Usuario, equipo y membresía desechables para la medición"""
+    sufijo = uuid.uuid4().hex[:10]
+    usuario_id = conn.execute(text("""
+        INSERT INTO usuarios (codigo_usuario, nombre_completo, email, password_hash)
+        VALUES (:codigo, 'Benchmark', :email, 'x')
+        RETURNING id
+    """), {'codigo': f'BENCH-{sufijo}', 'email': f'bench-{sufijo}@example.com'}).scalar()
+    equipo_id = conn.execute(text("""
+        INSERT INTO equipos (nombre_equipo, tipo_equipo, codigo_invitacion, creador_id)
+        VALUES ('Benchmark', 'otro', :codigo, :creador)
+        RETURNING id
+    """), {'codigo': f'B-{sufijo}', 'creador': usuario_id}).scalar()
+    return conn.execute(text("""
+        INSERT INTO membresias (usuario_id, equipo_id)
+        VALUES (:usuario, :equipo)
+        RETURNING id
+    """), {'usuario': usuario_id, 'equipo': equipo_id}).scalar()
+
+
+def cargar_historial(conn, membresia_id: int, filas: int):
+    """Historial de `filas` días anteriores (cargado con el trigger incremental)"""
+    conn.execute(text("""
+        INSERT INTO asistencia_log (membresia_id, fecha, metodo_entrada, estado)
+        SELECT :membresia_id, CURRENT_DATE - g, 'manual',
+               CASE WHEN g % 5 = 0 THEN 'ausente' ELSE 'presente' END
+        FROM generate_series(1, :filas) AS g
+    """), {'membresia_id': membresia_id, 'filas': filas})
+
+
+def medir(conn, membresia_id: int, inserciones: int):
+    """Latencias (ms) de `inserciones` INSERT sueltos, revertidos al terminar"""
+    latencias = []
+    savepoint = conn.begin_nested()
+    try:
+        for dias in range(1, inserciones + 1):
+            inicio = time.perf_counter()
+            conn.execute(INSERT_ASISTENCIA, {'membresia_id': membresia_id, 'dias': dias})
+            latencias.append((time.perf_counter() - inicio) * 1000)
+    finally:
+        savepoint.rollback()
+    return latencias
+
+
+def resumen(latencias):
+    ordenadas = sorted(latencias)
+    return {
+        'media': statistics.mean(ordenadas),
+        'p50': ordenadas[len(ordenadas) // 2],
+        'p95': ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * 0.95))]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia de INSERT en asistencia_log: trigger anterior vs incremental")
+    parser.add_argument('--historial', type=int, nargs='+', default=[100, 1000, 5000],
+                        help="Filas previas de la membresía (una medición por valor)")
+    parser.add_argument('--inserciones', type=int, default=200, help="INSERT medidos por variante")
+    args = parser.parse_args()
+
+    engine = db_engine.get_engine()
+    with engine.connect() as conn:
+        transaccion = conn.begin()
+        try:
+            if conn.execute(text("SELECT to_regproc('ajustar_estadisticas_membresia')")).scalar() is None:
+                print("❌ Falta la migración migrations/002_estadisticas_incrementales.sql")
+                return 1
+
+            print(f"{'historial':>10} {'variante':>12} {'media ms':>10} {'p50 ms':>8} {'p95 ms':>8}")
+            for filas in args.historial:
+                membresia_id = crear_membresia(conn)
+                cargar_historial(conn, membresia_id, filas)
+
+                incremental = resumen(medir(conn, membresia_id, args.inserciones))
+
+                # El reemplazo del trigger se revierte con el savepoint
+                savepoint = conn.begin_nested()
+                conn.execute(TRIGGER_ANTERIOR)
+                anterior = resumen(medir(conn, membresia_id, args.inserciones))
+                savepoint.rollback()
+
+                for nombre, datos in (('anterior', anterior), ('incremental', incremental)):
+                    print(f"{filas:>10} {nombre:>12} {datos['media']:>10.3f} {datos['p50']:>8.3f} {datos['p95']:>8.3f}")
+                print(f"{'':>10} {'aceleración':>12} {anterior['media'] / incremental['media']:>9.1f}x")
+        finally:
+            transaccion.rollback()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -89,6 +89,7 @@ CREATE TABLE membresias (
     puntos_equipo INTEGER DEFAULT 0,  -- Puntos específicos en este equipo
     asistencias_totales INTEGER DEFAULT 0,
     faltas_totales INTEGER DEFAULT 0,
+    registros_totales INTEGER DEFAULT 0,  -- Filas de asistencia_log (base del porcentaje)
     porcentaje_asistencia DECIMAL(5,2) DEFAULT 0.00,
     
     UNIQUE(usuario_id, equipo_id),
@@ -122,10 +123,29 @@ CREATE TABLE asistencia_log (
     CONSTRAINT asistencia_estado_check CHECK (estado IN ('presente', 'tarde', 'ausente', 'justificado'))
 );
 
-CREATE INDEX idx_asistencia_membresia ON asistencia_log(membresia_id);
+-- Una asistencia por membresía y día; permite INSERT ... ON CONFLICT DO NOTHING
+-- (también cubre las búsquedas por membresia_id)
+CREATE UNIQUE INDEX uq_asistencia_membresia_fecha ON asistencia_log(membresia_id, fecha);
 CREATE INDEX idx_asistencia_fecha ON asistencia_log(fecha);
 CREATE INDEX idx_asistencia_estado ON asistencia_log(estado);
 
+-- =====================================================
+-- 4.1 ESTADÍSTICAS DIARIAS POR EQUIPO (resumen de asistencia_log)
+-- =====================================================
+-- Una fila por equipo y día; el trigger de asistencia_log la mantiene por
+-- deltas y reconstruir_estadisticas_diarias la recalcula desde el log
+CREATE TABLE estadisticas_diarias_equipo (
+    equipo_id INTEGER NOT NULL REFERENCES equipos(id) ON DELETE CASCADE,
+    fecha DATE NOT NULL,
+    registros INTEGER NOT NULL DEFAULT 0,
+    presentes INTEGER NOT NULL DEFAULT 0,
+    tardes INTEGER NOT NULL DEFAULT 0,
+    ausentes INTEGER NOT NULL DEFAULT 0,
+    justificados INTEGER NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (equipo_id, fecha)
+);
+
 -- =====================================================
 -- 5. TABLA DE CÓDIGOS TEMPORALES (QR)
 -- =====================================================
@@ -341,48 +361,183 @@ BEGIN
 END;
 $$ LANGUAGE plpgsql;
 
--- Función para actualizar estadísticas de membresía
+-- Función para recalcular desde cero las estadísticas de una membresía
+-- (sólo reconciliación y migraciones; el trigger usa ajustar_estadisticas_membresia)
 CREATE OR REPLACE FUNCTION actualizar_estadisticas_membresia(p_membresia_id INTEGER)
 RETURNS VOID AS $$
 BEGIN
     UPDATE membresias m
     SET 
-        asistencias_totales = (
-            SELECT COUNT(*) 
-            FROM asistencia_log a 
-            WHERE a.membresia_id = p_membresia_id 
-            AND a.estado IN ('presente', 'tarde')
-        ),
-        faltas_totales = (
-            SELECT COUNT(*) 
-            FROM asistencia_log a 
-            WHERE a.membresia_id = p_membresia_id 
-            AND a.estado = 'ausente'
-        ),
-        porcentaje_asistencia = (
-            SELECT CASE 
-                WHEN COUNT(*) > 0 THEN 
-                    (COUNT(*) FILTER (WHERE estado IN ('presente', 'tarde'))::DECIMAL / COUNT(*) * 100)
-                ELSE 0 
-            END
-            FROM asistencia_log a 
-            WHERE a.membresia_id = p_membresia_id
-        )
+        registros_totales = r.registros,
+        asistencias_totales = r.asistencias,
+        faltas_totales = r.faltas,
+        porcentaje_asistencia = CASE 
+            WHEN r.registros > 0 THEN r.asistencias::DECIMAL / r.registros * 100
+            ELSE 0 
+        END
+    FROM (
+        SELECT 
+            COUNT(*) AS registros,
+            COUNT(*) FILTER (WHERE estado IN ('presente', 'tarde')) AS asistencias,
+            COUNT(*) FILTER (WHERE estado = 'ausente') AS faltas
+        FROM asistencia_log a 
+        WHERE a.membresia_id = p_membresia_id
+    ) r
     WHERE m.id = p_membresia_id;
 END;
 $$ LANGUAGE plpgsql;
 
--- Trigger para actualizar estadísticas automáticamente
+-- Función para sumar (p_signo = 1) o restar (p_signo = -1) una fila de
+-- asistencia a las estadísticas, sin recorrer el historial
+CREATE OR REPLACE FUNCTION ajustar_estadisticas_membresia(
+    p_membresia_id INTEGER, p_estado VARCHAR, p_signo INTEGER
+)
+RETURNS VOID AS $$
+DECLARE
+    d_asistencias INTEGER := CASE WHEN p_estado IN ('presente', 'tarde') THEN p_signo ELSE 0 END;
+    d_faltas INTEGER := CASE WHEN p_estado = 'ausente' THEN p_signo ELSE 0 END;
+BEGIN
+    -- Todas las expresiones del SET leen los valores previos de la fila
+    UPDATE membresias m
+    SET 
+        registros_totales = COALESCE(m.registros_totales, 0) + p_signo,
+        asistencias_totales = COALESCE(m.asistencias_totales, 0) + d_asistencias,
+        faltas_totales = COALESCE(m.faltas_totales, 0) + d_faltas,
+        porcentaje_asistencia = CASE 
+            WHEN COALESCE(m.registros_totales, 0) + p_signo > 0 THEN 
+                (COALESCE(m.asistencias_totales, 0) + d_asistencias)::DECIMAL
+                / (COALESCE(m.registros_totales, 0) + p_signo) * 100
+            ELSE 0 
+        END
+    WHERE m.id = p_membresia_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Función para corregir la deriva de una membresía (job de reconciliación)
+-- Bloquea la fila antes de contar: un INSERT concurrente espera y aplica
+-- su delta sobre el valor corregido. Devuelve TRUE si había diferencias.
+CREATE OR REPLACE FUNCTION reconciliar_estadisticas_membresia(p_membresia_id INTEGER)
+RETURNS BOOLEAN AS $$
+DECLARE
+    guardado RECORD;
+    conteo RECORD;
+BEGIN
+    SELECT registros_totales, asistencias_totales, faltas_totales
+    INTO guardado
+    FROM membresias WHERE id = p_membresia_id
+    FOR UPDATE;
+    
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+    
+    SELECT 
+        COUNT(*) AS registros,
+        COUNT(*) FILTER (WHERE estado IN ('presente', 'tarde')) AS asistencias,
+        COUNT(*) FILTER (WHERE estado = 'ausente') AS faltas
+    INTO conteo
+    FROM asistencia_log WHERE membresia_id = p_membresia_id;
+    
+    IF guardado.registros_totales IS NOT DISTINCT FROM conteo.registros::INTEGER
+       AND guardado.asistencias_totales IS NOT DISTINCT FROM conteo.asistencias::INTEGER
+       AND guardado.faltas_totales IS NOT DISTINCT FROM conteo.faltas::INTEGER THEN
+        RETURN FALSE;
+    END IF;
+    
+    PERFORM actualizar_estadisticas_membresia(p_membresia_id);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Función para sumar (p_signo = 1) o restar (p_signo = -1) una fila de
+-- asistencia al resumen diario de su equipo
+CREATE OR REPLACE FUNCTION ajustar_estadisticas_diarias(
+    p_membresia_id INTEGER, p_fecha DATE, p_estado VARCHAR, p_signo INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    -- Si la membresía ya no existe (borrado en cascada) no hay equipo que
+    -- ajustar; la reconstrucción periódica corrige esos días
+    INSERT INTO estadisticas_diarias_equipo AS d (
+        equipo_id, fecha, registros, presentes, tardes, ausentes, justificados
+    )
+    SELECT 
+        m.equipo_id, p_fecha, p_signo,
+        CASE WHEN p_estado = 'presente' THEN p_signo ELSE 0 END,
+        CASE WHEN p_estado = 'tarde' THEN p_signo ELSE 0 END,
+        CASE WHEN p_estado = 'ausente' THEN p_signo ELSE 0 END,
+        CASE WHEN p_estado = 'justificado' THEN p_signo ELSE 0 END
+    FROM membresias m WHERE m.id = p_membresia_id
+    ON CONFLICT (equipo_id, fecha) DO UPDATE SET 
+        registros = d.registros + EXCLUDED.registros,
+        presentes = d.presentes + EXCLUDED.presentes,
+        tardes = d.tardes + EXCLUDED.tardes,
+        ausentes = d.ausentes + EXCLUDED.ausentes,
+        justificados = d.justificados + EXCLUDED.justificados;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Función para recalcular el resumen diario desde asistencia_log, desde
+-- p_desde o completo si es NULL. Bloquea el resumen mientras tanto: los
+-- INSERT concurrentes esperan y aplican su delta sobre lo reconstruido.
+-- Devuelve las filas (equipo, día) escritas.
+CREATE OR REPLACE FUNCTION reconstruir_estadisticas_diarias(p_desde DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    LOCK TABLE estadisticas_diarias_equipo IN EXCLUSIVE MODE;
+    
+    DELETE FROM estadisticas_diarias_equipo
+    WHERE p_desde IS NULL OR fecha >= p_desde;
+    
+    INSERT INTO estadisticas_diarias_equipo (
+        equipo_id, fecha, registros, presentes, tardes, ausentes, justificados
+    )
+    SELECT 
+        m.equipo_id,
+        a.fecha,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE a.estado = 'presente'),
+        COUNT(*) FILTER (WHERE a.estado = 'tarde'),
+        COUNT(*) FILTER (WHERE a.estado = 'ausente'),
+        COUNT(*) FILTER (WHERE a.estado = 'justificado')
+    FROM asistencia_log a
+    JOIN membresias m ON a.membresia_id = m.id
+    WHERE p_desde IS NULL OR a.fecha >= p_desde
+    GROUP BY m.equipo_id, a.fecha;
+    
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger para actualizar estadísticas automáticamente (deltas desde OLD/NEW):
+-- las de la membresía y el resumen diario de su equipo
 CREATE OR REPLACE FUNCTION trigger_actualizar_estadisticas()
 RETURNS TRIGGER AS $$
 BEGIN
-    PERFORM actualizar_estadisticas_membresia(NEW.membresia_id);
-    RETURN NEW;
+    IF TG_OP = 'UPDATE'
+       AND OLD.membresia_id = NEW.membresia_id
+       AND OLD.fecha = NEW.fecha
+       AND OLD.estado IS NOT DISTINCT FROM NEW.estado THEN
+        RETURN NULL;
+    END IF;
+    
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM ajustar_estadisticas_membresia(OLD.membresia_id, OLD.estado, -1);
+        PERFORM ajustar_estadisticas_diarias(OLD.membresia_id, OLD.fecha, OLD.estado, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM ajustar_estadisticas_membresia(NEW.membresia_id, NEW.estado, 1);
+        PERFORM ajustar_estadisticas_diarias(NEW.membresia_id, NEW.fecha, NEW.estado, 1);
+    END IF;
+    RETURN NULL;
 END;
 $$ LANGUAGE plpgsql;
 
 CREATE TRIGGER trg_asistencia_estadisticas
-AFTER INSERT OR UPDATE ON asistencia_log
+AFTER INSERT OR DELETE OR UPDATE OF membresia_id, estado, fecha ON asistencia_log
 FOR EACH ROW
 EXECUTE FUNCTION trigger_actualizar_estadisticas();
 
@@ -394,6 +549,7 @@ COMMENT ON TABLE usuarios IS 'Tabla unificada de todos los usuarios del sistema'
 COMMENT ON TABLE equipos IS 'Equipos, clases o grupos creados por usuarios';
 COMMENT ON TABLE membresias IS 'Relación N:N entre usuarios y equipos con roles';
 COMMENT ON TABLE asistencia_log IS 'Registro de asistencias vinculado a membresías';
+COMMENT ON TABLE estadisticas_diarias_equipo IS 'Resumen de asistencia por equipo y día (mantenido por trigger)';
 
 -- =====================================================
 -- FIN DEL SCRIPT
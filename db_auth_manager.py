@@ -12,10 +12,14 @@ from dotenv import load_dotenv
 from database_models import (
     DatabaseManager, PersonalAdmin, SesionActiva, Materia
 )
+from token_cache import get_token_cache
 
 load_dotenv()
 
 class DBAuthManager:
+    # Ámbito de este gestor dentro de la caché de tokens compartida
+    CACHE_SCOPE = 'personal'
+    
     def __init__(self):
         self.db = DatabaseManager(os.getenv('DATABASE_URL'))
         
@@ -154,6 +158,7 @@ class DBAuthManager:
     
     def logout(self, token):
         """Cierra sesión"""
+        get_token_cache().invalidate(token)
         session = self.db.get_session()
         
         try:
@@ -172,6 +177,11 @@ class DBAuthManager:
     
     def validate_token(self, token):
         """Valida un token de sesión y retorna datos del usuario"""
+        cache = get_token_cache()
+        cached = cache.get(token, self.CACHE_SCOPE)
+        if cached is not None:
+            return cached
+        
         session = self.db.get_session()
         
         try:
@@ -194,13 +204,15 @@ class DBAuthManager:
             if user and user.activo:
                 materias = [m.nombre for m in user.materias]
                 
-                return {
+                user_data = {
                     "id": user.id,
                     "username": user.username,
                     "full_name": user.full_name,
                     "role": user.rol,
                     "subjects": materias
                 }
+                cache.put(token, user_data, sesion.fecha_expiracion, self.CACHE_SCOPE)
+                return user_data
             
             return None
             
@@ -280,6 +292,11 @@ class DBAuthManager:
                     materia.id_docente = user.id
             
             session.commit()
+            
+            # Los tokens cacheados de este docente llevan su lista de materias
+            get_token_cache().invalidate_matching(
+                self.CACHE_SCOPE, lambda data: data.get('username') == username
+            )
             return True
             
         except Exception as e:
@@ -0,0 +1,365 @@
+"""
+CLASS VISION - Almacén de Recortes Faciales
+Los rostros se detectan y normalizan (200x200 en gris) una sola vez, al
+guardar las fotos, y se empaquetan por usuario en un .npz. El
+entrenamiento carga arrays contiguos sin decodificar JPEG ni volver a
+ejecutar detectMultiScale
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from face_detector_pool import detect_scaled
+from utils.config_manager import get_config
+from utils.logger import get_logger
+
+
+CROP_DIR = Path('TrainingImageLabel') / 'crops'
+FACE_SIZE = (200, 200)
+
+# Espacios de nombres: cada flujo de registro usa claves distintas
+NS_USUARIOS = 'usuarios'          # TrainingImage/{codigo_usuario}/*.jpg
+NS_ESTUDIANTES = 'estudiantes'    # TrainingImage/{nombre}_{enrollment}_{n}.jpg
+NS_ESCRITORIO = 'escritorio'      # TrainingImage/{enrollment}_{nombre}/*.jpg (takeImage)
+
+
+def normalize_face(face_roi) -> np.ndarray:
+    """Llevar un recorte en gris al tamaño común de entrenamiento"""
+    import cv2
+
+    if face_roi.shape[:2] == (FACE_SIZE[1], FACE_SIZE[0]):
+        return np.ascontiguousarray(face_roi, dtype=np.uint8)
+    return cv2.resize(face_roi, FACE_SIZE)
+
+
+def crops_from_image(img, detect: bool = True) -> List[np.ndarray]:
+    """
+    Recortes normalizados de una imagen ya decodificada
+
+    Args:
+        img: Imagen BGR o en gris
+        detect: False si la imagen ya es el recorte del rostro (takeImage)
+    """
+    import cv2
+
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+    if not detect:
+        return [normalize_face(gray)]
+    return [normalize_face(gray[y:y+h, x:x+w]) for (x, y, w, h) in detect_scaled(gray)]
+
+
+def crops_from_files(image_paths: Iterable[Path], detect: bool = True) -> Tuple[List[np.ndarray], List[str], List[str]]:
+    """
+    Decodificar fotos guardadas y extraer sus recortes
+
+    Returns:
+        (recortes, foto de origen de cada recorte, fotos sin rostro)
+    """
+    import cv2
+
+    crops, sources, empty = [], [], []
+    for image_path in image_paths:
+        img = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
+        found = crops_from_image(img, detect) if img is not None else []
+        if not found:
+            empty.append(Path(image_path).name)
+        for crop in found:
+            crops.append(crop)
+            sources.append(Path(image_path).name)
+    return crops, sources, empty
+
+
+def training_workers(workers: Optional[int] = None) -> int:
+    """
+    Procesos de extracción: argumento o training.server_workers
+
+    None es el caso del servidor (peticiones y cola de entrenamiento), que
+    por defecto extrae en el propio proceso; 0 = todos los núcleos, para
+    la línea de comandos (face_training.py, ver training.workers)
+    """
+    if workers is None:
+        workers = int(get_config().get("training.server_workers", 1))
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _init_worker():
+    # Cada proceso usa un núcleo; evita que OpenCV lance sus propios hilos
+    import cv2
+    cv2.setNumThreads(1)
+
+
+def _extract_chunk(task):
+    paths, detect = task
+    return crops_from_files(paths, detect)
+
+
+def extract_parallel(groups: List[List[Path]], detect: bool = True,
+                     workers: Optional[int] = None) -> List[Tuple[List, List[str], List[str]]]:
+    """
+    Extraer recortes de varios grupos de fotos en un pool de procesos
+
+    Cada grupo (las fotos de un estudiante) se reparte en bloques que
+    nunca mezclan estudiantes; así un único directorio grande también
+    se reparte entre núcleos. El resultado conserva el orden de entrada.
+
+    Los procesos se crean con "spawn": un fork del servidor (con hilos)
+    copiaría locks tomados (logging, DetectorPool...) y el hijo podría
+    quedar bloqueado para siempre.
+
+    Args:
+        groups: Fotos por estudiante
+        detect: Detectar el rostro (False si las fotos ya son recortes)
+        workers: Procesos a usar (None = training.server_workers)
+
+    Returns:
+        Por grupo: (recortes, foto de origen de cada recorte, fotos sin rostro)
+    """
+    workers = training_workers(workers)
+    total = sum(len(group) for group in groups)
+    if workers <= 1 or total < 2:
+        return [crops_from_files(group, detect) for group in groups]
+
+    # Varios bloques por proceso para repartir bien directorios desiguales
+    chunk_size = max(1, math.ceil(total / (workers * 4)))
+    tasks, owners = [], []
+    for index, group in enumerate(groups):
+        group = [str(p) for p in group]
+        for start in range(0, len(group), chunk_size):
+            tasks.append((group[start:start + chunk_size], detect))
+            owners.append(index)
+
+    results = [([], [], []) for _ in groups]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), initializer=_init_worker,
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        for index, (crops, sources, empty) in zip(owners, pool.map(_extract_chunk, tasks)):
+            results[index][0].extend(crops)
+            results[index][1].extend(sources)
+            results[index][2].extend(empty)
+    return results
+
+
+class FaceCropStore:
+    """
+    Recortes por (espacio, clave) en {espacio}/{clave}.npz
+
+    Cada archivo guarda tres arrays alineados: crops (N, 200, 200) uint8,
+    labels (N,) int32 y sources (N,) con el nombre de la foto de origen,
+    más empty con las fotos en las que no se detectó rostro (para no
+    volver a decodificarlas). Volver a guardar una foto con el mismo
+    nombre reemplaza sus recortes, así que la ingesta es idempotente.
+    """
+
+    def __init__(self, root: Path = CROP_DIR):
+        self.logger = get_logger(__name__)
+        self.root = Path(root)
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def path(self, namespace: str, key) -> Path:
+        return self.root / namespace / f"{key}.npz"
+
+    def _lock(self, namespace: str, key) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get((namespace, str(key)))
+            if lock is None:
+                lock = self._locks[(namespace, str(key))] = threading.Lock()
+            return lock
+
+    def _read(self, path: Path):
+        if not path.exists():
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return (data['crops'], data['labels'], [str(s) for s in data['sources']],
+                    [str(s) for s in data['empty']])
+
+    def _write(self, path: Path, crops: np.ndarray, labels: np.ndarray,
+               sources: List[str], empty: List[str]):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.stem}.tmp.npz")
+        np.savez(tmp_path, crops=crops, labels=labels,
+                 sources=np.array(sources, dtype=str), empty=np.array(empty, dtype=str))
+        os.replace(tmp_path, path)
+
+    def load(self, namespace: str, key) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Cargar los recortes y etiquetas de una clave
+
+        Returns:
+            (crops (N, 200, 200) uint8, labels (N,) int32) o None si no hay
+        """
+        stored = self._read(self.path(namespace, key))
+        if stored is None:
+            return None
+        return stored[0], stored[1]
+
+    def add(self, namespace: str, key, crops: List[np.ndarray], label: int,
+            sources: List[str], empty: Iterable[str] = ()) -> int:
+        """
+        Agregar recortes recién extraídos (momento de la ingesta)
+
+        Args:
+            crops: Recortes normalizados
+            label: Etiqueta de entrenamiento de la clave
+            sources: Foto de origen de cada recorte
+            empty: Fotos guardadas en las que no se detectó rostro
+
+        Returns:
+            Total de recortes guardados para la clave
+        """
+        path = self.path(namespace, key)
+        empty = list(empty)
+        with self._lock(namespace, key):
+            stored = self._read(path)
+            new_sources = set(sources) | set(empty)
+            if stored is not None:
+                keep = [i for i, s in enumerate(stored[2]) if s not in new_sources]
+                old_crops = stored[0][keep]
+                old_labels = stored[1][keep]
+                old_sources = [stored[2][i] for i in keep]
+                old_empty = [s for s in stored[3] if s not in new_sources]
+            else:
+                old_crops = np.empty((0, FACE_SIZE[1], FACE_SIZE[0]), dtype=np.uint8)
+                old_labels = np.empty(0, dtype=np.int32)
+                old_sources = []
+                old_empty = []
+
+            if crops:
+                new_crops = np.stack(crops).astype(np.uint8, copy=False)
+            else:
+                new_crops = np.empty((0, FACE_SIZE[1], FACE_SIZE[0]), dtype=np.uint8)
+
+            all_crops = np.concatenate([old_crops, new_crops])
+            all_labels = np.concatenate([old_labels, np.full(len(crops), label, dtype=np.int32)])
+            self._write(path, all_crops, all_labels, old_sources + list(sources), old_empty + empty)
+            return len(all_crops)
+
+    def missing(self, namespace: str, key, image_paths: Iterable[Path]) -> List[Path]:
+        """Fotos de la clave que todavía no tienen recorte guardado"""
+        stored = self._read(self.path(namespace, key))
+        known = set(stored[2]) | set(stored[3]) if stored is not None else set()
+        return [Path(p) for p in image_paths if Path(p).name not in known]
+
+    def sync_many(self, namespace: str, items: Iterable[Tuple], detect: bool = True,
+                  workers: Optional[int] = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        sync() de varias claves con la extracción pendiente en paralelo
+
+        Args:
+            items: Tuplas (clave, fotos, etiqueta), una por estudiante
+            workers: Procesos para decodificar/detectar (None = training.server_workers)
+
+        Returns:
+            (crops, labels) por clave, en el orden de items
+        """
+        items = [(key, [Path(p) for p in paths], label) for key, paths, label in items]
+        pending = [self.missing(namespace, key, paths) for key, paths, _ in items]
+        if any(pending):
+            prefetched = extract_parallel(pending, detect, workers)
+        else:
+            prefetched = [None] * len(items)
+        return [
+            self.sync(namespace, key, paths, label, detect, prefetched=extracted)
+            for (key, paths, label), extracted in zip(items, prefetched)
+        ]
+
+    def sync(self, namespace: str, key, image_paths: Iterable[Path], label: int,
+             detect: bool = True, prefetched: Optional[Tuple] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recortes de una clave consistentes con sus fotos en disco
+
+        Sólo se decodifican las fotos que aún no están en el almacén
+        (datos anteriores a la ingesta con recortes); las que ya no
+        existen se descartan. La etiqueta se reescribe si cambió.
+
+        Args:
+            prefetched: Resultado de extract_parallel() para esta clave
+
+        Returns:
+            (crops, labels) listos para train()/update()
+        """
+        image_paths = [Path(p) for p in image_paths]
+        names = {p.name for p in image_paths}
+        path = self.path(namespace, key)
+
+        with self._lock(namespace, key):
+            stored = self._read(path)
+            if stored is None:
+                crops = np.empty((0, FACE_SIZE[1], FACE_SIZE[0]), dtype=np.uint8)
+                sources: List[str] = []
+                empty: List[str] = []
+            else:
+                keep = [i for i, s in enumerate(stored[2]) if s in names]
+                crops = stored[0][keep]
+                sources = [stored[2][i] for i in keep]
+                empty = [s for s in stored[3] if s in names]
+
+            known = set(sources) | set(empty)
+            missing = [p for p in image_paths if p.name not in known]
+            new_crops, new_sources, new_empty = [], [], []
+            if prefetched is not None:
+                wanted = {p.name for p in missing}
+                for crop, source in zip(prefetched[0], prefetched[1]):
+                    if source in wanted:
+                        new_crops.append(crop)
+                        new_sources.append(source)
+                new_empty = [s for s in prefetched[2] if s in wanted]
+                covered = set(new_sources) | set(new_empty)
+                missing_rest = [p for p in missing if p.name not in covered]
+            else:
+                missing_rest = missing
+            if missing_rest:
+                rest_crops, rest_sources, rest_empty = crops_from_files(missing_rest, detect)
+                new_crops += rest_crops
+                new_sources += rest_sources
+                new_empty += rest_empty
+            if new_crops:
+                crops = np.concatenate([crops, np.stack(new_crops)])
+                sources = sources + new_sources
+            empty = empty + new_empty
+
+            labels = np.full(len(crops), label, dtype=np.int32)
+            changed = (
+                stored is None or bool(missing)
+                or len(sources) != len(stored[2]) or len(empty) != len(stored[3])
+                or (len(stored[1]) > 0 and int(stored[1][0]) != int(label))
+            )
+            if changed and (sources or empty or stored is not None):
+                self._write(path, crops, labels, sources, empty)
+                if missing:
+                    self.logger.info(f"Recortes {namespace}/{key}: {len(new_crops)} nuevos de {len(missing)} fotos")
+            return crops, labels
+
+    def remove(self, namespace: str, key):
+        """Eliminar los recortes de una clave (bajas)"""
+        with self._lock(namespace, key):
+            path = self.path(namespace, key)
+            if path.exists():
+                path.unlink()
+
+    def keys(self, namespace: str) -> List[str]:
+        folder = self.root / namespace
+        if not folder.exists():
+            return []
+        return [p.stem for p in folder.glob('*.npz') if not p.stem.endswith('.tmp')]
+
+
+# Instancia singleton
+_store_instance = None
+_store_lock = threading.Lock()
+
+
+def get_crop_store() -> FaceCropStore:
+    """Obtener el almacén de recortes compartido"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                _store_instance = FaceCropStore()
+    return _store_instance
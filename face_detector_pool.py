@@ -0,0 +1,233 @@
+"""
+CLASS VISION - Pool de Detectores Haar
+Lee cada cascada XML una sola vez por proceso y presta a cada hilo su
+propia instancia de cv2.CascadeClassifier (no son seguras entre hilos)
+"""
+
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from utils.config_manager import get_config
+from utils.exceptions import ModelError
+from utils.logger import get_logger
+
+
+BASE_DIR = Path(__file__).parent
+DEFAULT_CASCADE = 'haarcascade_frontalface_default.xml'
+_MIN_WINDOW = 24
+
+
+class DetectorPool:
+    """
+    Pool de clasificadores Haar indexado por nombre de cascada
+
+    El servidor Flask crea un hilo por petición, por lo que las
+    instancias no se atan a un hilo concreto: cada petición toma una
+    instancia libre y la devuelve al terminar. Sólo se construyen
+    instancias nuevas cuando todas las existentes están en uso, a partir
+    del XML ya leído en memoria.
+    """
+
+    def __init__(self):
+        self.logger = get_logger(__name__)
+        self._xml: Dict[str, str] = {}
+        self._free: Dict[str, List] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.acquired = 0
+
+    def cascade_path(self, name: str) -> Path:
+        """Ubicar la cascada en el proyecto o en los datos de OpenCV"""
+        local_path = BASE_DIR / name
+        if local_path.exists():
+            return local_path
+
+        import cv2
+        return Path(cv2.data.haarcascades) / name
+
+    @contextmanager
+    def acquire(self, name: str = DEFAULT_CASCADE):
+        """
+        Tomar prestado un clasificador para uso exclusivo del hilo actual
+
+        Args:
+            name: Nombre del archivo XML de la cascada
+
+        Yields:
+            cv2.CascadeClassifier listo para detectMultiScale()
+        """
+        with self._lock:
+            free = self._free.setdefault(name, [])
+            classifier = free.pop() if free else None
+            self.acquired += 1
+
+        if classifier is None:
+            classifier = self._create(name)
+        try:
+            yield classifier
+        finally:
+            with self._lock:
+                self._free[name].append(classifier)
+
+    def warm_up(self, names: Iterable[str] = (DEFAULT_CASCADE,)):
+        """Cargar las cascadas y dejar una instancia lista por cada una"""
+        for name in names:
+            with self.acquire(name):
+                pass
+            self.logger.info(f"Cascada precargada: {name}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'cascadas': len(self._xml),
+                'instancias_creadas': self.created,
+                'instancias_libres': sum(len(free) for free in self._free.values()),
+                'prestamos': self.acquired
+            }
+
+    def _create(self, name: str):
+        import cv2
+
+        xml = self._load_xml(name)
+        classifier = cv2.CascadeClassifier()
+        storage = cv2.FileStorage(xml, cv2.FILE_STORAGE_READ | cv2.FILE_STORAGE_MEMORY)
+        loaded = classifier.read(storage.getFirstTopLevelNode())
+        storage.release()
+
+        if not loaded or classifier.empty():
+            # Formato antiguo de cascada: cargar desde el archivo
+            classifier = cv2.CascadeClassifier(str(self.cascade_path(name)))
+            if classifier.empty():
+                raise ModelError("No se pudo cargar el clasificador Haar", {'cascada': name})
+
+        with self._lock:
+            self.created += 1
+        return classifier
+
+    def _load_xml(self, name: str) -> str:
+        with self._lock:
+            xml = self._xml.get(name)
+        if xml is not None:
+            return xml
+
+        path = self.cascade_path(name)
+        if not path.exists():
+            raise ModelError("Archivo de cascada no encontrado", {'ruta': str(path)})
+        xml = path.read_text(encoding='utf-8')
+
+        with self._lock:
+            return self._xml.setdefault(name, xml)
+
+
+# Instancia singleton
+_pool_instance = None
+_pool_lock = threading.Lock()
+
+
+def get_detector_pool() -> DetectorPool:
+    """Obtener el pool de detectores compartido por el proceso"""
+    global _pool_instance
+    if _pool_instance is None:
+        with _pool_lock:
+            if _pool_instance is None:
+                _pool_instance = DetectorPool()
+    return _pool_instance
+
+
+def detect_faces(gray, scale_factor: float = 1.3, min_neighbors: int = 5,
+                 cascade: str = DEFAULT_CASCADE, **kwargs):
+    """
+    Detectar rostros con un clasificador del pool
+
+    Args:
+        gray: Imagen en escala de grises
+        scale_factor: Parámetro scaleFactor de detectMultiScale
+        min_neighbors: Parámetro minNeighbors de detectMultiScale
+        cascade: Nombre del archivo XML de la cascada
+
+    Returns:
+        Rectángulos (x, y, w, h) de los rostros detectados
+    """
+    with get_detector_pool().acquire(cascade) as classifier:
+        return classifier.detectMultiScale(gray, scale_factor, min_neighbors, **kwargs)
+
+
+def detect_scaled(gray, target_width: Optional[int] = None, min_face_ratio: Optional[float] = None,
+                  scale_factor: Optional[float] = None, min_neighbors: Optional[int] = None,
+                  cascade: str = DEFAULT_CASCADE, classifier=None):
+    """
+    Detectar rostros sobre una copia reducida del frame
+
+    La pirámide de detectMultiScale se recorre sobre un frame de
+    `target_width` píxeles de ancho en lugar del original (un 1080p de
+    teléfono tiene ~9 veces más píxeles que 640 de ancho) y minSize
+    descarta las escalas menores que el rostro esperado. Los
+    rectángulos se devuelven en coordenadas del frame original para
+    recortar el rostro a resolución completa.
+
+    Los valores no indicados salen de la sección "recognition" de la
+    configuración (detection_width, min_face_ratio, scale_factor,
+    min_neighbors).
+
+    Args:
+        gray: Imagen en escala de grises a resolución completa
+        target_width: Ancho de la copia donde se detecta (0 = no reducir)
+        min_face_ratio: Ancho mínimo esperado del rostro como fracción del ancho del frame
+        scale_factor: Parámetro scaleFactor de detectMultiScale
+        min_neighbors: Parámetro minNeighbors de detectMultiScale
+        cascade: Nombre del archivo XML de la cascada
+        classifier: CascadeClassifier propio del llamador (si no, se usa el pool)
+
+    Returns:
+        np.ndarray (N, 4) con los rectángulos (x, y, w, h) en el frame original
+    """
+    import cv2
+    import numpy as np
+
+    config = get_config()
+    if target_width is None:
+        target_width = int(config.get("recognition.detection_width", 640))
+    if min_face_ratio is None:
+        min_face_ratio = float(config.get("recognition.min_face_ratio", 0.05))
+    if scale_factor is None:
+        scale_factor = float(config.get("recognition.scale_factor", 1.2))
+    if min_neighbors is None:
+        min_neighbors = int(config.get("recognition.min_neighbors", 5))
+
+    height, width = gray.shape[:2]
+    scale = 1.0
+    small = gray
+    if target_width and width > target_width:
+        scale = target_width / width
+        small = cv2.resize(gray, (target_width, max(1, round(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+
+    # La ventana base de la cascada Haar es de 24x24 píxeles
+    min_side = max(_MIN_WINDOW, int(small.shape[1] * min_face_ratio))
+    kwargs = {'minSize': (min_side, min_side)}
+
+    if classifier is not None:
+        faces = classifier.detectMultiScale(small, scale_factor, min_neighbors, **kwargs)
+    else:
+        faces = detect_faces(small, scale_factor, min_neighbors, cascade, **kwargs)
+
+    if len(faces) == 0:
+        return np.empty((0, 4), dtype=np.int32)
+
+    boxes = np.asarray(faces, dtype=np.float64)
+    if scale != 1.0:
+        boxes = np.rint(boxes / scale)
+    boxes = boxes.astype(np.int32)
+    # El redondeo no debe sacar el recorte del frame original
+    boxes[:, 0] = np.clip(boxes[:, 0], 0, width - 1)
+    boxes[:, 1] = np.clip(boxes[:, 1], 0, height - 1)
+    boxes[:, 2] = np.minimum(boxes[:, 2], width - boxes[:, 0])
+    boxes[:, 3] = np.minimum(boxes[:, 3], height - boxes[:, 1])
+    return boxes
+
+
+def warm_up():
+    """Precargar los detectores al iniciar el servidor"""
+    get_detector_pool().warm_up()
@@ -0,0 +1,322 @@
+"""
+CLASS VISION - Galería Facial por Equipo
+Un único modelo LBPH multi-etiqueta por equipo con un mapa de etiquetas
+estable, para que cada rostro se compare con un solo predict()
+"""
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from face_crop_store import NS_USUARIOS, get_crop_store
+from utils.config_manager import get_config
+from utils.logger import get_logger
+
+
+TRAINING_IMAGE_DIR = Path('TrainingImage')
+MODEL_DIR = Path('TrainingImageLabel')
+GALLERY_DIR = MODEL_DIR / 'equipos'
+LABEL_MAP_PATH = MODEL_DIR / 'label_map.json'
+
+
+class LabelMap:
+    """
+    Mapa persistente codigo_usuario -> etiqueta entera
+
+    Las etiquetas se asignan una sola vez y nunca se reutilizan, de modo
+    que el mismo usuario tiene la misma etiqueta en todos los modelos.
+    """
+
+    def __init__(self, path: Path = LABEL_MAP_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._labels: Dict[str, int] = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._labels = json.load(f)
+
+    def label_for(self, codigo_usuario: str) -> int:
+        """Obtener (o asignar) la etiqueta de un usuario"""
+        with self._lock:
+            label = self._labels.get(codigo_usuario)
+            if label is None:
+                label = max(self._labels.values(), default=0) + 1
+                self._labels[codigo_usuario] = label
+                self._save()
+            return label
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._labels, f, indent=2)
+        tmp_path.replace(self.path)
+
+
+def load_member_faces(codigo_usuario: str, workers: Optional[int] = None) -> List:
+    """
+    Obtener los rostros (200x200 en gris) de las fotos de un usuario
+
+    Los recortes salen del almacén de recortes; sólo se decodifican las
+    fotos que todavía no tengan recorte guardado (en paralelo).
+
+    Args:
+        codigo_usuario: Código del usuario
+        workers: Procesos para las fotos pendientes (None = training.server_workers)
+
+    Returns:
+        Lista de arrays uint8 listos para entrenar LBPH
+    """
+    user_dir = TRAINING_IMAGE_DIR / codigo_usuario
+    if not user_dir.exists():
+        raise FileNotFoundError(f"Directorio no encontrado: {user_dir}")
+
+    [(crops, _)] = get_crop_store().sync_many(
+        NS_USUARIOS,
+        [(codigo_usuario, list(user_dir.glob('*.jpg')), get_label_map().label_for(codigo_usuario))],
+        workers=workers
+    )
+    return list(crops)
+
+
+def recognition_engine() -> str:
+    """Motor de comparación configurado (opencv o numpy)"""
+    engine = str(get_config().get("recognition.engine", "opencv")).lower()
+    return engine if engine in ('opencv', 'numpy') else 'opencv'
+
+
+def create_recognizer(engine: Optional[str] = None):
+    """Crear un reconocedor vacío del motor indicado"""
+    if (engine or recognition_engine()) == 'numpy':
+        from lbp_matcher import LBPMatcher
+        return LBPMatcher()
+
+    import cv2
+    return cv2.face.LBPHFaceRecognizer_create()
+
+
+class TeamGallery:
+    """Modelo combinado de los miembros activos de un equipo"""
+
+    def __init__(self, equipo_id: int, engine: Optional[str] = None):
+        self.equipo_id = equipo_id
+        self.engine = engine or recognition_engine()
+        self.recognizer = None
+        # codigo_usuario -> mtime del modelo individual usado al construir
+        self.versions: Dict[str, int] = {}
+        # etiqueta -> fila de miembro (usuario_id, codigo, nombre, membresia_id)
+        self.members: Dict[int, tuple] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def model_path(self) -> Path:
+        suffix = 'npz' if self.engine == 'numpy' else 'yml'
+        return GALLERY_DIR / f"equipo_{self.equipo_id}.{suffix}"
+
+    @property
+    def index_path(self) -> Path:
+        return GALLERY_DIR / f"equipo_{self.equipo_id}.json"
+
+    def predict(self, face) -> Tuple[Optional[tuple], float]:
+        """
+        Identificar un rostro contra todos los miembros a la vez
+
+        Args:
+            face: Rostro 200x200 en escala de grises
+
+        Returns:
+            (fila del miembro, confianza LBPH) o (None, inf) si no hay modelo
+        """
+        # update() modifica el modelo en sitio, por eso predict comparte el lock
+        with self.lock:
+            if self.recognizer is None:
+                return None, float('inf')
+            label, confidence = self.recognizer.predict(face)
+            return self.members.get(label), confidence
+
+    def predict_batch(self, faces) -> List[Tuple[Optional[tuple], float]]:
+        """
+        Identificar todos los rostros de un frame
+
+        Con el motor "numpy" se resuelven en una sola pasada vectorizada;
+        con "opencv" se llama a predict() por cada rostro.
+
+        Args:
+            faces: Lista de rostros 200x200 en escala de grises
+
+        Returns:
+            Lista de (fila del miembro, confianza) en el mismo orden
+        """
+        if not faces:
+            return []
+        with self.lock:
+            if self.recognizer is None:
+                return [(None, float('inf'))] * len(faces)
+            if hasattr(self.recognizer, 'predict_batch'):
+                labels, confidences = self.recognizer.predict_batch(faces)
+            else:
+                results = [self.recognizer.predict(face) for face in faces]
+                labels = [label for label, _ in results]
+                confidences = [confidence for _, confidence in results]
+            return [
+                (self.members.get(int(label)), float(confidence))
+                for label, confidence in zip(labels, confidences)
+            ]
+
+    def save(self):
+        GALLERY_DIR.mkdir(parents=True, exist_ok=True)
+        self.recognizer.write(str(self.model_path))
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump({'engine': self.engine, 'versions': self.versions}, f)
+
+    def load(self) -> bool:
+        """Cargar la galería persistida; False si no existe"""
+        if not self.model_path.exists() or not self.index_path.exists():
+            return False
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+        # Un índice escrito por el otro motor no corresponde a este modelo
+        if index.get('engine', 'opencv') != self.engine:
+            return False
+        self.versions = index.get('versions', {})
+        self.recognizer = create_recognizer(self.engine)
+        self.recognizer.read(str(self.model_path))
+        return True
+
+
+class TeamGalleryManager:
+    """
+    Mantiene una galería por equipo sincronizada con sus membresías
+
+    Altas de miembros se añaden con LBPHFaceRecognizer.update(); bajas o
+    reentrenamientos de un miembro provocan una reconstrucción completa.
+    """
+
+    def __init__(self, label_map: Optional[LabelMap] = None):
+        self.logger = get_logger(__name__)
+        self.label_map = label_map or LabelMap()
+        self._galleries: Dict[int, TeamGallery] = {}
+        self._lock = threading.Lock()
+
+    def get_gallery(self, equipo_id: int, miembros) -> TeamGallery:
+        """
+        Obtener la galería de un equipo actualizada a sus miembros actuales
+
+        Args:
+            equipo_id: ID del equipo
+            miembros: Filas (usuario_id, codigo_usuario, nombre_completo, membresia_id)
+
+        Returns:
+            TeamGallery lista para predict()
+        """
+        with self._lock:
+            gallery = self._galleries.get(equipo_id)
+            if gallery is None:
+                gallery = TeamGallery(equipo_id)
+                gallery.load()
+                self._galleries[equipo_id] = gallery
+
+        with gallery.lock:
+            self._sync(gallery, miembros)
+        return gallery
+
+    def drop(self, equipo_id: int):
+        """Olvidar la galería en memoria de un equipo"""
+        with self._lock:
+            self._galleries.pop(equipo_id, None)
+
+    def _sync(self, gallery: TeamGallery, miembros):
+        current = {}
+        for miembro in miembros:
+            codigo_usuario = miembro[1]
+            model_path = MODEL_DIR / f"{codigo_usuario}_model.yml"
+            if model_path.exists():
+                current[codigo_usuario] = (miembro, model_path.stat().st_mtime_ns)
+
+        gallery.members = {
+            self.label_map.label_for(codigo): miembro
+            for codigo, (miembro, _) in current.items()
+        }
+
+        removed = [c for c in gallery.versions if c not in current]
+        retrained = [
+            c for c, (_, mtime) in current.items()
+            if c in gallery.versions and gallery.versions[c] != mtime
+        ]
+        added = [c for c in current if c not in gallery.versions]
+
+        if removed or retrained:
+            self._rebuild(gallery, current)
+        elif added:
+            self._add_members(gallery, current, added)
+
+    def _rebuild(self, gallery: TeamGallery, current: dict):
+        gallery.recognizer = None
+        gallery.versions = {}
+        self._add_members(gallery, current, list(current))
+        self.logger.info(
+            f"Galería del equipo {gallery.equipo_id} reconstruida con {len(current)} miembros"
+        )
+
+    def _add_members(self, gallery: TeamGallery, current: dict, added: List[str]):
+        faces, labels = self._collect(added)
+        if faces:
+            if gallery.recognizer is None:
+                gallery.recognizer = create_recognizer(gallery.engine)
+                gallery.recognizer.train(faces, labels)
+            else:
+                gallery.recognizer.update(faces, labels)
+
+        # Los miembros sin rostros también se registran para no
+        # reintentar la extracción en cada frame
+        for codigo in added:
+            gallery.versions[codigo] = current[codigo][1]
+
+        if gallery.recognizer is not None:
+            gallery.save()
+        self.logger.info(
+            f"Galería del equipo {gallery.equipo_id}: {len(added)} miembros añadidos "
+            f"({len(faces)} rostros)"
+        )
+
+    def _collect(self, codigos: List[str]):
+        import numpy as np
+
+        faces, labels = [], []
+        for codigo in codigos:
+            try:
+                member_faces = load_member_faces(codigo)
+            except FileNotFoundError:
+                self.logger.warning(f"Sin fotos de entrenamiento para {codigo}")
+                continue
+            faces.extend(member_faces)
+            labels.extend([self.label_map.label_for(codigo)] * len(member_faces))
+        return faces, np.array(labels, dtype=np.int32)
+
+
+# Instancias singleton
+_label_map_instance = None
+_manager_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_label_map() -> LabelMap:
+    """Obtener el mapa de etiquetas compartido"""
+    global _label_map_instance
+    if _label_map_instance is None:
+        with _instance_lock:
+            if _label_map_instance is None:
+                _label_map_instance = LabelMap()
+    return _label_map_instance
+
+
+def get_gallery_manager() -> TeamGalleryManager:
+    """Obtener el gestor de galerías compartido por el proceso"""
+    global _manager_instance
+    if _manager_instance is None:
+        label_map = get_label_map()
+        with _instance_lock:
+            if _manager_instance is None:
+                _manager_instance = TeamGalleryManager(label_map)
+    return _manager_instance
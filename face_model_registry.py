@@ -0,0 +1,198 @@
+"""
+CLASS VISION - Registro de Modelos Faciales
+Mantiene en memoria los reconocedores LBPH por usuario para no releer
+TrainingImageLabel/{codigo_usuario}_model.yml en cada frame
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from utils.config_manager import get_config
+from utils.logger import get_logger
+
+
+MODEL_DIR = Path('TrainingImageLabel')
+
+
+class _ModelEntry:
+    """Reconocedor cargado junto con los datos para invalidarlo"""
+
+    __slots__ = ('recognizer', 'mtime_ns', 'size_bytes')
+
+    def __init__(self, recognizer, mtime_ns: int, size_bytes: int):
+        self.recognizer = recognizer
+        self.mtime_ns = mtime_ns
+        self.size_bytes = size_bytes
+
+
+class FaceModelRegistry:
+    """
+    Caché LRU de reconocedores LBPH indexada por código de usuario
+
+    Una entrada se invalida cuando cambia el mtime del archivo YAML o
+    cuando se llama a invalidate() (por ejemplo desde train_model).
+    El total de memoria estimada se mantiene bajo max_bytes desalojando
+    los modelos menos usados.
+    """
+
+    def __init__(self, model_dir: Path = MODEL_DIR, max_bytes: Optional[int] = None):
+        self.logger = get_logger(__name__)
+        self.model_dir = Path(model_dir)
+        if max_bytes is None:
+            max_bytes = int(get_config().get("recognition.model_cache_mb", 256)) * 1024 * 1024
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[str, _ModelEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._current_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.evictions = 0
+
+    def model_path(self, codigo_usuario: str) -> Path:
+        """Ruta del modelo individual de un usuario"""
+        return self.model_dir / f"{codigo_usuario}_model.yml"
+
+    def get(self, codigo_usuario: str):
+        """
+        Obtener el reconocedor de un usuario
+
+        Args:
+            codigo_usuario: Código del usuario (ej: USER-2025-001)
+
+        Returns:
+            LBPHFaceRecognizer listo para predict() o None si no hay modelo
+        """
+        path = self.model_path(codigo_usuario)
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self.invalidate(codigo_usuario)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(codigo_usuario)
+            if entry is not None and entry.mtime_ns == mtime_ns:
+                self._entries.move_to_end(codigo_usuario)
+                self.hits += 1
+                return entry.recognizer
+            self.misses += 1
+            if entry is not None:
+                self.reloads += 1
+
+        # La lectura del YAML se hace fuera del lock para no bloquear
+        # al resto de hilos mientras se parsea el archivo
+        recognizer = self._load(path)
+        size_bytes = self._estimate_size(recognizer, path)
+
+        with self._lock:
+            self._remove(codigo_usuario)
+            self._entries[codigo_usuario] = _ModelEntry(recognizer, mtime_ns, size_bytes)
+            self._current_bytes += size_bytes
+            self._evict()
+
+        return recognizer
+
+    def swap(self, codigo_usuario: str, recognizer):
+        """
+        Publicar un modelo recién entrenado sin pasar por el disco
+
+        Las peticiones en curso terminan con el reconocedor anterior y
+        las siguientes reciben el nuevo; nunca hay un intervalo sin
+        modelo. Se llama después de escribir el YAML para registrar su mtime.
+
+        Args:
+            codigo_usuario: Código del usuario
+            recognizer: Reconocedor ya entrenado
+        """
+        path = self.model_path(codigo_usuario)
+        mtime_ns = path.stat().st_mtime_ns
+        size_bytes = self._estimate_size(recognizer, path)
+
+        with self._lock:
+            self._remove(codigo_usuario)
+            self._entries[codigo_usuario] = _ModelEntry(recognizer, mtime_ns, size_bytes)
+            self._current_bytes += size_bytes
+            self._evict()
+
+    def invalidate(self, codigo_usuario: Optional[str] = None):
+        """
+        Descartar el modelo de un usuario (o todos si no se indica)
+
+        Args:
+            codigo_usuario: Código del usuario a invalidar
+        """
+        with self._lock:
+            if codigo_usuario is None:
+                self._entries.clear()
+                self._current_bytes = 0
+            else:
+                self._remove(codigo_usuario)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'modelos_cargados': len(self._entries),
+                'memoria_bytes': self._current_bytes,
+                'memoria_maxima_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'recargas': self.reloads,
+                'desalojos': self.evictions,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+    def _load(self, path: Path):
+        import cv2
+
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(str(path))
+        self.logger.debug(f"Modelo cargado en memoria: {path}")
+        return recognizer
+
+    @staticmethod
+    def _estimate_size(recognizer, path: Path) -> int:
+        """Estimar la memoria del modelo a partir de sus histogramas"""
+        try:
+            return int(sum(h.nbytes for h in recognizer.getHistograms()))
+        except Exception:
+            return path.stat().st_size
+
+    def _remove(self, codigo_usuario: str):
+        entry = self._entries.pop(codigo_usuario, None)
+        if entry is not None:
+            self._current_bytes -= entry.size_bytes
+
+    def _evict(self):
+        # Siempre se conserva el modelo recién insertado
+        while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+            codigo_usuario, entry = self._entries.popitem(last=False)
+            self._current_bytes -= entry.size_bytes
+            self.evictions += 1
+            self.logger.debug(f"Modelo desalojado de memoria: {codigo_usuario}")
+
+
+# Instancia singleton
+_registry_instance = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> FaceModelRegistry:
+    """
+    Obtener el registro de modelos compartido por todo el proceso
+
+    Returns:
+        FaceModelRegistry singleton
+    """
+    global _registry_instance
+    if _registry_instance is None:
+        with _registry_lock:
+            if _registry_instance is None:
+                _registry_instance = FaceModelRegistry()
+    return _registry_instance
@@ -0,0 +1,214 @@
+"""
+CLASS VISION - Seguimiento de Rostros entre Frames
+Asocia las detecciones de cada frame con pistas (IoU y, si no alcanza,
+distancia entre centroides) para que sólo las pistas nuevas o las que
+toca re-verificar pasen por recognizer.predict. La identidad de una
+pista se confirma por votación sobre sus frames
+"""
+
+import itertools
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.config_manager import get_config
+
+
+# Voto de un frame cuya distancia no superó el umbral
+UNKNOWN = -1
+
+Box = Tuple[int, int, int, int]
+
+
+def iou(a: Box, b: Box) -> float:
+    """Intersección sobre unión de dos rectángulos (x, y, w, h)"""
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _centroid_distance(a: Box, b: Box) -> float:
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    dx = (ax + aw / 2) - (bx + bw / 2)
+    dy = (ay + ah / 2) - (by + bh / 2)
+    return (dx * dx + dy * dy) ** 0.5
+
+
+class FaceTrack:
+    """Un rostro seguido a lo largo de varios frames"""
+
+    def __init__(self, track_id: int, box: Box, frame: int):
+        self.id = track_id
+        self.box = box
+        self.last_frame = frame
+        self.last_verified: Optional[int] = None
+        self.votes: Counter = Counter()
+        self.best_distance: Dict[int, float] = {}
+        self.identity: Optional[int] = None
+
+    @property
+    def confirmed(self) -> bool:
+        return self.identity is not None
+
+    @property
+    def label(self) -> Optional[int]:
+        """Etiqueta con más votos (aunque aún no esté confirmada)"""
+        if not self.votes:
+            return None
+        return self.votes.most_common(1)[0][0]
+
+    def distance(self) -> Optional[float]:
+        """Mejor distancia observada para la identidad vigente"""
+        label = self.identity if self.identity is not None else self.label
+        return self.best_distance.get(label)
+
+
+class FaceTracker:
+    """
+    Seguimiento de rostros por asociación IoU / centroide
+
+    - update() asocia las detecciones de un frame y devuelve, para cada
+      una, su pista, su rectángulo en ese frame y si hay que reconocerla.
+      Hay que recortar con ese rectángulo y no con track.box: otro hilo
+      puede actualizar la pista con un frame distinto mientras tanto.
+    - Se reconoce en cada frame mientras la pista no tenga identidad
+      confirmada y, una vez confirmada, cada `reverify_interval` frames.
+    - vote() agrega el resultado del predict; una identidad se confirma
+      con `min_votes` votos que además sean mayoría. Si la re-verificación
+      lleva la mayoría a otra etiqueta, la pista vuelve a confirmarse con ella.
+    - Es seguro entre hilos; los frames deben llegar aproximadamente en orden.
+    """
+
+    def __init__(self, threshold: float = 70, iou_threshold: Optional[float] = None,
+                 max_missed: Optional[int] = None, reverify_interval: Optional[int] = None,
+                 min_votes: Optional[int] = None):
+        config = get_config()
+        self.threshold = threshold
+        self.iou_threshold = float(iou_threshold if iou_threshold is not None
+                                   else config.get("tracking.iou_threshold", 0.3))
+        self.max_missed = int(max_missed if max_missed is not None
+                              else config.get("tracking.max_missed_frames", 10))
+        self.reverify_interval = int(reverify_interval if reverify_interval is not None
+                                     else config.get("tracking.reverify_interval", 15))
+        self.min_votes = int(min_votes if min_votes is not None
+                             else config.get("tracking.min_votes", 3))
+
+        self._tracks: Dict[int, FaceTrack] = {}
+        self._ids = itertools.count(1)
+        self._frame = 0
+        self._lock = threading.Lock()
+
+        self.predictions = 0
+        self.skipped = 0
+
+    def update(self, faces: Sequence[Box]) -> List[Tuple[FaceTrack, Box, bool]]:
+        """
+        Asociar las detecciones de un frame con las pistas existentes
+
+        Args:
+            faces: Rectángulos (x, y, w, h) detectados en el frame
+
+        Returns:
+            [(pista, rectángulo del frame, hay_que_reconocer)] en el orden de faces
+        """
+        boxes = [tuple(int(v) for v in face) for face in faces]
+        with self._lock:
+            self._frame += 1
+            frame = self._frame
+            assigned = self._associate(boxes)
+
+            result = []
+            for index, box in enumerate(boxes):
+                track = assigned.get(index)
+                if track is None:
+                    track = FaceTrack(next(self._ids), box, frame)
+                    self._tracks[track.id] = track
+                track.box = box
+                track.last_frame = frame
+
+                needs = (not track.confirmed
+                         or track.last_verified is None
+                         or frame - track.last_verified >= self.reverify_interval)
+                if needs:
+                    track.last_verified = frame
+                    self.predictions += 1
+                else:
+                    self.skipped += 1
+                result.append((track, box, needs))
+
+            # Descartar las pistas que llevan demasiados frames sin verse
+            for track_id in [t.id for t in self._tracks.values()
+                             if frame - t.last_frame > self.max_missed]:
+                del self._tracks[track_id]
+            return result
+
+    def vote(self, track: FaceTrack, label: int, distance: float) -> bool:
+        """
+        Registrar el resultado de recognizer.predict para una pista
+
+        Returns:
+            True si con este voto la pista quedó confirmada con una nueva identidad
+        """
+        label = int(label) if distance < self.threshold else UNKNOWN
+        with self._lock:
+            track.votes[label] += 1
+            if label != UNKNOWN:
+                best = track.best_distance.get(label)
+                track.best_distance[label] = distance if best is None else min(best, distance)
+
+            leader, count = track.votes.most_common(1)[0]
+            total = sum(track.votes.values())
+            if leader == UNKNOWN or count < self.min_votes or count * 2 <= total:
+                return False
+            if track.identity == leader:
+                return False
+            track.identity = leader
+            return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'pistas_activas': len(self._tracks),
+                'frames': self._frame,
+                'reconocimientos': self.predictions,
+                'reconocimientos_omitidos': self.skipped
+            }
+
+    def _associate(self, boxes: List[Box]) -> Dict[int, FaceTrack]:
+        """Asociación voraz: primero por IoU y luego por cercanía del centroide"""
+        tracks = list(self._tracks.values())
+        assigned: Dict[int, FaceTrack] = {}
+        used = set()
+
+        pairs = sorted(
+            ((iou(box, track.box), index, track) for index, box in enumerate(boxes)
+             for track in tracks),
+            key=lambda p: p[0], reverse=True
+        )
+        for score, index, track in pairs:
+            if score < self.iou_threshold:
+                break
+            if index in assigned or track.id in used:
+                continue
+            assigned[index] = track
+            used.add(track.id)
+
+        # Movimiento rápido: el rostro se desplazó menos que medio ancho
+        for index, box in enumerate(boxes):
+            if index in assigned:
+                continue
+            candidates = [
+                (_centroid_distance(box, track.box), track) for track in tracks
+                if track.id not in used
+            ]
+            candidates = [(d, t) for d, t in candidates if d <= max(box[2], t.box[2]) / 2]
+            if candidates:
+                _, track = min(candidates, key=lambda c: c[0])
+                assigned[index] = track
+                used.add(track.id)
+        return assigned
@@ -0,0 +1,389 @@
+"""
+CLASS VISION - Entrenamiento de Modelos LBPH
+Entrenamiento incremental con LBPHFaceRecognizer.update(): al registrar
+un estudiante sólo se procesan sus fotos nuevas. El reentrenamiento
+completo queda para bajas y compactación del modelo
+
+Uso por línea de comandos:
+    python face_training.py global [--workers N]
+    python face_training.py escritorio [--workers N]
+    python face_training.py usuarios [--usuario CODIGO ...] [--workers N]
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from face_crop_store import NS_ESCRITORIO, NS_ESTUDIANTES, get_crop_store
+from face_gallery import MODEL_DIR, TRAINING_IMAGE_DIR, get_label_map, load_member_faces
+from utils.config_manager import get_config
+from utils.logger import get_logger
+
+
+# Modelo global de estudiantes (fotos planas TrainingImage/{nombre}_{enrollment}_{n}.jpg)
+GLOBAL_MODEL_PATH = MODEL_DIR / 'Trainner.yml'
+
+logger = get_logger(__name__)
+
+# Un lock por archivo de modelo: dos registros simultáneos no deben
+# leer la misma versión y pisarse al escribir
+_model_locks: Dict[str, threading.Lock] = {}
+_model_locks_guard = threading.Lock()
+
+
+def _model_lock(model_path: Path) -> threading.Lock:
+    key = str(Path(model_path).resolve())
+    with _model_locks_guard:
+        lock = _model_locks.get(key)
+        if lock is None:
+            lock = _model_locks[key] = threading.Lock()
+        return lock
+
+
+def _create_recognizer():
+    import cv2
+    return cv2.face.LBPHFaceRecognizer_create()
+
+
+def _write_atomic(recognizer, model_path: Path):
+    """Escribir el modelo en un temporal y reemplazarlo de una vez"""
+    model_path = Path(model_path)
+    model_path.parent.mkdir(parents=True, exist_ok=True)
+    # El sufijo .yml se conserva para que OpenCV elija el formato correcto
+    tmp_path = model_path.with_name(f"{model_path.stem}.tmp{model_path.suffix}")
+    recognizer.write(str(tmp_path))
+    os.replace(tmp_path, model_path)
+
+
+def add_faces(model_path: Path, faces: List, labels: List[int]) -> str:
+    """
+    Añadir rostros a un modelo persistido sin reprocesar los anteriores
+
+    Si el modelo no existe (o no se puede leer) se entrena uno nuevo
+    sólo con estos rostros.
+
+    Args:
+        model_path: Archivo .yml del modelo
+        faces: Rostros nuevos
+        labels: Etiqueta de cada rostro
+
+    Returns:
+        'incremental' si se usó update(), 'nuevo' si se creó el modelo
+    """
+    import numpy as np
+
+    if len(faces) == 0:
+        raise ValueError("No hay rostros para entrenar")
+
+    model_path = Path(model_path)
+    labels = np.array(labels, dtype=np.int32)
+
+    with _model_lock(model_path):
+        recognizer = _create_recognizer()
+        mode = 'nuevo'
+        if model_path.exists():
+            try:
+                recognizer.read(str(model_path))
+                mode = 'incremental'
+            except Exception as e:
+                logger.warning(f"No se pudo leer {model_path}, se crea de nuevo: {e}")
+                recognizer = _create_recognizer()
+
+        if mode == 'incremental':
+            recognizer.update(faces, labels)
+        else:
+            recognizer.train(faces, labels)
+        _write_atomic(recognizer, model_path)
+
+    logger.info(f"Modelo {model_path.name}: {len(faces)} rostros añadidos ({mode})")
+    return mode
+
+
+def retrain(model_path: Path, faces: List, labels: List[int],
+            on_saved: Optional[Callable] = None):
+    """
+    Reentrenar un modelo desde cero (bajas o compactación)
+
+    update() sólo agrega histogramas, así que eliminar a alguien o
+    descartar fotos viejas requiere este camino.
+
+    Args:
+        on_saved: Se llama con el reconocedor ya escrito, todavía bajo el
+            lock del modelo (para publicarlo en memoria en el mismo orden)
+    """
+    import numpy as np
+
+    if len(faces) == 0:
+        raise ValueError("No hay rostros para entrenar")
+
+    model_path = Path(model_path)
+    with _model_lock(model_path):
+        recognizer = _create_recognizer()
+        recognizer.train(faces, np.array(labels, dtype=np.int32))
+        _write_atomic(recognizer, model_path)
+        if on_saved is not None:
+            on_saved(recognizer)
+
+    logger.info(f"Modelo {model_path.name} reentrenado con {len(faces)} rostros")
+
+
+# ============================================
+# MODELO GLOBAL DE ESTUDIANTES (Trainner.yml)
+# ============================================
+
+def _enrollment_from_filename(image_path: Path) -> Optional[int]:
+    """Extraer el enrollment de {nombre}_{enrollment}_{n}.jpg"""
+    parts = image_path.stem.split('_')
+    if len(parts) < 2:
+        return None
+    try:
+        return int(parts[-2])
+    except ValueError:
+        return None
+
+
+def student_images(enrollment: int, image_dir: Path = TRAINING_IMAGE_DIR) -> List[Path]:
+    """Fotos planas de un estudiante en TrainingImage"""
+    return [
+        path for path in Path(image_dir).glob('*.jpg')
+        if _enrollment_from_filename(path) == int(enrollment)
+    ]
+
+
+def _model_labels(model_path: Path) -> set:
+    """Etiquetas presentes en un modelo persistido (vacío si no existe)"""
+    model_path = Path(model_path)
+    if not model_path.exists():
+        return set()
+    with _model_lock(model_path):
+        recognizer = _create_recognizer()
+        try:
+            recognizer.read(str(model_path))
+        except Exception:
+            return set()
+    return {int(label) for label in recognizer.getLabels().ravel()}
+
+
+def add_students_to_global_model(enrollments: Iterable[int], model_path: Path = GLOBAL_MODEL_PATH,
+                                 progress: Optional[Callable[[int, str], None]] = None) -> Tuple[str, int]:
+    """
+    Añadir al modelo global los recortes guardados de unos estudiantes
+
+    update() sólo agrega histogramas: si alguna matrícula ya estaba en el
+    modelo (re-registro) se reentrena completo, para no duplicar sus
+    rostros ni conservar los de fotos reemplazadas.
+
+    Args:
+        enrollments: Matrículas recién registradas (etiquetas del modelo global)
+        progress: Callback (porcentaje, mensaje) para informar avance
+
+    Returns:
+        (modo de entrenamiento, número de rostros añadidos o entrenados)
+    """
+    import numpy as np
+
+    enrollments = [int(e) for e in enrollments]
+    report = progress or (lambda porcentaje, mensaje: None)
+    report(10, 'Cargando recortes faciales')
+    if _model_labels(model_path) & set(enrollments):
+        report(30, 'Estudiante ya registrado: reentrenamiento completo')
+        # TrainingImage y TrainingImageLabel son carpetas hermanas
+        image_dir = Path(model_path).parent.parent / TRAINING_IMAGE_DIR.name
+        return 'completo', retrain_global_model(image_dir, model_path)
+
+    store = get_crop_store()
+    crops, labels = [], []
+    for enrollment in enrollments:
+        stored = store.load(NS_ESTUDIANTES, enrollment)
+        if stored is not None and len(stored[0]):
+            crops.append(stored[0])
+            labels.append(stored[1])
+
+    if not crops:
+        return 'sin_rostros', 0
+
+    crops = np.concatenate(crops)
+    report(50, f'Añadiendo {len(crops)} rostros al modelo')
+    mode = add_faces(model_path, list(crops), np.concatenate(labels))
+    return mode, len(crops)
+
+
+def retrain_global_model(image_dir: Path = TRAINING_IMAGE_DIR,
+                         model_path: Path = GLOBAL_MODEL_PATH,
+                         exclude: Iterable[int] = (),
+                         workers: Optional[int] = None) -> int:
+    """
+    Reconstruir el modelo global con los recortes de todos los estudiantes
+
+    Los recortes salen del almacén; sólo se decodifican las fotos de
+    TrainingImage que todavía no tengan recorte guardado.
+
+    Args:
+        exclude: Enrollments a dejar fuera (estudiantes dados de baja)
+        workers: Procesos para las fotos pendientes (None = training.server_workers)
+
+    Returns:
+        Número de rostros entrenados
+    """
+    excluded = {int(e) for e in exclude}
+    by_student: Dict[int, List[Path]] = {}
+    for path in Path(image_dir).glob('*.jpg'):
+        enrollment = _enrollment_from_filename(path)
+        if enrollment is not None and enrollment not in excluded:
+            by_student.setdefault(enrollment, []).append(path)
+
+    results = get_crop_store().sync_many(
+        NS_ESTUDIANTES,
+        [(enrollment, paths, enrollment) for enrollment, paths in sorted(by_student.items())],
+        workers=workers
+    )
+    return _retrain_from_results(model_path, results)
+
+
+def _retrain_from_results(model_path: Path, results) -> int:
+    import numpy as np
+
+    if not results:
+        return 0
+    crops = np.concatenate([crops for crops, _ in results])
+    if not len(crops):
+        return 0
+    retrain(model_path, list(crops), np.concatenate([labels for _, labels in results]))
+    return len(crops)
+
+
+def _is_user_dir(directory: Path) -> bool:
+    """Carpeta {codigo_usuario}/ con fotos {codigo_usuario}_{n}.jpg (app web)"""
+    return directory.is_dir() and any(
+        p.name.startswith(f"{directory.name}_") for p in directory.glob('*.jpg')
+    )
+
+
+def desktop_images_and_labels(image_dir: Path = TRAINING_IMAGE_DIR,
+                              workers: Optional[int] = None) -> Tuple[List, List[int]]:
+    """
+    Recortes de las carpetas {enrollment}_{nombre} de la app de escritorio
+
+    takeImage ya guarda sólo el rostro, así que no se detecta de nuevo;
+    la matrícula sale del nombre de archivo Nombre_Matricula_n.jpg.
+
+    Returns:
+        (rostros, etiquetas) en el orden de las carpetas
+    """
+    image_dir = Path(image_dir)
+    if not image_dir.exists():
+        return [], []
+
+    items = []
+    for directory in sorted(p for p in image_dir.iterdir() if p.is_dir()):
+        image_paths = sorted(
+            p for p in directory.iterdir()
+            if p.suffix.lower() in ('.png', '.jpg', '.jpeg')
+        )
+        if not image_paths or _is_user_dir(directory):
+            continue
+        try:
+            label = int(image_paths[0].name.split('_')[1])
+        except (IndexError, ValueError):
+            continue
+        items.append((directory.name, image_paths, label))
+
+    faces, labels = [], []
+    for crops, crop_labels in get_crop_store().sync_many(NS_ESCRITORIO, items, detect=False, workers=workers):
+        faces.extend(crops)
+        labels.extend(crop_labels.tolist())
+    return faces, labels
+
+
+def retrain_desktop_model(image_dir: Path = TRAINING_IMAGE_DIR,
+                          model_path: Path = GLOBAL_MODEL_PATH,
+                          workers: Optional[int] = None) -> int:
+    """Reentrenar Trainner.yml con las carpetas de la app de escritorio"""
+    faces, labels = desktop_images_and_labels(image_dir, workers)
+    if not faces:
+        return 0
+    retrain(model_path, faces, labels)
+    return len(faces)
+
+
+# ============================================
+# MODELOS INDIVIDUALES ({codigo_usuario}_model.yml)
+# ============================================
+
+def user_model_path(codigo_usuario: str) -> Path:
+    return MODEL_DIR / f"{codigo_usuario}_model.yml"
+
+
+def retrain_user_model(codigo_usuario: str, workers: Optional[int] = None,
+                       progress: Optional[Callable[[int, str], None]] = None) -> int:
+    """
+    Reentrenar el modelo individual de un usuario con todos sus recortes
+
+    El modelo nuevo reemplaza al anterior en el registro en memoria de
+    una sola vez, sin que los reconocimientos en curso lo vean ausente.
+
+    Args:
+        progress: Callback (porcentaje, mensaje) para informar avance
+
+    Returns:
+        Número de rostros entrenados
+
+    Raises:
+        FileNotFoundError: Si el usuario no tiene carpeta de fotos
+        ValueError: Si no se detectó ningún rostro
+    """
+    from face_model_registry import get_model_registry
+
+    report = progress or (lambda porcentaje, mensaje: None)
+    report(10, 'Cargando recortes faciales')
+    faces = load_member_faces(codigo_usuario, workers)
+    label = get_label_map().label_for(codigo_usuario)
+
+    report(50, f'Entrenando con {len(faces)} rostros')
+    retrain(
+        user_model_path(codigo_usuario), faces, [label] * len(faces),
+        on_saved=lambda recognizer: get_model_registry().swap(codigo_usuario, recognizer)
+    )
+    report(100, 'Modelo actualizado')
+    return len(faces)
+
+
+def main(argv=None):
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Reentrenamiento completo de modelos LBPH')
+    parser.add_argument('modelo', choices=['global', 'escritorio', 'usuarios'],
+                        help='global: fotos de /api/register-student; escritorio: carpetas de '
+                             'takeImage; usuarios: modelos individuales')
+    parser.add_argument('--usuario', action='append', default=[],
+                        help='Código de usuario a reentrenar (repetible; por defecto todos)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Procesos para decodificar y detectar (0 = todos los núcleos)')
+    args = parser.parse_args(argv)
+    # Desde la línea de comandos sí se usan todos los núcleos (training.workers)
+    workers = args.workers if args.workers is not None else int(get_config().get("training.workers", 0))
+
+    start = time.perf_counter()
+    if args.modelo == 'global':
+        total = retrain_global_model(workers=workers)
+        print(f"✅ Trainner.yml reentrenado con {total} rostros")
+    elif args.modelo == 'escritorio':
+        total = retrain_desktop_model(workers=workers)
+        print(f"✅ Trainner.yml reentrenado con {total} rostros")
+    else:
+        codigos = args.usuario
+        if not codigos and TRAINING_IMAGE_DIR.exists():
+            codigos = sorted(p.name for p in TRAINING_IMAGE_DIR.iterdir() if _is_user_dir(p))
+        for codigo in codigos:
+            try:
+                total = retrain_user_model(codigo, workers)
+                print(f"✅ {codigo}: {total} rostros")
+            except (FileNotFoundError, ValueError) as e:
+                print(f"⚠️ {codigo}: {e}")
+    print(f"⏱️ Tiempo total: {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
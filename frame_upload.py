@@ -0,0 +1,60 @@
+"""
+CLASS VISION - Lectura de Frames Subidos
+Acepta el frame como cuerpo binario (image/jpeg), como archivo
+multipart o como base64 dentro de JSON (formato anterior)
+"""
+
+import base64
+from typing import Any, Dict, Optional, Tuple
+
+from flask import request
+
+
+def read_frame_upload(field: str = 'imagen') -> Tuple[Optional[bytes], Dict[str, Any]]:
+    """
+    Obtener los bytes de la imagen y los demás campos de la petición
+
+    - image/* u application/octet-stream: el cuerpo es la imagen y los
+      campos van en la query string (ej: ?sesion_id=5)
+    - multipart/form-data: la imagen es el archivo `field` y los campos
+      van en el formulario
+    - JSON: `field` contiene la imagen en base64 (con o sin prefijo data:)
+
+    Args:
+        field: Nombre del campo que contiene la imagen
+
+    Returns:
+        (bytes de la imagen o None si no se envió, campos de la petición)
+    """
+    content_type = (request.mimetype or '').lower()
+
+    if content_type.startswith('image/') or content_type == 'application/octet-stream':
+        body = request.get_data(cache=False)
+        return (body or None), request.args.to_dict()
+
+    if content_type == 'multipart/form-data':
+        fields = request.form.to_dict()
+        upload = request.files.get(field)
+        if upload is None:
+            return None, fields
+        return (upload.read() or None), fields
+
+    data = request.get_json(silent=True) or {}
+    encoded = data.get(field)
+    if not encoded:
+        return None, data
+    # Quitar el prefijo data:image/jpeg;base64, si existe
+    return base64.b64decode(encoded.split(',', 1)[-1]), data
+
+
+def decode_frame(image_bytes: bytes):
+    """
+    Decodificar una imagen JPEG/PNG a un frame BGR sin copias intermedias
+
+    Returns:
+        numpy.ndarray o None si la imagen no es válida
+    """
+    import cv2
+    import numpy as np
+
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_COLOR)
@@ -0,0 +1,214 @@
+"""
+CLASS VISION - Comparador LBP Vectorizado
+Motor en NumPy equivalente a LBPHFaceRecognizer que calcula los
+histogramas LBP de todos los rostros de un frame a la vez y los compara
+contra la galería con una distancia chi-cuadrado por lotes. Reproduce el
+LBP circular, las celdas y la normalización de OpenCV, así que las
+distancias coinciden con las de cv2.face (mismos umbrales)
+"""
+
+import math
+import threading
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+# Parámetros por defecto de cv2.face.LBPHFaceRecognizer_create()
+RADIUS = 1
+NEIGHBORS = 8
+BINS = 2 ** NEIGHBORS
+# Elementos float32 por bloque de comparación (~32 MB)
+_CHUNK_ELEMENTS = 8 * 1024 * 1024
+
+
+def _neighbor_samples():
+    """Desplazamientos y pesos bilineales de cada vecino (como elbp_ de OpenCV)"""
+    samples = []
+    for n in range(NEIGHBORS):
+        x = np.float32(RADIUS * math.cos(2.0 * math.pi * n / NEIGHBORS))
+        y = np.float32(-RADIUS * math.sin(2.0 * math.pi * n / NEIGHBORS))
+        fx, fy = int(math.floor(x)), int(math.floor(y))
+        cx, cy = int(math.ceil(x)), int(math.ceil(y))
+        tx, ty = np.float32(x - fx), np.float32(y - fy)
+        one = np.float32(1)
+        weights = ((one - tx) * (one - ty), tx * (one - ty), (one - tx) * ty, tx * ty)
+        samples.append(((fy, fx), (fy, cx), (cy, fx), (cy, cx), weights))
+    return samples
+
+
+_NEIGHBOR_SAMPLES = _neighbor_samples()
+
+
+def lbp_codes(faces: np.ndarray) -> np.ndarray:
+    """
+    Códigos LBP circulares (radio 1, 8 vecinos interpolados) de un lote de rostros
+
+    Args:
+        faces: Array (N, H, W) en escala de grises
+
+    Returns:
+        Array uint8 (N, H-2, W-2)
+    """
+    faces = faces.astype(np.float32, copy=False)
+    _, height, width = faces.shape
+    r = RADIUS
+    center = faces[:, r:height - r, r:width - r]
+    codes = np.zeros(center.shape, dtype=np.uint8)
+    eps = np.finfo(np.float32).eps
+
+    def shifted(dy, dx):
+        return faces[:, r + dy:height - r + dy, r + dx:width - r + dx]
+
+    for bit, (p1, p2, p3, p4, (w1, w2, w3, w4)) in enumerate(_NEIGHBOR_SAMPLES):
+        t = w1 * shifted(*p1) + w2 * shifted(*p2) + w3 * shifted(*p3) + w4 * shifted(*p4)
+        codes |= ((t > center) | (np.abs(t - center) < eps)).astype(np.uint8) << bit
+    return codes
+
+
+class LBPMatcher:
+    """
+    Reconocedor LBPH vectorizado con la misma interfaz que cv2.face
+
+    Los histogramas de la galería se guardan en una matriz float32
+    contigua (un rostro por fila). Como en OpenCV, cada celda tiene 256
+    bins normalizados por sus píxeles y la distancia es la chi-cuadrado
+    alternativa (HISTCMP_CHISQR_ALT), así que la confianza está en la
+    misma escala que cv2.face: 0 = idéntico, mayor = peor coincidencia.
+    """
+
+    def __init__(self, grid_x: int = 8, grid_y: int = 8):
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.histograms = np.empty((0, grid_x * grid_y * BINS), dtype=np.float32)
+        self.labels = np.empty(0, dtype=np.int32)
+        self._layouts: Dict[Tuple[int, int], Tuple[np.ndarray, int]] = {}
+        self._lock = threading.Lock()
+
+    def compute_histograms(self, faces) -> np.ndarray:
+        """
+        Histogramas LBP por celda de un lote de rostros
+
+        Args:
+            faces: Lista o array de rostros del mismo tamaño (ej: 200x200)
+
+        Returns:
+            Matriz float32 (N, grid_x * grid_y * 256)
+        """
+        faces = np.asarray(faces)
+        if faces.ndim == 2:
+            faces = faces[np.newaxis]
+        count = faces.shape[0]
+        codes = lbp_codes(faces).astype(np.int64)
+
+        # OpenCV usa celdas de (alto // grid_y) x (ancho // grid_x) y
+        # descarta el sobrante del borde inferior y derecho
+        cells, cell_size = self._cell_layout(codes.shape[1], codes.shape[2])
+        num_cells = self.grid_x * self.grid_y
+        codes = codes[:, :cells.shape[0], :cells.shape[1]]
+
+        # Un solo bincount para todas las celdas de todos los rostros
+        offsets = np.arange(count).reshape(-1, 1, 1) * num_cells
+        index = (offsets + cells) * BINS + codes
+        hist = np.bincount(index.ravel(), minlength=count * num_cells * BINS)
+        hist = hist.reshape(count, num_cells * BINS).astype(np.float32)
+        hist /= np.float32(cell_size)
+        return hist
+
+    def train(self, faces, labels):
+        """Reemplazar la galería con los rostros dados"""
+        with self._lock:
+            self.histograms = np.ascontiguousarray(self.compute_histograms(faces))
+            self.labels = np.asarray(labels, dtype=np.int32).ravel()
+
+    def update(self, faces, labels):
+        """Añadir rostros a la galería existente"""
+        histograms = self.compute_histograms(faces)
+        with self._lock:
+            self.histograms = np.ascontiguousarray(np.vstack([self.histograms, histograms]))
+            self.labels = np.concatenate([self.labels, np.asarray(labels, dtype=np.int32).ravel()])
+
+    def predict(self, face) -> Tuple[int, float]:
+        """Identificar un solo rostro; devuelve (etiqueta, distancia)"""
+        labels, distances = self.predict_batch([face])
+        return int(labels[0]), float(distances[0])
+
+    def predict_batch(self, faces) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Identificar varios rostros en una sola pasada
+
+        Args:
+            faces: Lista de rostros del mismo tamaño
+
+        Returns:
+            (etiquetas int32, distancias float32); etiqueta -1 si la
+            galería está vacía
+        """
+        queries = self.compute_histograms(faces)
+        with self._lock:
+            gallery, gallery_labels = self.histograms, self.labels
+
+        count = queries.shape[0]
+        best = np.full(count, np.inf, dtype=np.float32)
+        best_index = np.full(count, -1, dtype=np.int64)
+        if gallery.shape[0] == 0:
+            return np.full(count, -1, dtype=np.int32), best
+
+        # Se recorre la galería por bloques para acotar la memoria del
+        # tensor (consultas x bloque x dimensiones)
+        chunk = max(1, _CHUNK_ELEMENTS // (count * gallery.shape[1]))
+        for start in range(0, gallery.shape[0], chunk):
+            block = gallery[start:start + chunk]
+            distances = self._chi_square(queries, block)
+            block_best = distances.argmin(axis=1)
+            block_dist = distances[np.arange(count), block_best]
+            improved = block_dist < best
+            best[improved] = block_dist[improved]
+            best_index[improved] = block_best[improved] + start
+
+        return gallery_labels[best_index], best
+
+    def write(self, path):
+        """Guardar la galería en un archivo .npz"""
+        with self._lock:
+            histograms, labels = self.histograms, self.labels
+        with open(path, 'wb') as f:
+            np.savez(f, histograms=histograms, labels=labels,
+                     grid=np.array([self.grid_x, self.grid_y]))
+
+    save = write
+
+    def read(self, path):
+        """Cargar una galería guardada con write()"""
+        with np.load(str(Path(path))) as data:
+            self.grid_x, self.grid_y = (int(v) for v in data['grid'])
+            histograms = np.ascontiguousarray(data['histograms'], dtype=np.float32)
+            labels = data['labels'].astype(np.int32)
+        if histograms.shape[1] != self.grid_x * self.grid_y * BINS:
+            raise ValueError(f"Galería con {histograms.shape[1]} dimensiones: formato anterior, hay que regenerarla")
+        with self._lock:
+            self.histograms, self.labels = histograms, labels
+
+    def _cell_layout(self, height: int, width: int):
+        """Índice de celda por píxel del área cubierta y píxeles por celda (cacheado por tamaño)"""
+        key = (height, width)
+        layout = self._layouts.get(key)
+        if layout is None:
+            cell_h, cell_w = height // self.grid_y, width // self.grid_x
+            rows = np.arange(cell_h * self.grid_y) // cell_h
+            cols = np.arange(cell_w * self.grid_x) // cell_w
+            cells = rows[:, np.newaxis] * self.grid_x + cols[np.newaxis, :]
+            layout = (cells, cell_h * cell_w)
+            self._layouts[key] = layout
+        return layout
+
+    @staticmethod
+    def _chi_square(queries: np.ndarray, block: np.ndarray) -> np.ndarray:
+        """Chi-cuadrado alternativa 2 * sum((a-b)^2 / (a+b)) entre todos los pares"""
+        a = queries[:, np.newaxis, :]
+        b = block[np.newaxis, :, :]
+        total = a + b
+        diff = a - b
+        terms = np.divide(diff * diff, total, out=np.zeros_like(total), where=total > 0)
+        return 2.0 * terms.sum(axis=2)
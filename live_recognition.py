@@ -0,0 +1,151 @@
+"""
+CLASS VISION - Canal WebSocket de Reconocimiento en Vivo
+Una conexión por sesión de asistencia: el cliente envía frames JPEG
+binarios y recibe los resultados, mientras el servidor mantiene la
+sesión, los miembros y la galería del equipo durante toda la conexión
+(compartidos con /facial/reconocer-frame vía session_working_set)
+"""
+
+import json
+import time
+
+from flask import request
+from flask_sock import Sock
+
+import db_engine
+from attendance_recognition import detect_frame_faces, match_and_register_attendance
+from auth_manager_flexible import AuthManager
+from frame_upload import decode_frame
+from session_working_set import get_session_registry
+from utils.config_manager import get_config
+from utils.exceptions import ModelError
+
+
+sock = Sock()
+
+
+def _send(ws, tipo, payload):
+    payload['tipo'] = tipo
+    ws.send(json.dumps(payload, default=str))
+
+
+class _LiveSession:
+    """Conexión sobre el conjunto de trabajo compartido de la sesión"""
+
+    def __init__(self, sesion_id):
+        self.sesion_id = sesion_id
+        self.working_set = None
+        self.refreshed_at = 0.0
+        # Cada cuánto se vuelve a comprobar la sesión y la lista de miembros
+        self.refresh_seconds = float(get_config().get("attendance.session_refresh_seconds", 30))
+
+    @property
+    def equipo_id(self):
+        return self.working_set.equipo_id if self.working_set else None
+
+    @property
+    def miembros(self):
+        return self.working_set.miembros if self.working_set else []
+
+    def refresh(self) -> bool:
+        """Revalidar la sesión; False si ya no está activa"""
+        db_session = db_engine.get_session()
+        try:
+            self.working_set = get_session_registry().get(db_session, self.sesion_id)
+        finally:
+            db_session.close()
+
+        self.refreshed_at = time.monotonic()
+        return self.working_set is not None
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.refreshed_at > self.refresh_seconds
+
+    def recognize(self, img):
+        """Procesar un frame: sólo detección y comparación; la escritura va por lotes"""
+        gray, faces = detect_frame_faces(img)
+        if len(faces) == 0:
+            return {
+                'success': True,
+                'reconocido': False,
+                'mensaje': 'No se detectó ningún rostro'
+            }
+
+        self.working_set.count_frame()
+        return match_and_register_attendance(gray, faces, self.working_set)
+
+
+@sock.route('/api/facial/ws/sesion/<int:sesion_id>')
+def live_recognition(ws, sesion_id):
+    """
+    Reconocimiento continuo para una sesión de asistencia
+
+    El token va en la query string (?token=...) porque el navegador no
+    permite cabeceras en WebSocket. Mensajes binarios = frames JPEG;
+    mensajes de texto = control JSON ({"tipo": "ping"}).
+    """
+    token = request.args.get('token', '')
+    if token.startswith('Bearer '):
+        token = token[7:]
+
+    try:
+        validation = AuthManager().validate_token(token) if token else {'valid': False}
+    except Exception as e:
+        print(f"❌ [WS] Error validando token: {e}")
+        validation = {'valid': False}
+
+    if not validation['valid']:
+        _send(ws, 'error', {'success': False, 'error': 'Token inválido o expirado'})
+        return
+
+    live = _LiveSession(sesion_id)
+    if not live.refresh():
+        _send(ws, 'error', {'success': False, 'error': 'Sesión inválida o expirada'})
+        return
+
+    print(f"🔌 [WS] Canal de reconocimiento abierto: sesión {sesion_id}, equipo {live.equipo_id}")
+    _send(ws, 'listo', {
+        'success': True,
+        'sesion_id': sesion_id,
+        'miembros': len(live.miembros)
+    })
+
+    while True:
+        mensaje = ws.receive()
+        if mensaje is None:
+            continue
+
+        if isinstance(mensaje, str):
+            try:
+                control = json.loads(mensaje)
+            except ValueError:
+                control = {}
+            if control.get('tipo') == 'ping':
+                _send(ws, 'pong', {'success': True})
+            continue
+
+        try:
+            if live.is_stale() and not live.refresh():
+                _send(ws, 'sesion_finalizada', {
+                    'success': False,
+                    'error': 'La sesión ya no está activa'
+                })
+                break
+
+            img = decode_frame(mensaje)
+            if img is None:
+                _send(ws, 'resultado', {'success': False, 'error': 'Imagen inválida'})
+                continue
+
+            _send(ws, 'resultado', live.recognize(img))
+        except ModelError as e:
+            print(f"❌ [WS] ERROR: {e}")
+            _send(ws, 'resultado', {
+                'success': False,
+                'error': 'Error al cargar clasificador Haar Cascade'
+            })
+        except Exception as e:
+            print(f"❌ [WS] Error en reconocimiento: {str(e)}")
+            _send(ws, 'resultado', {'success': False, 'error': str(e)})
+
+    print(f"🔌 [WS] Canal de reconocimiento cerrado: sesión {sesion_id}")
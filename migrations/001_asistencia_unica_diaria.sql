@@ -0,0 +1,29 @@
+-- =====================================================
+-- CLASS VISION - Migración 001
+-- Una asistencia por membresía y día (asistencia_log)
+-- =====================================================
+-- Necesaria en bases creadas antes del índice único: attendance_writer
+-- usa INSERT ... ON CONFLICT (membresia_id, fecha) DO NOTHING, que
+-- falla si el índice no existe.
+--
+-- Uso: psql -d class_vision -f migrations/001_asistencia_unica_diaria.sql
+
+BEGIN;
+
+-- Conservar sólo el primer registro de cada membresía por día
+DELETE FROM asistencia_log a
+USING asistencia_log b
+WHERE a.membresia_id = b.membresia_id
+  AND a.fecha = b.fecha
+  AND a.id > b.id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_asistencia_membresia_fecha
+    ON asistencia_log(membresia_id, fecha);
+
+-- El índice único ya cubre las búsquedas por membresia_id
+DROP INDEX IF EXISTS idx_asistencia_membresia;
+
+-- Recalcular las estadísticas de las membresías afectadas por el borrado
+SELECT actualizar_estadisticas_membresia(id) FROM membresias;
+
+COMMIT;
@@ -0,0 +1,135 @@
+-- =====================================================
+-- CLASS VISION - Migración 002
+-- Estadísticas de membresía incrementales
+-- =====================================================
+-- trg_asistencia_estadisticas recalculaba con tres COUNT(*) sobre todo el
+-- historial de la membresía en cada INSERT; ahora suma o resta la fila
+-- (OLD/NEW). registros_totales guarda el denominador del porcentaje.
+-- La deriva se corrige con reconciliar_estadisticas_membresia
+-- (job periódico: python stats_reconciler.py).
+--
+-- Uso: psql -d class_vision -f migrations/002_estadisticas_incrementales.sql
+
+BEGIN;
+
+ALTER TABLE membresias ADD COLUMN IF NOT EXISTS registros_totales INTEGER DEFAULT 0;
+
+-- Función para recalcular desde cero las estadísticas de una membresía
+-- (sólo reconciliación y migraciones; el trigger usa ajustar_estadisticas_membresia)
+CREATE OR REPLACE FUNCTION actualizar_estadisticas_membresia(p_membresia_id INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    UPDATE membresias m
+    SET 
+        registros_totales = r.registros,
+        asistencias_totales = r.asistencias,
+        faltas_totales = r.faltas,
+        porcentaje_asistencia = CASE 
+            WHEN r.registros > 0 THEN r.asistencias::DECIMAL / r.registros * 100
+            ELSE 0 
+        END
+    FROM (
+        SELECT 
+            COUNT(*) AS registros,
+            COUNT(*) FILTER (WHERE estado IN ('presente', 'tarde')) AS asistencias,
+            COUNT(*) FILTER (WHERE estado = 'ausente') AS faltas
+        FROM asistencia_log a 
+        WHERE a.membresia_id = p_membresia_id
+    ) r
+    WHERE m.id = p_membresia_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Función para sumar (p_signo = 1) o restar (p_signo = -1) una fila de
+-- asistencia a las estadísticas, sin recorrer el historial
+CREATE OR REPLACE FUNCTION ajustar_estadisticas_membresia(
+    p_membresia_id INTEGER, p_estado VARCHAR, p_signo INTEGER
+)
+RETURNS VOID AS $$
+DECLARE
+    d_asistencias INTEGER := CASE WHEN p_estado IN ('presente', 'tarde') THEN p_signo ELSE 0 END;
+    d_faltas INTEGER := CASE WHEN p_estado = 'ausente' THEN p_signo ELSE 0 END;
+BEGIN
+    -- Todas las expresiones del SET leen los valores previos de la fila
+    UPDATE membresias m
+    SET 
+        registros_totales = COALESCE(m.registros_totales, 0) + p_signo,
+        asistencias_totales = COALESCE(m.asistencias_totales, 0) + d_asistencias,
+        faltas_totales = COALESCE(m.faltas_totales, 0) + d_faltas,
+        porcentaje_asistencia = CASE 
+            WHEN COALESCE(m.registros_totales, 0) + p_signo > 0 THEN 
+                (COALESCE(m.asistencias_totales, 0) + d_asistencias)::DECIMAL
+                / (COALESCE(m.registros_totales, 0) + p_signo) * 100
+            ELSE 0 
+        END
+    WHERE m.id = p_membresia_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Función para corregir la deriva de una membresía (job de reconciliación)
+-- Bloquea la fila antes de contar: un INSERT concurrente espera y aplica
+-- su delta sobre el valor corregido. Devuelve TRUE si había diferencias.
+CREATE OR REPLACE FUNCTION reconciliar_estadisticas_membresia(p_membresia_id INTEGER)
+RETURNS BOOLEAN AS $$
+DECLARE
+    guardado RECORD;
+    conteo RECORD;
+BEGIN
+    SELECT registros_totales, asistencias_totales, faltas_totales
+    INTO guardado
+    FROM membresias WHERE id = p_membresia_id
+    FOR UPDATE;
+    
+    IF NOT FOUND THEN
+        RETURN FALSE;
+    END IF;
+    
+    SELECT 
+        COUNT(*) AS registros,
+        COUNT(*) FILTER (WHERE estado IN ('presente', 'tarde')) AS asistencias,
+        COUNT(*) FILTER (WHERE estado = 'ausente') AS faltas
+    INTO conteo
+    FROM asistencia_log WHERE membresia_id = p_membresia_id;
+    
+    IF guardado.registros_totales IS NOT DISTINCT FROM conteo.registros::INTEGER
+       AND guardado.asistencias_totales IS NOT DISTINCT FROM conteo.asistencias::INTEGER
+       AND guardado.faltas_totales IS NOT DISTINCT FROM conteo.faltas::INTEGER THEN
+        RETURN FALSE;
+    END IF;
+    
+    PERFORM actualizar_estadisticas_membresia(p_membresia_id);
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger para actualizar estadísticas automáticamente (deltas desde OLD/NEW)
+CREATE OR REPLACE FUNCTION trigger_actualizar_estadisticas()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.membresia_id = NEW.membresia_id
+       AND OLD.estado IS NOT DISTINCT FROM NEW.estado THEN
+        RETURN NULL;
+    END IF;
+    
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM ajustar_estadisticas_membresia(OLD.membresia_id, OLD.estado, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM ajustar_estadisticas_membresia(NEW.membresia_id, NEW.estado, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_asistencia_estadisticas ON asistencia_log;
+
+CREATE TRIGGER trg_asistencia_estadisticas
+AFTER INSERT OR DELETE OR UPDATE OF membresia_id, estado ON asistencia_log
+FOR EACH ROW
+EXECUTE FUNCTION trigger_actualizar_estadisticas();
+
+-- Punto de partida exacto para los deltas
+SELECT actualizar_estadisticas_membresia(id) FROM membresias;
+
+COMMIT;
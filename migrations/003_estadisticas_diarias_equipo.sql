@@ -0,0 +1,127 @@
+-- =====================================================
+-- CLASS VISION - Migración 003
+-- Resumen diario de asistencia por equipo
+-- =====================================================
+-- /api/equipos/<id>/stats agregaba asistencia_log JOIN membresias en cada
+-- llamada (hoy y GROUP BY de los últimos 7 días). estadisticas_diarias_equipo
+-- guarda una fila por equipo y día que el trigger de asistencia_log mantiene
+-- por deltas; reconstruir_estadisticas_diarias la recalcula desde el log
+-- (el job de stats_reconciler.py reconstruye los últimos días).
+--
+-- Requiere la migración 002.
+-- Uso: psql -d class_vision -f migrations/003_estadisticas_diarias_equipo.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS estadisticas_diarias_equipo (
+    equipo_id INTEGER NOT NULL REFERENCES equipos(id) ON DELETE CASCADE,
+    fecha DATE NOT NULL,
+    registros INTEGER NOT NULL DEFAULT 0,
+    presentes INTEGER NOT NULL DEFAULT 0,
+    tardes INTEGER NOT NULL DEFAULT 0,
+    ausentes INTEGER NOT NULL DEFAULT 0,
+    justificados INTEGER NOT NULL DEFAULT 0,
+    
+    PRIMARY KEY (equipo_id, fecha)
+);
+
+COMMENT ON TABLE estadisticas_diarias_equipo IS 'Resumen de asistencia por equipo y día (mantenido por trigger)';
+
+-- Función para sumar (p_signo = 1) o restar (p_signo = -1) una fila de
+-- asistencia al resumen diario de su equipo
+CREATE OR REPLACE FUNCTION ajustar_estadisticas_diarias(
+    p_membresia_id INTEGER, p_fecha DATE, p_estado VARCHAR, p_signo INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    -- Si la membresía ya no existe (borrado en cascada) no hay equipo que
+    -- ajustar; la reconstrucción periódica corrige esos días
+    INSERT INTO estadisticas_diarias_equipo AS d (
+        equipo_id, fecha, registros, presentes, tardes, ausentes, justificados
+    )
+    SELECT 
+        m.equipo_id, p_fecha, p_signo,
+        CASE WHEN p_estado = 'presente' THEN p_signo ELSE 0 END,
+        CASE WHEN p_estado = 'tarde' THEN p_signo ELSE 0 END,
+        CASE WHEN p_estado = 'ausente' THEN p_signo ELSE 0 END,
+        CASE WHEN p_estado = 'justificado' THEN p_signo ELSE 0 END
+    FROM membresias m WHERE m.id = p_membresia_id
+    ON CONFLICT (equipo_id, fecha) DO UPDATE SET 
+        registros = d.registros + EXCLUDED.registros,
+        presentes = d.presentes + EXCLUDED.presentes,
+        tardes = d.tardes + EXCLUDED.tardes,
+        ausentes = d.ausentes + EXCLUDED.ausentes,
+        justificados = d.justificados + EXCLUDED.justificados;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Función para recalcular el resumen diario desde asistencia_log, desde
+-- p_desde o completo si es NULL. Bloquea el resumen mientras tanto: los
+-- INSERT concurrentes esperan y aplican su delta sobre lo reconstruido.
+-- Devuelve las filas (equipo, día) escritas.
+CREATE OR REPLACE FUNCTION reconstruir_estadisticas_diarias(p_desde DATE DEFAULT NULL)
+RETURNS INTEGER AS $$
+DECLARE
+    filas INTEGER;
+BEGIN
+    LOCK TABLE estadisticas_diarias_equipo IN EXCLUSIVE MODE;
+    
+    DELETE FROM estadisticas_diarias_equipo
+    WHERE p_desde IS NULL OR fecha >= p_desde;
+    
+    INSERT INTO estadisticas_diarias_equipo (
+        equipo_id, fecha, registros, presentes, tardes, ausentes, justificados
+    )
+    SELECT 
+        m.equipo_id,
+        a.fecha,
+        COUNT(*),
+        COUNT(*) FILTER (WHERE a.estado = 'presente'),
+        COUNT(*) FILTER (WHERE a.estado = 'tarde'),
+        COUNT(*) FILTER (WHERE a.estado = 'ausente'),
+        COUNT(*) FILTER (WHERE a.estado = 'justificado')
+    FROM asistencia_log a
+    JOIN membresias m ON a.membresia_id = m.id
+    WHERE p_desde IS NULL OR a.fecha >= p_desde
+    GROUP BY m.equipo_id, a.fecha;
+    
+    GET DIAGNOSTICS filas = ROW_COUNT;
+    RETURN filas;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Trigger para actualizar estadísticas automáticamente (deltas desde OLD/NEW):
+-- las de la membresía y el resumen diario de su equipo
+CREATE OR REPLACE FUNCTION trigger_actualizar_estadisticas()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND OLD.membresia_id = NEW.membresia_id
+       AND OLD.fecha = NEW.fecha
+       AND OLD.estado IS NOT DISTINCT FROM NEW.estado THEN
+        RETURN NULL;
+    END IF;
+    
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM ajustar_estadisticas_membresia(OLD.membresia_id, OLD.estado, -1);
+        PERFORM ajustar_estadisticas_diarias(OLD.membresia_id, OLD.fecha, OLD.estado, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM ajustar_estadisticas_membresia(NEW.membresia_id, NEW.estado, 1);
+        PERFORM ajustar_estadisticas_diarias(NEW.membresia_id, NEW.fecha, NEW.estado, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_asistencia_estadisticas ON asistencia_log;
+
+CREATE TRIGGER trg_asistencia_estadisticas
+AFTER INSERT OR DELETE OR UPDATE OF membresia_id, estado, fecha ON asistencia_log
+FOR EACH ROW
+EXECUTE FUNCTION trigger_actualizar_estadisticas();
+
+-- Carga inicial desde todo el historial
+SELECT reconstruir_estadisticas_diarias(NULL);
+
+COMMIT;
@@ -27,6 +27,14 @@ from db_student_manager import DBStudentManager
 
 # Importar blueprints nuevos
 from api_routes_flexible import api_bp
+from face_detector_pool import detect_scaled, warm_up as warm_up_detectors
+from stats_reconciler import start_stats_reconciler
+from face_crop_store import NS_ESTUDIANTES, crops_from_image, get_crop_store
+from attendance_journal import get_attendance_journal
+from student_recognition import get_enrollment_index, get_student_model
+from training_jobs import get_training_queue, submit_global_training
+from frame_upload import read_frame_upload, decode_frame
+import db_engine
 
 # Inicializar StudentManager
 student_manager = DBStudentManager()
@@ -75,6 +83,16 @@ try:
 except Exception as e:
     print(f"⚠️ Advertencia: Error al registrar blueprint: {e}")
 
+# Cerrar al final de cada petición las sesiones del engine compartido
+db_engine.init_app(app)
+
+# Canal WebSocket de reconocimiento en vivo (requiere flask-sock)
+try:
+    from live_recognition import sock
+    sock.init_app(app)
+except ImportError as e:
+    print(f"⚠️ Canal WebSocket deshabilitado ({e}); se usará reconocimiento por HTTP")
+
 # Instancia de autenticación flexible (lazy initialization)
 auth_manager = None
 
@@ -355,10 +373,10 @@ def get_status():
 def get_attendance_history(subject):
     """Obtiene el historial de asistencia de una materia"""
     try:
-        subject_path = ATTENDANCE_PATH / subject / "attendance.csv"
-        if subject_path.exists():
-            df = pd.read_csv(subject_path)
-            records = df.to_dict('records')
+        subject_path = ATTENDANCE_PATH / subject
+        if (subject_path / "attendance.csv").exists() or (subject_path / "attendance.journal").exists():
+            # CSV compactado más lo que todavía está en el diario
+            records = get_attendance_journal().records(subject)
             return jsonify({
                 'subject': subject,
                 'records': records,
@@ -589,6 +607,7 @@ def register_student():
         
         # 2. Guardar fotos
         import re
+        crops, crop_sources, without_face = [], [], []
         for idx, photo_data in enumerate(photos):
             # Decodificar base64
             photo_data = re.sub('^data:image/.+;base64,', '', photo_data)
@@ -601,6 +620,16 @@ def register_student():
                 filename = f"{name}_{enrollment}_{idx+1}.jpg"
                 filepath = training_image_path / filename
                 cv2.imwrite(str(filepath), img)
+                
+                # Recortar el rostro una sola vez, al guardar la foto
+                photo_crops = crops_from_image(img)
+                crops.extend(photo_crops)
+                crop_sources.extend([filename] * len(photo_crops))
+                if not photo_crops:
+                    without_face.append(filename)
+        
+        get_crop_store().add(NS_ESTUDIANTES, int(enrollment), crops, int(enrollment),
+                             crop_sources, without_face)
         
         # 3. Agregar estudiante al CSV global
         student_data = {
@@ -626,47 +655,19 @@ def register_student():
         if not result.get('success'):
             print(f"⚠️ Advertencia: {result.get('error', 'No se pudo agregar estudiante')}")
         
-        # 5. Entrenar modelo
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        recognizer = cv2.face.LBPHFaceRecognizer_create()
-        
-        faces = []
-        ids = []
-        
-        # Leer todas las imágenes de entrenamiento
-        for image_file in training_image_path.glob("*.jpg"):
-            try:
-                # Extraer ID del nombre del archivo
-                parts = image_file.stem.split('_')
-                if len(parts) >= 2:
-                    student_id = int(parts[-2])
-                    
-                    img = cv2.imread(str(image_file))
-                    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                    
-                    # Detectar rostros
-                    detected_faces = face_cascade.detectMultiScale(gray, 1.3, 5)
-                    
-                    for (x, y, w, h) in detected_faces:
-                        faces.append(gray[y:y+h, x:x+w])
-                        ids.append(student_id)
-            except:
-                continue
-        
-        if len(faces) > 0:
-            # Entrenar modelo
-            recognizer.train(faces, np.array(ids))
-            
-            # Guardar modelo
-            trainer_path = BASE_DIR / "TrainingImageLabel"
-            trainer_path.mkdir(exist_ok=True)
-            recognizer.write(str(trainer_path / "Trainner.yml"))
-            
+        # 5. Entrenar modelo en segundo plano: sólo los recortes nuevos se
+        #    añaden con update(); registros seguidos se fusionan en un trabajo
+        if len(crops) > 0:
+            job, _ = submit_global_training(
+                int(enrollment), BASE_DIR / "TrainingImageLabel" / "Trainner.yml"
+            )
             return jsonify({
                 'success': True,
                 'message': f'Estudiante {name} registrado con {len(photos)} fotos',
-                'faces_trained': len(faces)
-            })
+                'faces_trained': len(crops),
+                'training_job_id': job.id,
+                'training_status': job.estado
+            }), 202
         else:
             return jsonify({'success': False, 'error': 'No se detectaron rostros en las fotos'}), 400
         
@@ -676,9 +677,29 @@ def register_student():
         traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/training-jobs/<job_id>', methods=['GET'])
+def get_training_job(job_id):
+    """Estado y avance de un trabajo de entrenamiento"""
+    token = request.headers.get('Authorization', '').replace('Bearer ', '')
+    manager = get_auth_manager()
+    validation = manager.validate_token(token) if manager and token else {'valid': False}
+    if not validation.get('valid'):
+        return jsonify({'success': False, 'error': 'No autorizado'}), 401
+    
+    job = get_training_queue().get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
 @app.route('/api/recognize-frame', methods=['POST'])
 def recognize_frame():
-    """Reconoce rostros desde una imagen capturada por el móvil"""
+    """
+    Reconoce todos los rostros de una imagen capturada por el móvil
+    
+    Cada rostro se compara contra el modelo global residente y los
+    nombres salen del padrón en memoria; los estudiantes reconocidos se
+    agregan al diario de asistencia de la materia.
+    """
     try:
         token = request.headers.get('Authorization', '').replace('Bearer ', '')
         user = auth_manager.validate_token(token)
@@ -686,100 +707,87 @@ def recognize_frame():
         if not user:
             return jsonify({'success': False, 'error': 'No autorizado'}), 401
         
-        data = request.json
-        image_data = data.get('image')  # Base64
+        # Imagen como image/jpeg, multipart o base64 en JSON
+        image_bytes, data = read_frame_upload('image')
         subject = data.get('subject')
         
-        if not image_data or not subject:
+        if not image_bytes or not subject:
             return jsonify({'recognized': False, 'error': 'Datos incompletos'}), 400
         
-        # Decodificar imagen base64
-        import re
-        image_data = re.sub('^data:image/.+;base64,', '', image_data)
-        image_bytes = base64.b64decode(image_data)
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        img = decode_frame(image_bytes)
         
         if img is None:
             return jsonify({'recognized': False, 'error': 'Imagen inválida'}), 400
         
-        # Cargar reconocedor
-        recognizer_path = BASE_DIR / "TrainingImageLabel" / "Trainner.yml"
-        if not recognizer_path.exists():
-            return jsonify({'recognized': False, 'error': 'Modelo no entrenado'}), 400
-        
-        recognizer = cv2.face.LBPHFaceRecognizer_create()
-        recognizer.read(str(recognizer_path))
-        
         # Detectar rostros
-        face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, 1.3, 5)
+        faces = detect_scaled(gray)
         
         if len(faces) == 0:
-            return jsonify({'recognized': False, 'message': 'No se detectó rostro'})
-        
-        # Reconocer primer rostro
-        (x, y, w, h) = faces[0]
-        face_roi = gray[y:y+h, x:x+w]
-        enrollment, confidence = recognizer.predict(face_roi)
-        
-        if confidence < 85:  # Umbral de confianza
-            # Buscar estudiante en CSV
-            if STUDENT_DETAILS_PATH.exists():
-                df = pd.read_csv(STUDENT_DETAILS_PATH)
-                student = df[df['Enrollment'] == enrollment]
-                
-                if not student.empty:
-                    name = student.iloc[0]['Name']
-                    
-                    # Registrar asistencia
-                    from datetime import datetime
-                    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    subject_path = ATTENDANCE_PATH / subject
-                    subject_path.mkdir(exist_ok=True)
-                    attendance_file = subject_path / "attendance.csv"
-                    
-                    # Agregar registro
-                    attendance_data = {
-                        'Enrollment': [enrollment],
-                        'Name': [name],
-                        'Date': [timestamp.split()[0]],
-                        'Time': [timestamp.split()[1]]
-                    }
-                    
-                    if attendance_file.exists():
-                        df_att = pd.read_csv(attendance_file)
-                        # Verificar si ya tiene asistencia hoy
-                        today = timestamp.split()[0]
-                        already_present = ((df_att['Enrollment'] == enrollment) & (df_att['Date'] == today)).any()
-                        
-                        if not already_present:
-                            df_new = pd.DataFrame(attendance_data)
-                            df_att = pd.concat([df_att, df_new], ignore_index=True)
-                            df_att.to_csv(attendance_file, index=False)
-                            
-                            return jsonify({
-                                'recognized': True,
-                                'name': name,
-                                'enrollment': str(enrollment),
-                                'confidence': float(confidence)
-                            })
-                        else:
-                            return jsonify({'recognized': False, 'message': 'Ya registrado hoy'})
-                    else:
-                        df_new = pd.DataFrame(attendance_data)
-                        df_new.to_csv(attendance_file, index=False)
-                        
-                        return jsonify({
-                            'recognized': True,
-                            'name': name,
-                            'enrollment': str(enrollment),
-                            'confidence': float(confidence)
-                        })
-        
-        return jsonify({'recognized': False, 'message': 'Rostro no reconocido'})
+            return jsonify({'recognized': False, 'message': 'No se detectó rostro', 'students': []})
+        
+        # Reconocer todos los rostros con el modelo residente
+        predictions = get_student_model().predict_batch(gray, faces)
+        if predictions is None:
+            return jsonify({'recognized': False, 'error': 'Modelo no entrenado'}), 400
+        
+        index = get_enrollment_index()
+        candidates = {}
+        for (x, y, w, h), (enrollment, confidence) in zip(faces, predictions):
+            if confidence >= 85:  # Umbral de confianza
+                continue
+            name = index.name_for(enrollment)
+            if name is None:
+                continue
+            # Si el mismo estudiante aparece dos veces se queda la mejor coincidencia
+            previous = candidates.get(enrollment)
+            if previous is None or confidence < previous['confidence']:
+                candidates[enrollment] = {
+                    'enrollment': str(enrollment),
+                    'name': name,
+                    'confidence': confidence,
+                    'box': [int(x), int(y), int(w), int(h)]
+                }
+        
+        if not candidates:
+            return jsonify({
+                'recognized': False,
+                'message': 'Rostro no reconocido',
+                'faces_detected': len(faces),
+                'students': []
+            })
+        
+        # Registrar asistencia en el diario de la materia (append-only; el
+        # duplicado del día se resuelve en memoria)
+        journal = get_attendance_journal().subject(subject)
+        now = datetime.now()
+        for enrollment, student in candidates.items():
+            if journal.record(enrollment, student['name'], now):
+                student['status'] = 'registrado'
+            else:
+                student['status'] = 'ya_registrado'
+        
+        students = sorted(candidates.values(), key=lambda student: student['confidence'])
+        registered = [student for student in students if student['status'] == 'registrado']
+        
+        if not registered:
+            return jsonify({
+                'recognized': False,
+                'message': 'Ya registrado hoy',
+                'faces_detected': len(faces),
+                'students': students
+            })
+        
+        # Los campos de primer nivel describen al primer registrado (clientes anteriores)
+        best = registered[0]
+        return jsonify({
+            'recognized': True,
+            'name': best['name'],
+            'enrollment': best['enrollment'],
+            'confidence': best['confidence'],
+            'faces_detected': len(faces),
+            'students': students
+        })
         
     except Exception as e:
         print(f"Error en recognize_frame: {e}")
@@ -946,6 +954,15 @@ def start_server(port=None, debug=None):
     templates_dir = BASE_DIR / "templates"
     templates_dir.mkdir(exist_ok=True)
     
+    # Precargar detectores para que la primera petición no pague la carga
+    try:
+        warm_up_detectors()
+    except Exception as e:
+        print(f"⚠️ No se pudieron precargar los detectores: {e}")
+    
+    # Corregir periódicamente la deriva de las estadísticas de membresía
+    start_stats_reconciler()
+    
     # Ejecutar sin SSL para compatibilidad con navegadores móviles
     app.run(host='0.0.0.0', port=port, debug=debug, threaded=True)
 
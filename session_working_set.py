@@ -0,0 +1,202 @@
+"""
+CLASS VISION - Conjunto de Trabajo por Sesión de Asistencia
+Mientras una sesión está activa el servidor mantiene en memoria su
+equipo, los miembros con rostro, la galería de modelos y las membresías
+que ya marcaron hoy. Los frames de /facial/reconocer-frame y del canal
+WebSocket ya no consultan la sesión, los miembros ni asistencia_log
+"""
+
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import text
+
+from attendance_recognition import get_active_session_team, get_team_members_with_models
+from attendance_writer import get_write_buffer
+from face_gallery import get_gallery_manager
+from utils.config_manager import get_config
+from utils.logger import get_logger
+
+
+class SessionWorkingSet:
+    """
+    Estado residente de una sesión de asistencia
+
+    `ya_marcados` se carga de asistencia_log al abrir la sesión (y en
+    cada revalidación, para ver las marcas por QR o manuales) y se
+    actualiza al aceptar cada asistencia; al cambiar el día se vacía.
+    La sesión y los miembros se revalidan cada `refresh_seconds` para
+    ver miembros nuevos o una sesión finalizada desde otro proceso.
+    """
+
+    def __init__(self, sesion_id: int, equipo_id: int, refresh_seconds: float):
+        self.sesion_id = sesion_id
+        self.equipo_id = equipo_id
+        self.refresh_seconds = refresh_seconds
+        self.miembros = []
+        self.gallery = None
+        self._marcados: Set[int] = set()
+        self._fecha = date.today()
+        self._lock = threading.Lock()
+        self.refreshed_at = 0.0
+        self.frames = 0
+
+    @property
+    def ya_marcados(self) -> Set[int]:
+        """Membresías que ya marcaron hoy (se vacía al cambiar de día)"""
+        hoy = date.today()
+        if hoy != self._fecha:
+            with self._lock:
+                if hoy != self._fecha:
+                    self._marcados = set()
+                    self._fecha = hoy
+        return self._marcados
+
+    def try_mark(self, membresia_id: int) -> bool:
+        """
+        Aceptar la asistencia de hoy de una membresía
+
+        Returns:
+            True si es nueva, False si ya había marcado (atómico entre hilos)
+        """
+        marcados = self.ya_marcados
+        with self._lock:
+            if membresia_id in marcados:
+                return False
+            marcados.add(membresia_id)
+            return True
+
+    def count_frame(self):
+        """Contar un frame procesado (varias conexiones comparten la sesión)"""
+        with self._lock:
+            self.frames += 1
+
+    def unmark(self, membresia_id: int):
+        """Deshacer una marca aceptada cuya fila no se pudo escribir"""
+        with self._lock:
+            self._marcados.discard(membresia_id)
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self.refreshed_at > self.refresh_seconds
+
+    def load(self, db_session):
+        """Cargar miembros, galería y las asistencias de hoy"""
+        self.miembros = get_team_members_with_models(db_session, self.equipo_id)
+        self.gallery = get_gallery_manager().get_gallery(self.equipo_id, self.miembros)
+
+        filas = db_session.execute(text("""
+            SELECT a.membresia_id
+            FROM asistencia_log a
+            JOIN membresias m ON a.membresia_id = m.id
+            WHERE m.equipo_id = :equipo_id AND a.fecha = CURRENT_DATE
+        """), {'equipo_id': self.equipo_id}).fetchall()
+        # Se suman a las aceptadas en memoria, que pueden no estar escritas aún
+        marcados = self.ya_marcados
+        with self._lock:
+            marcados.update(int(fila[0]) for fila in filas)
+
+        self.refreshed_at = time.monotonic()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'sesion_id': self.sesion_id,
+            'equipo_id': self.equipo_id,
+            'miembros': len(self.miembros),
+            'ya_marcados': len(self.ya_marcados),
+            'frames': self.frames
+        }
+
+
+class SessionRegistry:
+    """
+    Conjuntos de trabajo de las sesiones activas del proceso
+
+    start_session crea el conjunto y end_session / stop_attendance_session
+    lo descartan. Una sesión iniciada antes de arrancar el servidor (o en
+    otro proceso) se carga la primera vez que llega un frame.
+    """
+
+    def __init__(self):
+        self.logger = get_logger(__name__)
+        self.refresh_seconds = float(get_config().get("attendance.session_refresh_seconds", 30))
+        self._sets: Dict[int, SessionWorkingSet] = {}
+        self._lock = threading.Lock()
+        get_write_buffer().on_discard(self._on_discard)
+
+    def open(self, db_session, sesion_id: int, equipo_id: int) -> SessionWorkingSet:
+        """Crear y cargar el conjunto de trabajo de una sesión recién iniciada"""
+        working_set = SessionWorkingSet(int(sesion_id), int(equipo_id), self.refresh_seconds)
+        working_set.load(db_session)
+        with self._lock:
+            self._sets[working_set.sesion_id] = working_set
+        self.logger.info(
+            f"Sesión {sesion_id} en memoria: equipo {equipo_id}, "
+            f"{len(working_set.miembros)} miembros, {len(working_set.ya_marcados)} ya marcados"
+        )
+        return working_set
+
+    def get(self, db_session, sesion_id: int) -> Optional[SessionWorkingSet]:
+        """
+        Conjunto de trabajo de una sesión activa
+
+        Returns:
+            SessionWorkingSet o None si la sesión no existe o no está activa
+        """
+        sesion_id = int(sesion_id)
+        with self._lock:
+            working_set = self._sets.get(sesion_id)
+
+        if working_set is not None and not working_set.is_stale():
+            return working_set
+
+        equipo_id = get_active_session_team(db_session, sesion_id)
+        if equipo_id is None:
+            self.drop(sesion_id)
+            return None
+
+        if working_set is None:
+            return self.open(db_session, sesion_id, equipo_id)
+
+        # Revalidación periódica: miembros, galería y marcas hechas por otras vías
+        working_set.load(db_session)
+        return working_set
+
+    def drop(self, sesion_id: int) -> bool:
+        """Descartar el conjunto de trabajo de una sesión finalizada"""
+        with self._lock:
+            working_set = self._sets.pop(int(sesion_id), None)
+        if working_set is not None:
+            # Las asistencias aceptadas deben quedar escritas al cerrar la sesión
+            get_write_buffer().flush()
+            self.logger.info(f"Sesión {sesion_id} descartada de memoria ({working_set.frames} frames)")
+        return working_set is not None
+
+    def _on_discard(self, mark):
+        """Una marca descartada por el buffer vuelve a poder registrarse"""
+        with self._lock:
+            working_sets = [ws for ws in self._sets.values() if ws.equipo_id == mark.equipo_id]
+        for working_set in working_sets:
+            working_set.unmark(mark.membresia_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'sesiones': [working_set.to_dict() for working_set in self._sets.values()]
+            }
+
+
+# Instancia singleton
+_registry_instance = None
+_registry_lock = threading.Lock()
+
+
+def get_session_registry() -> SessionRegistry:
+    """Obtener los conjuntos de trabajo de sesión compartidos por el proceso"""
+    global _registry_instance
+    if _registry_instance is None:
+        with _registry_lock:
+            if _registry_instance is None:
+                _registry_instance = SessionRegistry()
+    return _registry_instance
@@ -1,4 +1,3 @@
-import pandas as pd
 from glob import glob
 import os
 import tkinter
@@ -6,6 +5,8 @@ import csv
 import tkinter as tk
 from tkinter import *
 
+from attendance_store import get_attendance_store
+
 # Configuración del tema griego
 GREEK_BG = "#F8F4E3"           # Beige claro
 GREEK_CONTAINER = "#E6E1D4"     # Beige medio
@@ -37,14 +38,14 @@ def subjectchoose(text_to_speech):
             Notifica.place(x=50, y=270)
             text_to_speech(msg)
             return
-        df = [pd.read_csv(f) for f in filenames]
-        newdf = df[0]
-        for i in range(1, len(df)):
-            newdf = newdf.merge(df[i], how="outer")
-        newdf.fillna(0, inplace=True)
-        newdf["Asistencia"] = 0
-        for i in range(len(newdf)):
-            newdf["Asistencia"].iloc[i] = str(int(round(newdf.iloc[i, 2:-1].mean() * 100)))+'%'
+        # Un solo pivot (estudiante x fecha) sobre el almacén columnar
+        newdf = get_attendance_store().report(Subject)
+        if newdf is None:
+            msg = f"Los pergaminos de '{Subject}' no tienen registros."
+            Notifica.configure(text=msg, bg=GREEK_CONTAINER, fg=GREEK_DARK, width=50, font=("Playfair Display", 11, "bold"))
+            Notifica.place(x=50, y=270)
+            text_to_speech(msg)
+            return
         newdf.to_csv(os.path.join(path, "attendance.csv"), index=False)
 
         # Mostrar resultados con estilo griego
@@ -66,6 +66,17 @@ if __name__ == '__main__':
     
     try:
         from mobile_server import app
+        from face_detector_pool import warm_up
+        from stats_reconciler import start_stats_reconciler
+        
+        # Precargar detectores para que la primera petición no pague la carga
+        try:
+            warm_up()
+        except Exception as e:
+            print(f"⚠️ No se pudieron precargar los detectores: {e}")
+        
+        # Corregir periódicamente la deriva de las estadísticas de membresía
+        start_stats_reconciler()
         
         # Obtener configuración de variables de entorno
         debug_mode = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
@@ -74,8 +74,24 @@ const API_BASE = '/api';
             // Cargar estadísticas en tiempo real (sin bloquear)
             loadRealTimeStats();
             
-            // Actualizar stats cada 30 segundos
-            setInterval(loadRealTimeStats, 30000);
+            // Actualizar stats sólo cuando llega una nueva asistencia
+            subscribeAttendanceFeed();
+        }
+
+        // renderTeam se vuelve a llamar al recargar miembros: una sola suscripción
+        let attendanceFeed = null;
+
+        function subscribeAttendanceFeed() {
+            if (attendanceFeed) return;
+
+            if (!('EventSource' in window)) {
+                attendanceFeed = setInterval(loadRealTimeStats, 30000);
+                return;
+            }
+
+            const params = new URLSearchParams({ token: authToken });
+            attendanceFeed = new EventSource(`${API_BASE}/equipos/${teamId}/asistencias/stream?${params}`);
+            attendanceFeed.addEventListener('asistencia', () => loadRealTimeStats());
         }
 
         async function loadRealTimeStats() {
@@ -1,11 +1,14 @@
 const API_BASE = '/api';
         let videoStream = null;
         let reconocimientoInterval = null;
+        let canalReconocimiento = null;
+        let esperandoRespuesta = false;
         let sesionActual = null;
         let reconocidos = new Set();
         let timerInterval = null;
         let tiempoInicio = null;
         let actualizacionInterval = null;
+        let feedAsistencias = null;
         const equipoId = new URLSearchParams(window.location.search).get('equipo_id');
 
         // Cargar datos del equipo
@@ -139,6 +142,13 @@ const API_BASE = '/api';
                 console.log('🛑 Deteniendo sesión...', sesionActual);
                 const token = localStorage.getItem('authToken');
 
+                // Cerrar canal WebSocket (sin volver a HTTP)
+                if (canalReconocimiento) {
+                    const canal = canalReconocimiento;
+                    canalReconocimiento = null;
+                    canal.close();
+                }
+
                 // Detener reconocimiento
                 if (reconocimientoInterval) {
                     clearInterval(reconocimientoInterval);
@@ -153,6 +163,12 @@ const API_BASE = '/api';
                     console.log('✅ Timer detenido');
                 }
                 
+                // Cerrar feed de asistencias
+                if (feedAsistencias) {
+                    feedAsistencias.close();
+                    feedAsistencias = null;
+                }
+
                 // Detener actualización periódica
                 if (actualizacionInterval) {
                     clearInterval(actualizacionInterval);
@@ -223,59 +239,128 @@ const API_BASE = '/api';
             }
         }
 
-        // Iniciar reconocimiento automático
+        // Iniciar reconocimiento automático (WebSocket si está disponible)
         function iniciarReconocimientoAutomatico() {
+            if ('WebSocket' in window && abrirCanalReconocimiento()) return;
+            iniciarReconocimientoHTTP();
+        }
+
+        // Respaldo: un POST por frame
+        function iniciarReconocimientoHTTP() {
+            console.log('📡 Reconocimiento por HTTP');
             reconocimientoInterval = setInterval(async () => {
                 await capturarYReconocer();
             }, 2000); // Reconocer cada 2 segundos
         }
 
+        // Canal persistente: el servidor mantiene sesión, miembros y galería
+        function abrirCanalReconocimiento() {
+            try {
+                const token = localStorage.getItem('authToken');
+                const protocolo = window.location.protocol === 'https:' ? 'wss' : 'ws';
+                const params = new URLSearchParams({ token });
+                const ws = new WebSocket(`${protocolo}://${window.location.host}${API_BASE}/facial/ws/sesion/${sesionActual}?${params}`);
+                canalReconocimiento = ws;
+                esperandoRespuesta = false;
+
+                ws.onmessage = (event) => {
+                    const data = JSON.parse(event.data);
+                    if (data.tipo === 'listo') {
+                        console.log('🔌 Canal de reconocimiento listo, miembros:', data.miembros);
+                        reconocimientoInterval = setInterval(enviarFrameCanal, 1000);
+                    } else if (data.tipo === 'resultado') {
+                        esperandoRespuesta = false;
+                        procesarResultado(data);
+                    } else if (data.tipo === 'error' || data.tipo === 'sesion_finalizada') {
+                        console.warn('⚠️ Canal de reconocimiento:', data.error);
+                    }
+                };
+
+                ws.onclose = () => {
+                    if (reconocimientoInterval) {
+                        clearInterval(reconocimientoInterval);
+                        reconocimientoInterval = null;
+                    }
+                    // Cierre inesperado con la sesión activa: volver a HTTP
+                    if (canalReconocimiento === ws) {
+                        canalReconocimiento = null;
+                        if (sesionActual) iniciarReconocimientoHTTP();
+                    }
+                };
+                return true;
+            } catch (error) {
+                console.error('❌ No se pudo abrir el canal WebSocket:', error);
+                canalReconocimiento = null;
+                return false;
+            }
+        }
+
+        // Capturar el frame actual como JPEG binario
+        async function capturarFrame() {
+            const video = document.getElementById('videoElement');
+            const canvas = document.getElementById('canvas');
+            const context = canvas.getContext('2d');
+
+            canvas.width = video.videoWidth;
+            canvas.height = video.videoHeight;
+            context.drawImage(video, 0, 0, canvas.width, canvas.height);
+
+            // JPEG binario: sin base64 ni JSON (un 33% menos de datos)
+            return new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.8));
+        }
+
+        // Enviar un frame por el canal (uno a la vez, sin acumular)
+        async function enviarFrameCanal() {
+            const ws = canalReconocimiento;
+            if (!ws || ws.readyState !== WebSocket.OPEN || esperandoRespuesta) return;
+
+            const imagenBlob = await capturarFrame();
+            if (!imagenBlob) return;
+            esperandoRespuesta = true;
+            ws.send(imagenBlob);
+        }
+
         // Capturar frame y enviar a reconocimiento
         async function capturarYReconocer() {
             try {
                 console.log('🔍 Capturando frame para reconocimiento...');
-                const video = document.getElementById('videoElement');
-                const canvas = document.getElementById('canvas');
-                const context = canvas.getContext('2d');
-
-                canvas.width = video.videoWidth;
-                canvas.height = video.videoHeight;
-                context.drawImage(video, 0, 0, canvas.width, canvas.height);
-
-                const imagenBase64 = canvas.toDataURL('image/jpeg', 0.8);
-                console.log('📸 Frame capturado, tamaño:', imagenBase64.length, 'caracteres');
+                const imagenBlob = await capturarFrame();
+                if (!imagenBlob) return;
+                console.log('📸 Frame capturado, tamaño:', imagenBlob.size, 'bytes');
 
                 const token = localStorage.getItem('authToken');
                 console.log('🔑 Token:', token ? 'OK' : 'NO ENCONTRADO');
                 console.log('🆔 Sesión ID:', sesionActual);
 
-                const response = await fetch(`${API_BASE}/facial/reconocer-frame`, {
+                const params = new URLSearchParams({ sesion_id: sesionActual });
+                const response = await fetch(`${API_BASE}/facial/reconocer-frame?${params}`, {
                     method: 'POST',
                     headers: {
                         'Authorization': `Bearer ${token}`,
-                        'Content-Type': 'application/json'
+                        'Content-Type': 'image/jpeg'
                     },
-                    body: JSON.stringify({
-                        imagen: imagenBase64,
-                        sesion_id: sesionActual
-                    })
+                    body: imagenBlob
                 });
 
                 console.log('📡 Respuesta HTTP:', response.status);
                 const data = await response.json();
                 console.log('📦 Datos recibidos:', data);
-
-                if (data.success && data.reconocido && !data.ya_registrado) {
-                    console.log('✅ Usuario reconocido:', data.nombre);
-                    agregarReconocido(data);
-                } else if (data.mensaje) {
-                    console.log('ℹ️', data.mensaje);
-                }
+                procesarResultado(data);
             } catch (error) {
                 console.error('❌ Error en reconocimiento:', error);
             }
         }
 
+        // Mostrar el resultado de un frame (HTTP o WebSocket)
+        function procesarResultado(data) {
+            if (data.success && data.reconocido && !data.ya_registrado) {
+                console.log('✅ Usuario reconocido:', data.nombre);
+                agregarReconocido(data);
+            } else if (data.mensaje) {
+                console.log('ℹ️', data.mensaje);
+            }
+        }
+
         // Agregar usuario reconocido a la lista
         function agregarReconocido(data) {
             if (reconocidos.has(data.codigo)) return;
@@ -534,31 +619,56 @@ const API_BASE = '/api';
                 
                 const data = await response.json();
                 if (data.success && data.asistencias) {
-                    data.asistencias.forEach(asistencia => {
-                        if (!reconocidos.has(asistencia.codigo_usuario)) {
-                            agregarReconocido({
-                                codigo: asistencia.codigo_usuario,
-                                nombre: asistencia.nombre_completo,
-                                confianza: 100,
-                                mensaje: 'Asistencia registrada'
-                            });
-                        }
-                    });
+                    data.asistencias.forEach(mostrarAsistencia);
                 }
             } catch (error) {
                 console.error('Error cargando asistencias:', error);
             }
         }
 
-        // Iniciar actualización periódica cada 5 segundos
+        // Agregar una asistencia (de la lista o del feed) si no se muestra ya
+        function mostrarAsistencia(asistencia) {
+            if (!reconocidos.has(asistencia.codigo_usuario)) {
+                agregarReconocido({
+                    codigo: asistencia.codigo_usuario,
+                    nombre: asistencia.nombre_completo,
+                    confianza: 100,
+                    mensaje: 'Asistencia registrada'
+                });
+            }
+        }
+
+        // Recibir las nuevas asistencias por SSE (sin consultas mientras no hay cambios)
         function iniciarActualizacionPeriodica() {
             if (actualizacionInterval) {
                 clearInterval(actualizacionInterval);
+                actualizacionInterval = null;
             }
-            
+            if (feedAsistencias) {
+                feedAsistencias.close();
+                feedAsistencias = null;
+            }
+
+            if ('EventSource' in window) {
+                const params = new URLSearchParams({ token: localStorage.getItem('authToken') });
+                feedAsistencias = new EventSource(`${API_BASE}/equipos/${equipoId}/asistencias/stream?${params}`);
+                feedAsistencias.addEventListener('asistencia', (event) => {
+                    mostrarAsistencia(JSON.parse(event.data));
+                });
+                // EventSource reconecta solo; al reconectar se recarga la lista
+                // por si se perdió algún evento mientras estaba desconectado
+                let primeraConexion = true;
+                feedAsistencias.onopen = () => {
+                    if (!primeraConexion) cargarAsistenciasExistentes();
+                    primeraConexion = false;
+                };
+                return;
+            }
+
+            // Navegadores sin SSE: consultar cada 5 segundos
             actualizacionInterval = setInterval(() => {
                 cargarAsistenciasExistentes();
-            }, 5000); // Actualizar cada 5 segundos
+            }, 5000);
         }
 
         // Mostrar botón QR cuando se inicia sesión
@@ -134,19 +134,21 @@ const token = localStorage.getItem('authToken');
             canvas.height = video.videoHeight;
             canvas.getContext('2d').drawImage(video, 0, 0);
             
-            const imageData = canvas.toDataURL('image/jpeg');
+            const imageBlob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg'));
+            if (!imageBlob) return;
+
+            const formData = new FormData();
+            formData.append('materia_id', currentMateria);
+            formData.append('image', imageBlob, 'frame.jpg');
 
             try {
+                // multipart: el navegador define Content-Type con el boundary
                 const response = await fetch('/api/attendance/recognize', {
                     method: 'POST',
                     headers: {
-                        'Authorization': `Bearer ${token}`,
-                        'Content-Type': 'application/json'
+                        'Authorization': `Bearer ${token}`
                     },
-                    body: JSON.stringify({
-                        materia_id: currentMateria,
-                        image_base64: imageData
-                    })
+                    body: formData
                 });
 
                 if (response.ok) {
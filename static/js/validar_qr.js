@@ -137,19 +137,20 @@ async function capturarYValidarAutomatico() {
         const ctx = canvas.getContext('2d');
         ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
         
-        // Convertir a base64
-        const imagenBase64 = canvas.toDataURL('image/jpeg', 0.8);
+        // Convertir a JPEG binario
+        const imagenBlob = await new Promise(resolve => canvas.toBlob(resolve, 'image/jpeg', 0.8));
+        if (!imagenBlob) {
+            return;
+        }
         
         // Enviar a backend para validación facial
-        const response = await fetch(`${API_BASE}/qr/confirmar-asistencia`, {
+        const params = new URLSearchParams({ codigo_qr: codigoQR });
+        const response = await fetch(`${API_BASE}/qr/confirmar-asistencia?${params}`, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'image/jpeg'
             },
-            body: JSON.stringify({
-                codigo_qr: codigoQR,
-                imagen: imagenBase64
-            })
+            body: imagenBlob
         });
         
         const data = await response.json();
@@ -0,0 +1,151 @@
+"""
+CLASS VISION - Reconciliación de Estadísticas de Membresía
+El trigger de asistencia_log mantiene asistencias_totales, faltas_totales
+y porcentaje_asistencia por deltas, y también el resumen diario
+estadisticas_diarias_equipo; este job los compara periódicamente con el
+conteo real y corrige la deriva (cargas masivas con el trigger
+desactivado, ediciones manuales, membresías borradas, etc.)
+
+Uso:
+    python stats_reconciler.py            # una pasada completa
+    python stats_reconciler.py --todo     # además, resumen diario de todo el historial
+"""
+
+import argparse
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+
+import db_engine
+from utils.config_manager import get_config
+from utils.logger import get_logger
+
+
+# Membresías reconciliadas por transacción: los bloqueos de fila se
+# liberan en cada commit para no frenar los INSERT de asistencia
+BATCH_SIZE = 200
+
+
+def reconcile_membership_stats(batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    Comparar y corregir las estadísticas de todas las membresías
+
+    Returns:
+        {'revisadas': n, 'corregidas': m}
+    """
+    with db_engine.session_scope() as session:
+        ids = [row[0] for row in session.execute(text("SELECT id FROM membresias ORDER BY id"))]
+
+    corregidas = 0
+    for start in range(0, len(ids), batch_size):
+        with db_engine.session_scope() as session:
+            for membresia_id in ids[start:start + batch_size]:
+                if session.execute(
+                    text("SELECT reconciliar_estadisticas_membresia(:id)"), {'id': membresia_id}
+                ).scalar():
+                    corregidas += 1
+
+    return {'revisadas': len(ids), 'corregidas': corregidas}
+
+
+def rebuild_daily_team_stats(days: Optional[int] = None) -> int:
+    """
+    Reconstruir estadisticas_diarias_equipo desde asistencia_log
+
+    Args:
+        days: Reconstruir desde hace este número de días; None = todo el historial
+
+    Returns:
+        Filas (equipo, día) escritas
+    """
+    with db_engine.session_scope() as session:
+        if days is None:
+            return session.execute(text("SELECT reconstruir_estadisticas_diarias(NULL)")).scalar() or 0
+        return session.execute(
+            text("SELECT reconstruir_estadisticas_diarias(CURRENT_DATE - :dias)"), {'dias': int(days)}
+        ).scalar() or 0
+
+
+class StatsReconciler:
+    """Hilo de fondo que reconcilia cada `database.stats_reconcile_minutes`"""
+
+    def __init__(self, interval_minutes: Optional[float] = None):
+        self.logger = get_logger(__name__)
+        if interval_minutes is None:
+            interval_minutes = float(get_config().get("database.stats_reconcile_minutes", 60))
+        self.interval = interval_minutes * 60
+        self.daily_days = int(get_config().get("database.daily_stats_rebuild_days", 7))
+        self.last_result: Optional[Dict[str, int]] = None
+        self.last_run: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Iniciar el hilo (False si está desactivado con intervalo 0)"""
+        if self.interval <= 0 or self._thread is not None:
+            return False
+        self._thread = threading.Thread(target=self._run, name="stats-reconciler", daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self) -> Dict[str, int]:
+        started = time.perf_counter()
+        result = reconcile_membership_stats()
+        result['dias_equipo'] = rebuild_daily_team_stats(self.daily_days)
+        self.last_result = result
+        self.last_run = time.time()
+        elapsed = time.perf_counter() - started
+        if result['corregidas']:
+            self.logger.warning(
+                f"Estadísticas corregidas en {result['corregidas']} de "
+                f"{result['revisadas']} membresías ({elapsed:.2f}s)"
+            )
+        else:
+            self.logger.info(f"Estadísticas de {result['revisadas']} membresías sin deriva ({elapsed:.2f}s)")
+        self.logger.info(f"Resumen diario reconstruido: {result['dias_equipo']} filas de los últimos {self.daily_days} días")
+        return result
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                self.logger.error(f"Error reconciliando estadísticas: {e}")
+
+
+# Instancia singleton
+_reconciler_instance = None
+_reconciler_lock = threading.Lock()
+
+
+def get_stats_reconciler() -> StatsReconciler:
+    """Obtener el reconciliador compartido por el proceso"""
+    global _reconciler_instance
+    if _reconciler_instance is None:
+        with _reconciler_lock:
+            if _reconciler_instance is None:
+                _reconciler_instance = StatsReconciler()
+    return _reconciler_instance
+
+
+def start_stats_reconciler() -> bool:
+    """Iniciar la reconciliación periódica al arrancar el servidor"""
+    return get_stats_reconciler().start()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconciliar estadísticas de membresía y resumen diario por equipo")
+    parser.add_argument('--todo', action='store_true', help="Reconstruir el resumen diario de todo el historial")
+    args = parser.parse_args()
+
+    resultado = get_stats_reconciler().run_once()
+    print(f"✅ Membresías revisadas: {resultado['revisadas']}, corregidas: {resultado['corregidas']}")
+    if args.todo:
+        print(f"✅ Resumen diario completo: {rebuild_daily_team_stats()} filas (equipo, día)")
+    else:
+        print(f"✅ Resumen diario: {resultado['dias_equipo']} filas (equipo, día) reconstruidas")
@@ -0,0 +1,137 @@
+"""
+CLASS VISION - Reconocimiento de Estudiantes en Memoria
+Modelo global (Trainner.yml) y padrón de estudiantes (studentdetails.csv)
+residentes en el proceso: se recargan sólo cuando cambia el archivo
+"""
+
+import csv
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from face_crop_store import normalize_face
+from utils.logger import get_logger
+
+
+BASE_DIR = Path(__file__).parent
+GLOBAL_MODEL_PATH = BASE_DIR / "TrainingImageLabel" / "Trainner.yml"
+STUDENT_DETAILS_PATH = BASE_DIR / "StudentDetails" / "studentdetails.csv"
+
+
+class _FileBacked:
+    """Valor derivado de un archivo que se recarga cuando cambia su mtime"""
+
+    def __init__(self, path: Path):
+        self.logger = get_logger(__name__)
+        self.path = Path(path)
+        self._value = None
+        self._mtime_ns = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def current(self):
+        """Valor vigente (None si el archivo no existe)"""
+        try:
+            mtime_ns = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        if mtime_ns == self._mtime_ns:
+            return self._value
+
+        with self._lock:
+            if mtime_ns != self._mtime_ns:
+                # Se reemplaza la referencia completa: quien ya tenía el
+                # valor anterior termina con él sin bloqueos
+                self._value = self._load()
+                self._mtime_ns = mtime_ns
+                self.reloads += 1
+                self.logger.info(f"{self.path.name} cargado en memoria")
+            return self._value
+
+    def _load(self):
+        raise NotImplementedError
+
+
+class ResidentStudentModel(_FileBacked):
+    """Reconocedor LBPH global cargado una sola vez"""
+
+    def __init__(self, path: Path = GLOBAL_MODEL_PATH):
+        super().__init__(path)
+
+    def _load(self):
+        import cv2
+
+        recognizer = cv2.face.LBPHFaceRecognizer_create()
+        recognizer.read(str(self.path))
+        return recognizer
+
+    def predict_batch(self, gray, faces) -> Optional[List[Tuple[int, float]]]:
+        """
+        Reconocer todos los rostros de un frame con la misma versión del modelo
+
+        Args:
+            gray: Frame en escala de grises
+            faces: Rectángulos (x, y, w, h) detectados
+
+        Returns:
+            [(enrollment, distancia)] en el orden de faces, o None si no hay modelo
+        """
+        recognizer = self.current()
+        if recognizer is None:
+            return None
+        results = []
+        for (x, y, w, h) in faces:
+            # El modelo se entrena con recortes normalizados 200x200
+            label, confidence = recognizer.predict(normalize_face(gray[y:y+h, x:x+w]))
+            results.append((int(label), float(confidence)))
+        return results
+
+
+class EnrollmentIndex(_FileBacked):
+    """Padrón enrollment -> nombre leído de studentdetails.csv"""
+
+    def __init__(self, path: Path = STUDENT_DETAILS_PATH):
+        super().__init__(path)
+
+    def _load(self) -> Dict[int, str]:
+        index: Dict[int, str] = {}
+        with open(self.path, 'r', encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                try:
+                    index[int(row['Enrollment'])] = row['Name']
+                except (KeyError, TypeError, ValueError):
+                    continue
+        return index
+
+    def name_for(self, enrollment: int) -> Optional[str]:
+        index = self.current()
+        if index is None:
+            return None
+        return index.get(int(enrollment))
+
+
+# Instancias singleton
+_model_instance = None
+_index_instance = None
+_instance_lock = threading.Lock()
+
+
+def get_student_model() -> ResidentStudentModel:
+    """Obtener el modelo global residente"""
+    global _model_instance
+    if _model_instance is None:
+        with _instance_lock:
+            if _model_instance is None:
+                _model_instance = ResidentStudentModel()
+    return _model_instance
+
+
+def get_enrollment_index() -> EnrollmentIndex:
+    """Obtener el padrón de estudiantes residente"""
+    global _index_instance
+    if _index_instance is None:
+        with _instance_lock:
+            if _index_instance is None:
+                _index_instance = EnrollmentIndex()
+    return _index_instance
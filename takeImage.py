@@ -4,6 +4,8 @@ import numpy as np
 import pandas as pd
 import datetime
 import time
+from face_crop_store import NS_ESCRITORIO, get_crop_store, normalize_face
+from face_detector_pool import detect_scaled
 
 
 
@@ -32,6 +34,8 @@ def TakeImage(l1, l2, haarcasecade_path, trainimage_path, message, err_screen,te
             directory = Enrollment + "_" + Name
             path = os.path.join(trainimage_path, directory)
             os.mkdir(path)
+            crops = []
+            crop_sources = []
             
             text_to_speech('Posicione su rostro frente a la cámara. Presione Q o Escape para terminar.')
             
@@ -41,20 +45,14 @@ def TakeImage(l1, l2, haarcasecade_path, trainimage_path, message, err_screen,te
                     text_to_speech('No se pudo leer la imagen de la cámara.')
                     break
                 gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-                faces = detector.detectMultiScale(gray, 1.3, 5)
+                faces = detect_scaled(gray, classifier=detector)
                 for (x, y, w, h) in faces:
                     cv2.rectangle(img, (x, y), (x + w, y + h), (212, 184, 137), 3)
                     sampleNum = sampleNum + 1
-                    cv2.imwrite(
-                        f"{path}/"
-                        + Name
-                        + "_"
-                        + Enrollment
-                        + "_"
-                        + str(sampleNum)
-                        + ".jpg",
-                        gray[y : y + h, x : x + w],
-                    )
+                    filename = Name + "_" + Enrollment + "_" + str(sampleNum) + ".jpg"
+                    cv2.imwrite(f"{path}/" + filename, gray[y : y + h, x : x + w])
+                    crops.append(normalize_face(gray[y : y + h, x : x + w]))
+                    crop_sources.append(filename)
                     # Mostrar contador en la imagen
                     cv2.putText(img, f'Capturando: {sampleNum}/50', (x, y-10), 
                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (212, 184, 137), 2)
@@ -68,6 +66,13 @@ def TakeImage(l1, l2, haarcasecade_path, trainimage_path, message, err_screen,te
                     break
             cam.release()
             cv2.destroyAllWindows()
+            # Guardar los recortes para que el entrenamiento no relea los JPEG
+            aviso = ""
+            try:
+                get_crop_store().add(NS_ESCRITORIO, directory, crops, int(Enrollment), crop_sources)
+            except ValueError as e:
+                # Matrícula no numérica o recortes que no coinciden con sus fotos
+                aviso = f". Advertencia: no se guardaron los recortes faciales ({e})"
             row = [Enrollment, Name]
             with open(
                 "StudentDetails/studentdetails.csv",
@@ -76,7 +81,7 @@ def TakeImage(l1, l2, haarcasecade_path, trainimage_path, message, err_screen,te
                 writer = csv.writer(csvFile, delimiter=",")
                 writer.writerow(row)
                 csvFile.close()
-            res = "Imágenes guardadas para Matrícula: " + Enrollment + " Nombre: " + Name
+            res = "Imágenes guardadas para Matrícula: " + Enrollment + " Nombre: " + Name + aviso
             message.configure(text=res)
             text_to_speech(res)
         except FileExistsError as F:
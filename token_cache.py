@@ -0,0 +1,133 @@
+"""
+CLASS VISION - Caché de Validación de Tokens
+Guarda en memoria los tokens ya validados para no consultar
+sesiones_activas en cada petición protegida
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from utils.config_manager import get_config
+
+
+class TokenCache:
+    """
+    Caché LRU con TTL de validaciones de token
+
+    Cada entrada vence en el primero de estos momentos: el TTL
+    configurado o la fecha_expiracion de la sesión. Sólo se guardan
+    validaciones exitosas; logout() de cada gestor llama a invalidate().
+    Las claves incluyen un ámbito porque cada gestor de autenticación
+    devuelve el usuario con una forma distinta.
+    """
+
+    def __init__(self, max_size: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        config = get_config()
+        self.max_size = max_size or int(config.get("auth.token_cache_size", 2048))
+        self.ttl_seconds = ttl_seconds or float(config.get("auth.token_cache_ttl_seconds", 60))
+
+        # (ámbito, token) -> (valor, vence_en monotónico)
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, token: str, scope: str = 'default') -> Optional[Any]:
+        """
+        Obtener la validación cacheada de un token
+
+        Returns:
+            El valor guardado con put() o None si no está o ya venció
+        """
+        key = (scope, token)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, value: Any, expires_at: Optional[datetime] = None,
+            scope: str = 'default'):
+        """
+        Guardar una validación exitosa
+
+        Args:
+            token: Token validado
+            value: Resultado a devolver en los siguientes get()
+            expires_at: fecha_expiracion de la sesión (hora local, como la BD)
+            scope: Gestor de autenticación que validó el token
+        """
+        ttl = self.ttl_seconds
+        if expires_at is not None:
+            remaining = (expires_at - datetime.now(expires_at.tzinfo)).total_seconds()
+            if remaining <= 0:
+                return
+            ttl = min(ttl, remaining)
+
+        with self._lock:
+            self._entries[(scope, token)] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end((scope, token))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, token: str):
+        """Descartar un token en todos los ámbitos (logout)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[1] == token]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def invalidate_matching(self, scope: str, predicate: Callable[[Any], bool]):
+        """Descartar las entradas de un ámbito cuyo valor cumple el predicado"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items()
+                        if key[0] == scope and predicate(entry[0])]:
+                del self._entries[key]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Contadores de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'tokens_cacheados': len(self._entries),
+                'tamano_maximo': self.max_size,
+                'ttl_segundos': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidaciones': self.invalidations,
+                'desalojos': self.evictions,
+                'hit_ratio': round(self.hits / total, 4) if total else 0.0
+            }
+
+
+# Instancia singleton
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_token_cache() -> TokenCache:
+    """Obtener la caché de tokens compartida por todo el proceso"""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = TokenCache()
+    return _cache_instance
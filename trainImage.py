@@ -1,10 +1,11 @@
 import csv
-import os, cv2
+import cv2
 import numpy as np
 import pandas as pd
 import datetime
 import time
-from PIL import ImageTk, Image
+
+from utils.config_manager import get_config
 
 
 # Entrenar Imagen
@@ -28,7 +29,6 @@ def TrainImage(haarcasecade_path, trainimage_path, trainimagelabel_path, message
     message.configure(text="Iniciando entrenamiento del modelo...")
     text_to_speech("Los dioses están procesando el conocimiento facial...")
     
-    detector = cv2.CascadeClassifier(haarcasecade_path)
     faces, Id = getImagesAndLables(trainimage_path)
     
     if len(faces) == 0:
@@ -44,29 +44,12 @@ def TrainImage(haarcasecade_path, trainimage_path, trainimagelabel_path, message
     text_to_speech("El conocimiento divino ha sido grabado en los anales del sistema.")
 
 
-def getImagesAndLables(path):
-    if not os.path.exists(path):
-        return [], []
-        
-    # imagePath = [os.path.join(path, f) for d in os.listdir(path) for f in d]
-    newdir = [os.path.join(path, d) for d in os.listdir(path) if os.path.isdir(os.path.join(path, d))]
-    imagePath = []
-    
-    for directory in newdir:
-        for f in os.listdir(directory):
-            if f.lower().endswith(('.png', '.jpg', '.jpeg')):
-                imagePath.append(os.path.join(directory, f))
-    
-    faces = []
-    Ids = []
-    for imagePath_single in imagePath:
-        try:
-            pilImage = Image.open(imagePath_single).convert("L")
-            imageNp = np.array(pilImage, "uint8")
-            Id = int(os.path.split(imagePath_single)[-1].split("_")[1])
-            faces.append(imageNp)
-            Ids.append(Id)
-        except Exception as e:
-            print(f"Error procesando imagen {imagePath_single}: {e}")
-            continue
-    return faces, Ids
+def getImagesAndLables(path, workers=None):
+    # Los recortes de cada carpeta se guardan en el almacén la primera
+    # vez (en paralelo, un bloque por carpeta); los entrenamientos
+    # siguientes no decodifican ningún JPEG. No es el servidor: por
+    # defecto usa training.workers (todos los núcleos)
+    from face_training import desktop_images_and_labels
+    if workers is None:
+        workers = int(get_config().get("training.workers", 0))
+    return desktop_images_and_labels(path, workers)
@@ -0,0 +1,265 @@
+"""
+CLASS VISION - Cola de Trabajos de Entrenamiento
+Los reentrenamientos se ejecutan en hilos de fondo: la petición HTTP
+encola el trabajo, responde con su ID y el cliente consulta el avance
+"""
+
+import itertools
+import queue
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.config_manager import get_config
+from utils.logger import get_logger
+
+
+# Estados de un trabajo
+EN_COLA = 'en_cola'
+EJECUTANDO = 'ejecutando'
+COMPLETADO = 'completado'
+ERROR = 'error'
+
+
+class TrainingJob:
+    """
+    Un reentrenamiento pendiente o ejecutado
+
+    `items` acumula lo que aportan los encolados fusionados (por ejemplo
+    las matrículas nuevas del modelo global); el runner recibe el trabajo
+    completo y lee `items` al empezar.
+    """
+
+    def __init__(self, job_id: str, tipo: str, clave: str,
+                 runner: Callable[['TrainingJob'], Any], items: Iterable = ()):
+        self.id = job_id
+        self.tipo = tipo
+        self.clave = clave
+        self.runner = runner
+        self.items = list(items)
+        self.estado = EN_COLA
+        self.progreso = 0
+        self.mensaje = 'En cola'
+        self.resultado = None
+        self.error = None
+        self.solicitudes = 1
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self._lock = threading.Lock()
+
+    def report(self, progreso: int, mensaje: str):
+        """Actualizar el avance (lo llama el runner)"""
+        with self._lock:
+            self.progreso = max(0, min(100, int(progreso)))
+            self.mensaje = mensaje
+
+    def merge(self, items: Iterable):
+        with self._lock:
+            for item in items:
+                if item not in self.items:
+                    self.items.append(item)
+            self.solicitudes += 1
+
+    @property
+    def finished(self) -> bool:
+        return self.estado in (COMPLETADO, ERROR)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            duracion = None
+            if self.iniciado is not None:
+                duracion = round((self.terminado or time.time()) - self.iniciado, 2)
+            return {
+                'job_id': self.id,
+                'tipo': self.tipo,
+                'clave': self.clave,
+                'estado': self.estado,
+                'progreso': self.progreso,
+                'mensaje': self.mensaje,
+                'resultado': self.resultado,
+                'error': self.error,
+                'solicitudes_fusionadas': self.solicitudes,
+                'creado': self.creado,
+                'duracion_segundos': duracion
+            }
+
+
+class TrainingJobQueue:
+    """
+    Cola en proceso con un pool de hilos de entrenamiento
+
+    - Un trabajo encolado para la misma (tipo, clave) absorbe los nuevos
+      pedidos en lugar de repetir el reentrenamiento.
+    - Dos trabajos de la misma clave nunca se ejecutan a la vez; el que
+      espera sigue aceptando fusiones hasta que empieza.
+    - Los trabajos terminados se conservan (acotados) para consultar su estado.
+    """
+
+    def __init__(self, workers: Optional[int] = None, history: int = 200):
+        self.logger = get_logger(__name__)
+        self.workers = workers or int(get_config().get("training.job_workers", 2))
+        self.history = history
+
+        self._queue: "queue.Queue[TrainingJob]" = queue.Queue()
+        self._jobs: "OrderedDict[str, TrainingJob]" = OrderedDict()
+        self._pending: Dict[Tuple[str, str], TrainingJob] = {}
+        self._key_locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._threads: List[threading.Thread] = []
+
+    def submit(self, tipo: str, clave: str, runner: Callable[[TrainingJob], Any],
+               items: Iterable = ()) -> Tuple[TrainingJob, bool]:
+        """
+        Encolar un entrenamiento (o fusionarlo con el pendiente)
+
+        Args:
+            tipo: Familia del trabajo (ej: 'usuario', 'global')
+            clave: Modelo afectado (ej: código de usuario)
+            runner: Función que recibe el trabajo y devuelve su resultado
+            items: Datos a acumular entre pedidos fusionados
+
+        Returns:
+            (trabajo, True si se fusionó con uno ya encolado)
+        """
+        self._ensure_workers()
+        key = (tipo, clave)
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.merge(items)
+                return pending, True
+
+            job = TrainingJob(f"{tipo}-{next(self._sequence)}-{int(time.time())}", tipo, clave, runner, items)
+            self._pending[key] = job
+            self._jobs[job.id] = job
+            self._trim_history()
+
+        self._queue.put(job)
+        self.logger.info(f"Trabajo {job.id} encolado ({tipo}: {clave})")
+        return job, False
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs_for(self, clave: str) -> List[TrainingJob]:
+        """Trabajos (recientes primero) que afectan a una clave"""
+        with self._lock:
+            return [job for job in reversed(self._jobs.values()) if job.clave == clave]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            estados: Dict[str, int] = {}
+            for job in self._jobs.values():
+                estados[job.estado] = estados.get(job.estado, 0) + 1
+            return {
+                'workers': self.workers,
+                'en_cola': self._queue.qsize(),
+                'trabajos': estados
+            }
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker, name=f"training-worker-{index + 1}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _key_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _trim_history(self):
+        # Sólo se descartan trabajos terminados
+        excess = len(self._jobs) - self.history
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:excess]:
+            del self._jobs[job_id]
+
+    def _worker(self):
+        while True:
+            job = self._queue.get()
+            key = (job.tipo, job.clave)
+            try:
+                with self._key_lock(key):
+                    # A partir de aquí los nuevos pedidos crean otro trabajo
+                    with self._lock:
+                        if self._pending.get(key) is job:
+                            del self._pending[key]
+                    self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: TrainingJob):
+        job.estado = EJECUTANDO
+        job.iniciado = time.time()
+        job.report(0, 'Iniciando')
+        try:
+            job.resultado = job.runner(job)
+            job.estado = COMPLETADO
+            job.report(100, 'Completado')
+            self.logger.info(f"Trabajo {job.id} completado")
+        except Exception as e:
+            job.error = str(e)
+            job.estado = ERROR
+            job.report(job.progreso, 'Error')
+            self.logger.error(f"Trabajo {job.id} falló: {e}\n{traceback.format_exc()}")
+        finally:
+            job.terminado = time.time()
+
+
+# Instancia singleton
+_queue_instance = None
+_queue_lock = threading.Lock()
+
+
+def get_training_queue() -> TrainingJobQueue:
+    """Obtener la cola de entrenamiento compartida por el proceso"""
+    global _queue_instance
+    if _queue_instance is None:
+        with _queue_lock:
+            if _queue_instance is None:
+                _queue_instance = TrainingJobQueue()
+    return _queue_instance
+
+
+def submit_user_training(codigo_usuario: str) -> Tuple[TrainingJob, bool]:
+    """Encolar el reentrenamiento completo del modelo individual de un usuario"""
+    from face_training import retrain_user_model
+
+    def runner(job: TrainingJob):
+        return {'rostros_entrenados': retrain_user_model(codigo_usuario, progress=job.report)}
+
+    return get_training_queue().submit('usuario', codigo_usuario, runner)
+
+
+def submit_global_training(enrollment: int, model_path=None) -> Tuple[TrainingJob, bool]:
+    """
+    Encolar la incorporación de un estudiante al modelo global (Trainner.yml)
+
+    Varios registros seguidos se fusionan en un solo update() con los
+    recortes de todas las matrículas acumuladas.
+    """
+    from face_training import GLOBAL_MODEL_PATH, add_students_to_global_model
+
+    target = model_path or GLOBAL_MODEL_PATH
+
+    def runner(job: TrainingJob):
+        mode, faces = add_students_to_global_model(job.items, target, progress=job.report)
+        return {'modo': mode, 'rostros_entrenados': faces, 'matriculas': list(job.items)}
+
+    return get_training_queue().submit('global', str(target), runner, [int(enrollment)])
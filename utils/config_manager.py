@@ -3,12 +3,20 @@ CLASS VISION - Gestor de Configuración
 Maneja la carga y acceso a la configuración del sistema
 """
 
+import copy
 import json
+import os
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Tuple
 from .logger import get_logger
 
 
+RECOGNITION_CONFIG_NAME = "recognition_config.json"
+DEFAULT_THRESHOLDS = (30, 50)
+
+
 class ConfigManager:
     """
     Gestor de configuración del sistema
@@ -28,6 +36,14 @@ class ConfigManager:
             self.config_dir = Path("config")
             self.config = {}
             self.load_config()
+
+            # config/recognition_config.json residente en memoria
+            self._recognition: Optional[Dict[str, Any]] = None
+            self._thresholds: Tuple[float, float] = DEFAULT_THRESHOLDS
+            self._recognition_mtime_ns: Optional[int] = None
+            self._recognition_checked = 0.0
+            self._recognition_lock = threading.Lock()
+            self.recognition_poll_seconds = float(self.get("recognition.config_poll_seconds", 1.0))
             self.initialized = True
     
     def load_config(self):
@@ -133,6 +149,122 @@ class ConfigManager:
         """Recargar configuración desde archivo"""
         self.logger.info("Recargando configuración...")
         self.load_config()
+        with self._recognition_lock:
+            self._recognition_mtime_ns = None
+            self._recognition_checked = 0.0
+
+    # ------------------------------------------------------------------
+    # Configuración de reconocimiento (recognition_config.json)
+    # ------------------------------------------------------------------
+
+    @property
+    def recognition_config_path(self) -> Path:
+        return self.config_dir / RECOGNITION_CONFIG_NAME
+
+    def get_recognition_config(self) -> Optional[Dict[str, Any]]:
+        """
+        Contenido de recognition_config.json mantenido en memoria
+
+        El archivo se vuelve a leer sólo si cambió su mtime, y el mtime
+        se consulta como mucho una vez cada `recognition.config_poll_seconds`;
+        así una edición manual se ve en el siguiente intervalo sin leer
+        el disco en cada frame. El diccionario devuelto no debe modificarse
+        (usar update_recognition_config).
+
+        Returns:
+            Configuración o None si el archivo no existe
+        """
+        self._refresh_recognition()
+        return self._recognition
+
+    def recognition_thresholds(self) -> Tuple[float, float]:
+        """
+        Rango de confianza aceptado (umbral_minimo, umbral_maximo)
+
+        Returns:
+            Tupla del rango; (30, 50) si el archivo no existe o es inválido
+        """
+        self._refresh_recognition()
+        return self._thresholds
+
+    def update_recognition_config(self, updater: Callable[[Dict[str, Any]], None]) -> Dict[str, Any]:
+        """
+        Modificar recognition_config.json y publicar el cambio
+
+        La nueva versión se escribe de forma atómica y reemplaza a la
+        residente en el mismo momento: todos los hilos ven los umbrales
+        nuevos en su siguiente consulta, sin esperar al sondeo del mtime.
+
+        Args:
+            updater: Función que recibe una copia de la configuración y la modifica
+
+        Returns:
+            Configuración publicada
+        """
+        with self._recognition_lock:
+            self._load_recognition_locked()
+            config = copy.deepcopy(self._recognition) if self._recognition is not None else {
+                'reconocimiento_facial': {},
+                'sistema': {
+                    'version': '1.0.0',
+                    'nombre': 'CLASS VISION'
+                }
+            }
+            updater(config)
+
+            path = self.recognition_config_path
+            tmp_path = path.with_suffix('.json.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+            self._publish_recognition(config, path.stat().st_mtime_ns)
+            self.logger.info("Configuración de reconocimiento actualizada")
+            return config
+
+    def _refresh_recognition(self):
+        now = time.monotonic()
+        if self._recognition_mtime_ns is not None and now - self._recognition_checked < self.recognition_poll_seconds:
+            return
+        with self._recognition_lock:
+            if self._recognition_mtime_ns is not None and now - self._recognition_checked < self.recognition_poll_seconds:
+                return
+            self._load_recognition_locked()
+
+    def _load_recognition_locked(self):
+        self._recognition_checked = time.monotonic()
+        path = self.recognition_config_path
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            if self._recognition is not None:
+                self.logger.warning(f"{path} ya no existe, usando umbrales por defecto")
+            self._publish_recognition(None, -1)
+            return
+
+        if mtime_ns == self._recognition_mtime_ns:
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            # Se conserva la versión anterior hasta que el archivo sea válido
+            self.logger.error(f"Error al leer {path}: {e}")
+            self._recognition_mtime_ns = mtime_ns
+            return
+        self._publish_recognition(config, mtime_ns)
+        self.logger.info(f"Configuración de reconocimiento cargada: {path}")
+
+    def _publish_recognition(self, config: Optional[Dict[str, Any]], mtime_ns: int):
+        thresholds = DEFAULT_THRESHOLDS
+        if config is not None:
+            section = config.get('reconocimiento_facial', {})
+            thresholds = (section.get('umbral_minimo', DEFAULT_THRESHOLDS[0]),
+                          section.get('umbral_maximo', DEFAULT_THRESHOLDS[1]))
+        # Se reemplazan las referencias completas; los lectores no toman el lock
+        self._recognition = config
+        self._thresholds = thresholds
+        self._recognition_mtime_ns = mtime_ns
 
 
 # Instancia singleton